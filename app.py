@@ -1,80 +1,65 @@
-import io
-import base64
+import os
+import sqlite3
 import datetime
 import pandas as pd
-import altair as alt
 import streamlit as st
+from srt_analyzer import cache, index, jobs, memo, profiling, snapshot
+from srt_analyzer.cli import find_logs
+from srt_analyzer.compare import compare_files, overlay_series
+from srt_analyzer.core import general_stats, index_tables, line_tables, rtt_calc, window_checks
+from srt_analyzer.downsample import DEFAULT_POINTS, downsample
+from srt_analyzer.events import detect_events
+from srt_analyzer.export import MIME_TYPES, export_frame, export_snapshot, export_tables
+from srt_analyzer.ingest import time_labels, with_time_labels
+from srt_analyzer.pairing import DEFAULT_INTERVAL, analyze_pair, pair_intervals, pair_totals
+from srt_analyzer.rolling import RANKED_METRICS, ROLLING_LABELS, ROLLING_METRICS, WINDOWS, rolling_stats, rolling_topk
+from srt_analyzer.rollup import ROLLUP_MIN_ROWS, rollup_pyramid
+from srt_analyzer.summary import summarize
+from srt_analyzer.tail import DEFAULT_REFRESH, LogTail
+from srt_analyzer.schema import COMPRESSED_EXTENSIONS
+from srt_analyzer.sketch import SKETCH_LABELS, distributions
+from srt_analyzer.topk import MAX_K
 
+# Extensions of the uploaded log files, which are decompressed as a stream while they are parsed
+LOG_TYPES = ["csv"] + COMPRESSED_EXTENSIONS
 
-def df_format(dataframe, sender):
-    """Formats the Dataframe and removes the redundant columns whether the log files are for 
-    receiver or sender device  
+
+def download_button(label, path, file_name, key):
+    """Serves a generated file through a download button and removes the temporary file
 
     Args:
-        dataframe ([dataframe]): Input dataframe
-        sender ([bool]): Returns True if the logs are for a SRT sender and False for SRT receiver
-    Returns:
-        cleaned_df ([dataframe]): Output and cleaned dataframe
-        num_rows ([integer]): Number of Rows of the new Cleaned Dataframe
-        num_cols ([integers]): Number of Columns in the new cleaned Dataframe
+        label ([str]): Label of the download button
+        path ([str]): Path of the generated temporary file
+        file_name ([str]): Name of the downloaded file
+        key ([str]): Unique key of the widget
     """
-    
-    if sender:
-        # Dropping all Receiver Columns
-        cleaned_df = dataframe.drop(["pktRecv", "pktRcvLoss", "pktRcvDrop", "pktRcvRetrans", "pktRcvBelated", 
-                                     "byteRecv", "byteRcvLoss", "byteRcvDrop", "mbpsRecvRate", "mbpsMaxBW", 
-                                     "pktRcvFilterExtra", "pktRcvFilterSupply", "pktRcvFilterLoss"], axis = 1)
-    else:
-        # Dropping all Sender Columns
-        cleaned_df = dataframe.drop(["pktSent", "pktSndLoss", "pktSndDrop", "pktRetrans", "byteSent", 
-                                     "byteSndDrop", "mbpsSendRate", "mbpsMaxBW", "pktSndFilterExtra"], axis = 1)
-    # Originally the Time column contains the elapsed time in milliseconds
-    # Converting the milliseconds to human time 
-    cleaned_df["Seconds"] = pd.to_datetime(cleaned_df.Time).astype(int) / 10 ** 3
-    # Converting the Time column into datetime and then converting it to timestamp
-    cleaned_df.Time = pd.to_datetime(cleaned_df.Time, unit = "ms").dt.time
-    # Reordering the Dataframe and placing the Seconds column at the beginning instead of the end
-    df_cols = list(cleaned_df.columns.values)
-    df_cols.pop(df_cols.index("Seconds"))
-    cleaned_df = cleaned_df[["Seconds"] + df_cols]
-    # Finding out the number of rows and columns     
-    num_rows = cleaned_df.shape[0]
-    num_cols = cleaned_df.shape[1]
-    
-    return cleaned_df, num_rows, num_cols
+    extension = os.path.splitext(file_name)[1].lstrip(".")
+    try:
+        with open(path, "rb") as export_file, profiling.stage("download"):
+            st.download_button(label, export_file, file_name = file_name, mime = MIME_TYPES[extension], 
+                               key = key)
+    finally:
+        os.remove(path)
 
-def rtt_calc(dataframe):
-    """Calculates the minimum, maximum and average Round Trip Time(RTT)
+def show_chart(chart, rows = None):
+    """Serializes the Altair chart and sends it to the browser, which is measured as a stage
 
     Args:
-        dataframe ([dataframe]): Input Dataframe
-
-    Returns:
-        min_rtt ([float]): Minimum Round Trip Time in ms
-        max_rtt ([float]): Maximum Round Trip Time in ms
-        avg_rtt ([float]): Average Round Trip Time in ms
+        chart ([chart]): Altair chart
+        rows ([integer]): Number of the plotted data points
     """
-    min_rtt = round(dataframe.msRTT.min(), 3)
-    max_rtt = round(dataframe.msRTT.max(), 3)
-    avg_rtt = round(dataframe.msRTT.mean(), 3)
-    return min_rtt, max_rtt, avg_rtt
-    
+    with profiling.stage("chart_render", rows):
+        st.altair_chart(chart, use_container_width = True)
 
-def get_download_link(**dataframes):
-    """Generates a link allowing the data in a given panda dataframe to be downloaded
-    in:  dataframe
-    out: href string
+def export_menu(tables, key):
+    """Generates a spreadsheet with the line stats tables, only when the user asks for it
+
+    Args:
+        tables ([dict]): Dataframes keyed by the sheet name, None values are skipped
+        key ([str]): Unique key of the widgets
     """
-    output_file = io.BytesIO()
-    writer = pd.ExcelWriter(output_file, engine = "xlsxwriter")
-    for df_name, df in dataframes.items(): 
-        # Creating a new Sheet only if the df is not empty
-        if df is not None: 
-            df.to_excel(writer, sheet_name = df_name)
-    writer.save()
-    b64 = base64.b64encode(output_file.getvalue())
-    export_link = f'<a href="data:application/octet-stream;base64,{b64.decode()}" download="output.xlsx">here</a>'
-    return export_link
+    if st.button("Export these Tables as Spreadsheet", key = f"{key}_export"):
+        download_button("Download Spreadsheet", export_tables(**tables), "output.xlsx", f"{key}_download")
 
 def line_stats(dataframe, sender):
     """Prints on the screen the Line Stats, the X-number of rows containing the lowest mbpsBandwidth, 
@@ -85,100 +70,145 @@ def line_stats(dataframe, sender):
         dataframe ([dataframe]): Input Dataframe
         sender ([bool]): True for SRT Sender and False for SRT Receiver
     """
+    summary = summarize(dataframe)
     if sender:
         st.markdown("### Line Bandwidth Stats:")
-        st.write(f"Minimal Line Bandwidth: {dataframe.mbpsBandwidth.min()} Mbps")
-        snd_rows = st.slider("Select the Number of Smallest Rows to Show:", 1, 100, 10)
+        st.write(f"Minimal Line Bandwidth: {summary.min('mbpsBandwidth')} Mbps")
+        snd_rows = st.slider("Select the Number of Smallest Rows to Show:", 1, MAX_K, 10)
         # Checking if we have lost sent data packets 
-        snd_cols = ["Time", "msRTT", "mbpsBandwidth", "pktSndDrop", "pktSndLoss", "pktRetrans", "mbpsSendRate"]
-        mbpsSendRate_df = dataframe.nsmallest(snd_rows, "mbpsBandwidth")[snd_cols]
-        st.table(mbpsSendRate_df)
-        if dataframe.pktSndLoss.max() > 0:
+        tables = line_tables(dataframe, sender, snd_rows)
+        st.table(tables["mbpsSendRate"])
+        if summary.max("pktSndLoss") > 0:
             st.write("---")
             st.markdown("### Lost Sent Data Packets Stats:")
-            st.write(f"Maximal Lost Sent Data Packets: {dataframe.pktSndLoss.max()} packets")
-            st.write(f"Total Lost Sent Data Packets: {dataframe.pktSndLoss.sum()} packets")
-            pktSndLoss_df = dataframe.nlargest(snd_rows, "pktSndLoss")[snd_cols]
-            st.table(pktSndLoss_df)
+            st.write(f"Maximal Lost Sent Data Packets: {summary.max('pktSndLoss')} packets")
+            st.write(f"Total Lost Sent Data Packets: {summary.sum('pktSndLoss')} packets")
+            st.table(tables["pktSndLoss"])
         else:
             st.write("No Lost Sent Data Packets Detected")
-            pktSndLoss_df = None
 
         # Checking if we have dropped sent data packets 
-        if dataframe.pktSndDrop.max() > 0:
+        if summary.max("pktSndDrop") > 0:
             st.write("---")
             st.markdown("### Dropped Sent Data Packets Stats:")
-            st.write(f"Maximal Dropped Sent Data Packets: {dataframe.pktSndDrop.max()} packets")
-            st.write(f"Total Dropped Sent Data Packets: {dataframe.pktSndDrop.sum()} packets")
-            pktSndDrop_df = dataframe.nlargest(snd_rows, "pktSndDrop")[snd_cols]
-            st.table(pktSndDrop_df)
+            st.write(f"Maximal Dropped Sent Data Packets: {summary.max('pktSndDrop')} packets")
+            st.write(f"Total Dropped Sent Data Packets: {summary.sum('pktSndDrop')} packets")
+            st.table(tables["pktSndDrop"])
         else:
             st.write("No Dropped Sent Data Packets Detected")
-            pktSndDrop_df = None
 
         # Checking if we have retransmitted sent data packets 
-        if dataframe.pktRetrans.max() > 0:
+        if summary.max("pktRetrans") > 0:
             st.write("---")
             st.markdown("### Retransmitted Data Packets Stats:")
-            st.write(f"Maximal Retransmitted Data Packets: {dataframe.pktRetrans.max()} packets")
-            st.write(f"Total Retransmitted Data Packets: {dataframe.pktRetrans.sum()} packets")
-            pktRetrans_df = dataframe.nlargest(snd_rows, "pktRetrans")[snd_cols]
-            st.table(pktRetrans_df)
+            st.write(f"Maximal Retransmitted Data Packets: {summary.max('pktRetrans')} packets")
+            st.write(f"Total Retransmitted Data Packets: {summary.sum('pktRetrans')} packets")
+            st.table(tables["pktRetrans"])
         else:
             st.write("No Retransmitted Data Packets Detected")
-            pktRetrans_df = None
-        # Creating an export link to download the statistics
-        url = get_download_link(mbpsSendRate = mbpsSendRate_df, pktSndLoss = pktSndLoss_df, 
-                                pktSndDrop = pktSndDrop_df, pktRetrans = pktRetrans_df)
-        st.markdown(f"If you want to export this data as a spreadsheet click {url}.", unsafe_allow_html=True)
+        # Exporting the statistics only on request
+        export_menu(tables, "snd_line_stats")
 
     else:
         # The logs are for Receiving Device
         st.markdown("### Line Bandwidth Stats:")
-        st.write(f"Minimal Line Bandwidth: {dataframe.mbpsBandwidth.min()} Mbps")
-        rcv_rows = st.slider("Select Number of Rows:", 1, 100, 10)
-        rcv_cols = ["Time", "msRTT", "mbpsBandwidth", "pktRcvDrop", "pktRcvLoss", "pktRcvRetrans", "mbpsRecvRate"]
-        mbpsBandwidth_df = dataframe.nsmallest(rcv_rows, "mbpsBandwidth")[rcv_cols]
-        st.table(mbpsBandwidth_df)
-        if dataframe.pktRcvLoss.max() > 0:
+        st.write(f"Minimal Line Bandwidth: {summary.min('mbpsBandwidth')} Mbps")
+        rcv_rows = st.slider("Select Number of Rows:", 1, MAX_K, 10)
+        tables = line_tables(dataframe, sender, rcv_rows)
+        st.table(tables["mbpsBandwidth"])
+        if summary.max("pktRcvLoss") > 0:
             st.write("---")
             st.markdown("### Lost Received Data Packets Stats:")
-            st.write(f"Maximal Lost Received Data Packets: {dataframe.pktRcvLoss.max()} packets")
-            st.write(f"Total Lost Received Data Packets: {dataframe.pktRcvLoss.sum()} packets")
-            pktcvLoss_df = dataframe.nlargest(rcv_rows, "pktRcvLoss")[rcv_cols]
-            st.table(pktcvLoss_df)
+            st.write(f"Maximal Lost Received Data Packets: {summary.max('pktRcvLoss')} packets")
+            st.write(f"Total Lost Received Data Packets: {summary.sum('pktRcvLoss')} packets")
+            st.table(tables["pktRcvLoss"])
         else:
             st.write("No Lost Sent Data Packets Detected")
-            pktcvLoss_df = None
             
         # Checking if we have dropped sent data packets 
-        if dataframe.pktRcvDrop.max() > 0:
+        if summary.max("pktRcvDrop") > 0:
             st.write("---")
             st.markdown("### Dropped Received Data Packets Stats:")
-            st.write(f"Maximal Dropped Received Data Packets: {dataframe.pktRcvDrop.max()} packets")
-            st.write(f"Total Dropped Sent Data Packets: {dataframe.pktRcvDrop.sum()} packets")
-            pktRcvDrop_df = dataframe.nlargest(rcv_rows, "pktRcvDrop")[rcv_cols]
-            st.table(pktRcvDrop_df)
+            st.write(f"Maximal Dropped Received Data Packets: {summary.max('pktRcvDrop')} packets")
+            st.write(f"Total Dropped Sent Data Packets: {summary.sum('pktRcvDrop')} packets")
+            st.table(tables["pktRcvDrop"])
         else:
             st.write("No Dropped Sent Data Packets Detected")
-            pktRcvDrop_df = None
 
         # Checking if we have retransmitted sent data packets 
-        if dataframe.pktRcvRetrans.max() > 0:
+        if summary.max("pktRcvRetrans") > 0:
             st.write("---")
             st.markdown("### Retransmitted Data Packets Stats:")
-            st.write(f"Maximal Retransmitted Data Packets: {dataframe.pktRcvRetrans.max()} packets")
-            st.write(f"Total Retransmitted Data Packets: {dataframe.pktRcvRetrans.sum()} packets")
-            pktRcvRetrans_df = dataframe.nlargest(rcv_rows, "pktRcvRetrans")[rcv_cols]
-            st.table(pktRcvRetrans_df)
+            st.write(f"Maximal Retransmitted Data Packets: {summary.max('pktRcvRetrans')} packets")
+            st.write(f"Total Retransmitted Data Packets: {summary.sum('pktRcvRetrans')} packets")
+            st.table(tables["pktRcvRetrans"])
         else:
             st.write("No Retransmitted Data Packets Detected")
-            pktRcvRetrans_df = None
         
-        # Creating an export link to download the statistics
-        url = get_download_link(mbpsBandwidth = mbpsBandwidth_df, pktRcvDrop = pktRcvDrop_df, 
-                                pktRcvRetrans = pktRcvRetrans_df, pktcvLoss = pktcvLoss_df)
-        st.markdown(f"If you want to export this data as a spreadsheet click {url}.", unsafe_allow_html=True)
+        # Exporting the statistics only on request
+        export_menu(tables, "rcv_line_stats")
+
+def rollup_chart(pyramid, metric, time_range, title = "SRT Line Bandwidth", y_title = "Bandwidth, [Mbps]"):
+    """Plots a metric from the coarsest level of the rollup pyramid which fits the time range, as the 
+    band between the minimum and the maximum of every bucket and the line of the mean
+
+    Args:
+        pyramid ([Pyramid]): Rollup pyramid of the log file
+        metric ([str]): Metric column
+        time_range ([tuple]): (start, end) of the time range in seconds
+        title ([str]): Title of the chart
+        y_title ([str]): Title of the y axis
+
+    Returns:
+        chart ([chart]): Altair chart
+    """
+    # Altair is imported only when a chart is drawn, which keeps the cold start of the app short
+    import altair as alt
+    resolution = pyramid.resolution_for(time_range, DEFAULT_POINTS)
+    series_df = pyramid.series(metric, resolution, time_range)
+    base = alt.Chart(series_df).encode(alt.X('Seconds:Q', title='Time, [s]'))
+    band = base.mark_area(opacity = 0.3).encode(alt.Y('min:Q', title=y_title), alt.Y2('max:Q'))
+    line = base.mark_line().encode(alt.Y('mean:Q'))
+    return (band + line).properties(title=f'{title} ({resolution}s buckets)').interactive()
+
+def rolling_tables(index, key):
+    """Prints on the screen the worst windows of the line for the jitter, the loss rate and the 
+    throughput and generates a download link to export these tables into Excel spreadsheet
+
+    Args:
+        index ([RollingTopK]): Index of the worst windows
+        key ([str]): Unique key of the widgets
+    """
+    num_rows = st.slider("Select the Number of Worst Windows to Show:", 1, MAX_K, 10, key = f"{key}_rows")
+    tables = {metric: with_time_labels(index.top(metric, num_rows)) for metric in RANKED_METRICS}
+    for metric, table in tables.items():
+        worst = "Lowest" if RANKED_METRICS[metric] else "Highest"
+        st.markdown(f"### {worst} {ROLLING_LABELS[metric]}:")
+        st.table(table)
+    export_menu(tables, key)
+
+def distribution_view(dists, key):
+    """Prints on the screen the tail percentiles of the line metrics and plots the histogram of the 
+    selected metric, both from the distribution sketches of the log file
+
+    Args:
+        dists ([Distributions]): Distribution sketches of the log file
+        key ([str]): Unique key of the widgets
+    """
+    import altair as alt
+    percentiles_df = dists.percentiles()
+    st.markdown("### Tail Percentiles:")
+    st.table(percentiles_df)
+    if not dists.metrics:
+        return
+    metric = st.selectbox("Histogram of:", dists.metrics, format_func = SKETCH_LABELS.get, key = f"{key}_metric")
+    histogram_df = dists.histogram(metric)
+    bar_chart = alt.Chart(histogram_df).mark_bar().encode(
+        alt.X('start:Q', bin = 'binned', title = SKETCH_LABELS[metric]),
+        alt.X2('end:Q'),
+        alt.Y('count:Q', title = 'Rows')).properties(title = f'Distribution of {metric}').interactive()
+    show_chart(bar_chart, len(histogram_df))
+    export_menu({"percentiles": percentiles_df.reset_index().rename(columns = {"index": "metric"})}, key)
 
 def drop_down_menu(dataframe, sender):
     """Generates a drop-down menu with the different analysis types, to perform on the input CSV log file.
@@ -187,82 +217,526 @@ def drop_down_menu(dataframe, sender):
         dataframe ([dataframe]): Input Dataframe
         sender ([bool]): True for SRT Sender and False for SRT Receiver
     """
+    import altair as alt
     selection = st.selectbox("Select Analysis:", ("", "Show Dataframe Head", "Show Dataframe Tail", \
-                             "General Stats", "Line Bandwidth Stats", "Bandwidth Plot"))
+                             "General Stats", "Line Bandwidth Stats", "Bandwidth Plot", "Rolling Stats", \
+                             "Distributions", "Detected Events", \
+                             "Export Data"))
     if selection == "Show Dataframe Head":
         nhead = st.slider("How Many Rows to Show?", 1, 100, 10)
-        st.write(dataframe.head(nhead))
+        st.write(with_time_labels(dataframe.head(nhead)))
     if selection == "Show Dataframe Tail":
         ntail = st.slider("How Many Rows to Show?", 1, 100, 10)
-        st.write(dataframe.tail(ntail))
+        st.write(with_time_labels(dataframe.tail(ntail)))
     if selection == "General Stats":
-        st.write(dataframe.describe().T)
+        st.write(general_stats(dataframe))
+        st.write(distributions(dataframe).percentiles())
     if selection == "Line Bandwidth Stats":
         line_stats(dataframe, sender)
 
     if selection == "Bandwidth Plot":
-        line_chart = alt.Chart(dataframe).mark_line().encode(
+        # Only a downsampled series is sent to the browser, a narrower time range is shown in more detail
+        first, last = float(dataframe.Seconds.iloc[0]), float(dataframe.Seconds.iloc[-1])
+        time_range = st.slider("Time Range, [s]", first, last, (first, last))
+        seconds = dataframe.Seconds
+        range_rows = seconds.searchsorted(time_range[1], side = "right") - seconds.searchsorted(time_range[0])
+        if range_rows > ROLLUP_MIN_ROWS:
+            # Long time ranges are drawn from the rollup pyramid, which is persisted in the cache
+            key = memo.frame_key(dataframe)
+            pyramid = rollup_pyramid(dataframe, cache.rollup_path(key) if key else None)
+            show_chart(rollup_chart(pyramid, "mbpsBandwidth", time_range))
+        else:
+            points = downsample(dataframe, "Seconds", "mbpsBandwidth", time_range)
+            line_chart = alt.Chart(points).mark_line().encode(
+            alt.X('Seconds:Q', title='Time, [s]'),
+            alt.Y('mbpsBandwidth', title='Bandwidth, [Mbps]')).properties(title='SRT Line Bandwidth').interactive()
+            show_chart(line_chart, len(points))
+    
+    if selection == "Rolling Stats":
+        # Every row gets the stats of the window ending at it, only the downsampled series is plotted
+        window = st.selectbox("Window Size, [s]:", WINDOWS, index = 1)
+        metric = st.selectbox("Plot:", ROLLING_METRICS, format_func = ROLLING_LABELS.get)
+        points = downsample(rolling_stats(dataframe, sender, window), "Seconds", metric)
+        line_chart = alt.Chart(points).mark_line().encode(
         alt.X('Seconds:Q', title='Time, [s]'),
-        alt.Y('mbpsBandwidth', title='Bandwidth, [Mbps]')).properties(title='SRT Line Bandwidth').interactive()
-        st.altair_chart(line_chart, use_container_width = True)
+        alt.Y(metric, title=ROLLING_LABELS[metric])).properties(title=f'SRT Rolling Stats ({window}s window)').interactive()
+        show_chart(line_chart, len(points))
+        rolling_tables(rolling_topk(dataframe, sender, window), "rolling_stats")
+
+    if selection == "Distributions":
+        # The percentiles and histograms come from the sketches, the columns are never sorted
+        distribution_view(distributions(dataframe), "distributions")
+
+    if selection == "Export Data":
+        # The whole log file is streamed into the file in chunks, only when the user asks for it
+        file_format = st.radio("Export Format:", ("csv", "parquet"))
+        if st.button("Export the Whole Log File"):
+            download_button(f"Download {file_format.upper()} File", export_frame(dataframe, file_format), 
+                            f"output.{file_format}", "full_export_download")
+        # The snapshot can be opened by the colleagues instead of the original log file
+        if st.button("Export the Session Snapshot"):
+            download_button("Download Session Snapshot", export_snapshot(dataframe, sender), 
+                            f"session.{snapshot.SNAPSHOT_EXTENSION}", "snapshot_download")
     
-    if not dataframe[dataframe.pktFlightSize > dataframe.pktFlowWindow].empty:
-        st.error("pktFlightSize is lower than the pktFlowWindow!")
+    if selection == "Detected Events":
+        events = detect_events(dataframe, sender)
+        if events.empty:
+            st.write("No Events Detected")
+        else:
+            st.write(events.groupby("event", sort = False).agg(events = ("rows", "size"), 
+                                                              rows = ("rows", "sum"), 
+                                                              longest_s = ("duration_s", "max")))
+            st.write(events)
+
+    # The windowing checks are reported as merged intervals instead of the individual rows
+    flow_events, congestion_events = window_checks(dataframe, sender)
+    if not flow_events.empty:
+        st.error("pktFlightSize is higher than the pktFlowWindow!")
         st.markdown("pktFlightSize is the distance between the packet sequence number that was \
             last reported by an ACK message and the sequence number of the latest packet sent \
             (at the moment when the statistics are being read).")
-        st.write(dataframe[dataframe.pktFlightSize > dataframe.pktFlowWindow][["pktFlightSize", "pktFlowWindow"]])
+        st.write(flow_events)
     # Checking if the pktFlightSize is higher than the pktCongestionWindow
-    if not dataframe[dataframe.pktFlightSize > dataframe.pktCongestionWindow].empty:
-        st.error("pktFlightSize is lower than the pktCongestionWindow!")
+    if not congestion_events.empty:
+        st.error("pktFlightSize is higher than the pktCongestionWindow!")
         st.markdown("pktFlightSize is the distance between the packet sequence number that was \
             last reported by an ACK message and the sequence number of the latest packet sent \
             (at the moment when the statistics are being read).")
         st.markdown("Dynamically limits the maximum number of packets that can be in flight. \
             Congestion control module dynamically changes the value.")
-        st.write(dataframe[dataframe.pktFlightSize > dataframe.pktCongestionWindow][["pktFlightSize", "pktCongestionWindow"]])
+        st.write(congestion_events)
+
+def stream_stats(stats, interactive = True):
+    """Prints on the screen the stats of a log file analyzed in streaming mode, where the whole 
+    dataframe is never loaded in memory.
+
+    Args:
+        stats ([StreamStats]): Aggregated stats of the log file
+        interactive ([bool]): False to skip the widgets and the export link, when the stats are 
+            refreshed periodically
+    """
+    if stats.sender:
+        st.markdown("### SRT Sender Log:")
+        labels = {"pktSndLoss": "Lost Sent", "pktSndDrop": "Dropped Sent", "pktRetrans": "Retransmitted"}
+    else:
+        st.write("### SRT Receiver Log:")
+        labels = {"pktRcvLoss": "Lost Received", "pktRcvDrop": "Dropped Received", 
+                  "pktRcvRetrans": "Retransmitted"}
+    min_rtt, max_rtt, avg_rtt = stats.rtt()
+
+    # Printing some general stats of the line
+    st.write(f"Number of Columns: {stats.num_cols}")
+    st.write(f"Number of Rows: {stats.num_rows}")
+    st.write(f"Log Duration: {stats.duration}")
+    st.write(f"Defined Latency: {stats.latency} ms")
+    st.write(f"Minimal RTT: {min_rtt} ms")
+    st.write(f"Maximal RTT: {max_rtt} ms")
+    st.write(f"Average RTT: {avg_rtt} ms")
+    st.write("---")
+    st.markdown("### Line Bandwidth Stats:")
+    if stats.summary is None:
+        return
+    summary = stats.summary
+    st.write(f"Minimal Line Bandwidth: {summary.min('mbpsBandwidth')} Mbps")
+    num_rows = st.slider("Select the Number of Rows to Show:", 1, MAX_K, 10) if interactive else 10
+    tables = index_tables(stats.topk, summary, num_rows)
+    st.table(tables["mbpsSendRate" if stats.sender else "mbpsBandwidth"])
+    for col, label in labels.items():
+        if summary.max(col) > 0:
+            st.write("---")
+            st.markdown(f"### {label} Data Packets Stats:")
+            st.write(f"Maximal {label} Data Packets: {summary.max(col)} packets")
+            st.write(f"Total {label} Data Packets: {summary.sum(col)} packets")
+            st.table(tables[col])
+        else:
+            st.write(f"No {label} Data Packets Detected")
+    if interactive:
+        export_menu(tables, "stream_line_stats")
+
+    # The bandwidth is plotted from the rollup pyramid, which is built while the log file is read
+    pyramid = stats.rollup.finish()
+    if pyramid is not None:
+        buckets = pyramid.levels[min(pyramid.levels)].index
+        time_range = (float(buckets[0]), float(buckets[-1] + 1))
+        show_chart(rollup_chart(pyramid, "mbpsBandwidth", time_range))
+
+    # The rolling stats keep only the worst windows and their rollup pyramids in streaming mode
+    if stats.rolling is not None and interactive:
+        st.write("---")
+        st.markdown("### Rolling Stats:")
+        window = st.selectbox("Window Size, [s]:", WINDOWS, index = 1, key = "stream_rolling_window")
+        metric = st.selectbox("Plot:", ROLLING_METRICS, format_func = ROLLING_LABELS.get, 
+                              key = "stream_rolling_metric")
+        rolling_pyramid = stats.rolling.finish(window)
+        if rolling_pyramid is not None:
+            buckets = rolling_pyramid.levels[min(rolling_pyramid.levels)].index
+            time_range = (float(buckets[0]), float(buckets[-1] + 1))
+            show_chart(rollup_chart(rolling_pyramid, metric, time_range, f"SRT Rolling Stats ({window}s window)", 
+                                    ROLLING_LABELS[metric]))
+        rolling_tables(stats.rolling.topk[window], "stream_rolling_stats")
+
+    # The distribution sketches are built while the log file is read, like the rollup pyramid
+    st.write("---")
+    if interactive:
+        distribution_view(stats.distributions, "stream_distributions")
+    else:
+        st.markdown("### Tail Percentiles:")
+        st.table(stats.distributions.percentiles())
+
+    if stats.flow_window_violations:
+        st.error(f"pktFlightSize is higher than the pktFlowWindow in {stats.flow_window_violations} rows!")
+    if stats.congestion_window_violations:
+        st.error(f"pktFlightSize is higher than the pktCongestionWindow in "
+                 f"{stats.congestion_window_violations} rows!")
+
+def live_tail(path, refresh = DEFAULT_REFRESH):
+    """Follows a growing log file written by srt-live-transmit and refreshes its stats at a fixed 
+    cadence. Only the newly appended rows are parsed on every refresh.
+
+    Args:
+        path ([str]): Path to the local log file
+        refresh ([float]): Refresh interval in seconds
+    """
+    tail = LogTail(path)
+    tail.start()
+    status = st.empty()
+    dashboard = st.empty()
+    try:
+        while True:
+            # Catching up with the rows written since the last refresh
+            while tail.poll():
+                pass
+            if tail.stats is None:
+                status.info(f"Waiting for data in {path}...")
+            else:
+                status.info(f"Following {path}, last update: {datetime.datetime.now():%H:%M:%S}")
+                with dashboard.container():
+                    stream_stats(tail.stats, interactive = False)
+            tail.wait(refresh)
+    finally:
+        tail.stop()
+
+def paired_analysis(file_buffer, paired_buffer, streaming):
+    """Prints on the screen the end-to-end stats of a link from its sender and receiver log files, 
+    aligned on the elapsed time of the Time column.
+
+    Args:
+        file_buffer ([file]): Uploaded binary file buffer of one end of the link
+        paired_buffer ([file]): Uploaded binary file buffer of the other end of the link
+        streaming ([bool]): True to align the log files chunk by chunk without loading them in memory
+    """
+    import altair as alt
+    st.markdown("### Paired Sender/Receiver Analysis:")
+    interval = st.slider("Interval Length, [s]", 1, 600, DEFAULT_INTERVAL)
+    try:
+        if streaming:
+            pairs_df = analyze_pair(file_buffer, paired_buffer, interval)
+        else:
+            first_df, first_sender = load_log(file_buffer)
+            second_df, second_sender = load_log(paired_buffer)
+            if first_sender == second_sender:
+                raise ValueError("Both log files are of the same end, a sender and a receiver log are needed")
+            if first_sender:
+                pairs_df = pair_intervals(first_df, second_df, interval)
+            else:
+                pairs_df = pair_intervals(second_df, first_df, interval)
+    except ValueError as error:
+        st.error(str(error))
+        return
+
+    totals = pair_totals(pairs_df)
+    st.write(f"Sent Data Packets: {totals['pktSent']} packets")
+    st.write(f"Received Data Packets: {totals['pktRecv']} packets")
+    st.write(f"End-to-End Lost Data Packets: {totals['e2e_lost']} packets ({totals['e2e_loss_pct']} %)")
+    st.write(f"Dropped Received Data Packets: {totals['pktRcvDrop']} packets")
+    st.write(f"Retransmit Efficiency (pktRcvRetrans / pktRetrans): {totals['retrans_efficiency_pct']} %")
+    st.write(f"Average RTT Asymmetry (Sender - Receiver): {totals['rtt_asymmetry_ms']} ms")
+    st.write("---")
+    metric = st.selectbox("Plot per Interval:", ("e2e_loss_pct", "retrans_efficiency_pct", "rtt_asymmetry_ms"))
+    line_chart = alt.Chart(pairs_df).mark_line().encode(
+    alt.X('start_s:Q', title='Time, [s]'),
+    alt.Y(metric)).properties(title=f'{metric} per {interval}s Interval').interactive()
+    show_chart(line_chart, len(pairs_df))
+    st.write(pairs_df)
+    export_menu({"pairs": pairs_df}, "paired_stats")
+
+def fleet_view(index_path = index.DEFAULT_INDEX_PATH):
+    """Queries the fleet index of the log files analyzed by the batch analyzer, without touching the 
+    log files themselves.
+
+    Args:
+        index_path ([str]): Path of the fleet index
+    """
+    st.markdown("### Fleet Index:")
+    if not os.path.exists(index_path):
+        st.info(f"No fleet index found in {index_path}, it is built with: python -m srt_analyzer /path/to/logs --index")
+        return
+    # Structured filters, whose values are bound as SQL parameters instead of being pasted into the query
+    role = st.selectbox("Role:", ("all", "sender", "receiver"))
+    min_rows = st.number_input("Minimal Number of Rows:", min_value = 0, value = 0, step = 1000)
+    column = st.selectbox("Filter Column:", ["none"] + index.NUMERIC_COLUMNS,
+                          index = 1 + index.NUMERIC_COLUMNS.index("max_rtt_ms"))
+    operator = st.selectbox("Comparison:", index.FILTER_OPERATORS)
+    threshold = st.number_input("Threshold:", value = 300.0)
+    where, params = index.filter_clause(None if role == "all" else role, min_rows,
+                                        None if column == "none" else column, operator, threshold)
+    order_by = st.selectbox("Sort by:", ("modified DESC", "max_rtt_ms DESC", "lost_total DESC", 
+                                         "dropped_total DESC", "duration_s DESC", "file"))
+    conn = index.connect(index_path, read_only = True)
+    try:
+        sessions = index.query(conn, where, params, order_by = order_by)
+        # The sketches of the matching sessions are merged in SQL, the log files are not parsed again
+        fleet_percentiles = index.distributions(conn, where, params).percentiles()
+    except sqlite3.Error as error:
+        st.error(f"Query of the fleet index failed: {error}")
+        return
+    finally:
+        conn.close()
+    st.write(f"Matching Sessions: {len(sessions)}")
+    st.write(sessions)
+    st.markdown("### Tail Percentiles of the Matching Sessions:")
+    st.table(fleet_percentiles)
+    export_menu({"sessions": sessions}, "fleet_index")
+
+def comparison_view():
+    """Prints on the screen the stats of several log files side by side and overlays their bandwidth 
+    and RTT on a shared time axis. The log files are analyzed at the same time in worker processes.
+    """
+    import altair as alt
+    st.markdown("### Compare Log Files")
+    buffers = st.file_uploader("Choose the CSV Log Files to Compare...", type=LOG_TYPES, encoding = None, 
+                               accept_multiple_files = True) or []
+    patterns = st.text_input("Or Local Paths, Directories or Glob Patterns (comma-separated):")
+    paths = find_logs([pattern.strip() for pattern in patterns.split(",") if pattern.strip()])
+    if len(buffers) + len(paths) < 2:
+        st.write("Choose at least two log files to compare.")
+        return
+
+    # Every log file gets a unique name, the same file name can be uploaded from different directories
+    names = []
+    for name in [buffer.name for buffer in buffers] + [os.path.basename(path) for path in paths]:
+        names.append(name if name not in names else f"{name} ({len(names) + 1})")
+    keys = tuple(upload_key(buffer) for buffer in buffers) + tuple(cache.file_hash(path) for path in paths)
+    stats_df, pyramids = memo.lookup(("compare", keys, tuple(names)), 
+                                     lambda: compare_files([buffer.getvalue() for buffer in buffers] + paths, 
+                                                           names))
+    st.markdown("### Side-by-Side Stats:")
+    st.table(stats_df.astype(str))
+
+    metric = st.selectbox("Plot:", ("mbpsBandwidth", "msRTT"))
+    y_title = "Bandwidth, [Mbps]" if metric == "mbpsBandwidth" else "RTT, [ms]"
+    series_df = overlay_series(pyramids, metric)
+    line_chart = alt.Chart(series_df).mark_line().encode(
+        alt.X('Seconds:Q', title='Time, [s]'),
+        alt.Y('mean:Q', title=y_title),
+        alt.Color('file:N', title='Log File')).properties(title=f'{metric} of the Compared Log Files').interactive()
+    show_chart(line_chart, len(series_df))
+
+def upload_key(file_buffer):
+    """Returns the hash of the uploaded log file content
+
+    Args:
+        file_buffer ([file]): Uploaded binary file buffer
+
+    Returns:
+        key ([str]): Hash of the log file content
+    """
+    # Hashing the upload only once, since Streamlit passes the same upload on every rerun
+    upload_id = getattr(file_buffer, "file_id", None) or getattr(file_buffer, "id", None)
+    if upload_id is not None:
+        return memo.lookup(("file_hash", upload_id), lambda: cache.file_hash(file_buffer))
+    return cache.file_hash(file_buffer)
+
+def run_job(key, file_buffer, streaming):
+    """Analyzes the uploaded log file on a background worker, showing the progress and the first 
+    summary numbers while the chunks are parsed. The analysis can be cancelled at any time.
+
+    Args:
+        key ([str]): Hash of the log file content
+        file_buffer ([file]): Uploaded binary file buffer
+        streaming ([bool]): True to aggregate the stats without keeping the whole dataframe
+
+    Returns:
+        result ([tuple]): (dataframe, sender) or (StreamStats, sender) in streaming mode
+    """
+    job_key = (key, streaming)
+    job = jobs.get(job_key)
+    if job is not None and job.cancelled:
+        # Streamlit stops the script here and reruns it when the button is clicked
+        if not st.button("Restart the Analysis", key = f"restart_{key}_{streaming}"):
+            st.warning("The analysis of the log file was cancelled.")
+            st.stop()
+        jobs.forget(job_key)
+    job = jobs.start(job_key, file_buffer, streaming)
+    # Clicking the button reruns the script, which then cancels the job
+    if st.button("Cancel the Analysis", key = f"cancel_{key}_{streaming}"):
+        job.cancel()
+        job.wait()
+        st.warning("The analysis of the log file was cancelled.")
+        st.stop()
+
+    progress = st.progress(0.0)
+    numbers = st.empty()
+    while not job.wait(jobs.POLL_INTERVAL):
+        progress.progress(job.progress)
+        if job.rows:
+            min_rtt, max_rtt, avg_rtt = job.rtt()
+            numbers.markdown(f"Parsed Rows: {job.rows}  \n"
+                             f"Log Duration so far: {job.duration()}  \n"
+                             f"Defined Latency: {job.latency} ms  \n"
+                             f"RTT (min / max / avg): {min_rtt} / {max_rtt} / {avg_rtt} ms")
+    progress.empty()
+    numbers.empty()
+    jobs.forget(job_key)
+    if job.layout_errors:
+        st.warning(f"The uploaded CSV file is not properly formatted SRT Log File.")
+        for error in job.layout_errors:
+            st.warning(error)
+    return job.result()
+
+def load_log(file_buffer):
+    """Parses and formats the uploaded log file. Log files which were already opened are loaded 
+    from the on-disk cache instead of parsing the CSV file again.
+
+    Args:
+        file_buffer ([file]): Uploaded binary file buffer
+
+    Returns:
+        df ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+    """
+    key = upload_key(file_buffer)
+    # The parsed dataframe is kept in memory across the Streamlit reruns
+    df, sender = memo.lookup(("load_log", key), lambda: _parse_log(file_buffer, key))
+    memo.register(df, key)
+    return df, sender
+
+def load_snapshot(file_buffer):
+    """Opens an uploaded session snapshot. The loaded session is kept in memory across the Streamlit 
+    reruns and its results are primed into the memo layer, so the views don't compute them again.
+
+    Args:
+        file_buffer ([file]): Uploaded binary file buffer
+
+    Returns:
+        session ([Session]): Dataframe, sender flag and analysis results of the snapshot
+    """
+    session = memo.lookup(("load_snapshot", upload_key(file_buffer)), lambda: snapshot.load(file_buffer))
+    session.prime()
+    return session
+
+def _parse_log(file_buffer, key):
+    """Loads the log file from the on-disk cache or parses and formats it on a cache miss
+
+    Args:
+        file_buffer ([file]): Uploaded binary file buffer
+        key ([str]): Hash of the log file content
+
+    Returns:
+        df ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+    """
+    with profiling.stage("cache_load") as record:
+        cached = cache.load(key)
+        record["rows"] = len(cached[0]) if cached is not None else None
+    if cached is not None:
+        return cached
+
+    # The log file is parsed in chunks on a background worker, the redundant columns are skipped and 
+    # the narrowest dtypes are applied at parse time and every chunk is formatted
+    df, sender = run_job(key, file_buffer, streaming = False)
+    with profiling.stage("cache_store", len(df)):
+        cache.store(key, df, sender)
+    return df, sender
+
+def diagnostics_panel():
+    """Prints the wall time, throughput and peak memory of the last pipeline stages and offers the 
+    metrics in the Prometheus text format.
+    """
+    st.write("---")
+    st.markdown("### Diagnostics:")
+    if not profiling.history:
+        st.write("No Stages Measured Yet")
+        return
+    stages = pd.DataFrame(list(profiling.history))
+    st.write(stages.groupby("stage", sort = False).agg(calls = ("seconds", "size"), 
+                                                      total_s = ("seconds", "sum"),
+                                                      last_s = ("seconds", "last"), 
+                                                      last_rows_per_s = ("rows_per_s", "last"),
+                                                      peak_mb = ("peak_mb", "max")))
+    st.write(stages.iloc[::-1])
+    if profiling.METRICS_PORT:
+        st.write(f"Prometheus Endpoint: http://localhost:{profiling.METRICS_PORT}/metrics")
+    st.download_button("Download Prometheus Metrics", profiling.metrics_text(), file_name = "srt_metrics.prom", 
+                       mime = "text/plain", key = "metrics_download")
 
 def main():
     st.beta_set_page_config(page_title = "SRT Logs Analyzer")
     st.markdown("<h1 style='text-align: center;'>SRT Log Analyzer</h1>", unsafe_allow_html=True)
     st.markdown("### Upload And Analyse CSV Log File")
 
-    file_buffer = st.file_uploader("Choose a CSV Log File...", type="csv", encoding = None)
-    if file_buffer:
-        uploaded_file = io.TextIOWrapper(file_buffer)
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
-            # Checking if the number of the columns is 30
-            if df.shape[1] != 30:
-                st.warning(f"The uploaded CSV file is not properly formatted SRT Log File.")
-                st.warning(f"The uploaded file has only {df.shape[1]} columns instead of 30!")
-            else:
-                # Dropping the SocketID column, since it is not informative
-                df.drop(["SocketID"], axis = 1, inplace = True)
-            
-            # Checking if the log file is for sender or receiving device
-            if df.byteSent.iloc[0] != 0:
-                sender = True
-                st.markdown("### SRT Sender Log:")
-            else:
-                sender = False
-                st.write("### SRT Receiver Log:")
-            
-            # Removing redundant columns
-            df, num_rows, num_cols = df_format(df, sender)
-            min_rtt, max_rtt, avg_rtt = rtt_calc(df)
-            
-            # Printing some general stats of the line
-            st.write(f"Number of Columns: {num_cols}")
-            st.write(f"Number of Rows: {num_rows}")
-            st.write(f"Log Duration: {df.Time.iloc[-1]}")
-            st.write(f"Defined Latency: {df.RCVLATENCYms.iloc[-1]} ms")
-            st.write(f"Minimal RTT: {min_rtt} ms")
-            st.write(f"Maximal RTT: {max_rtt} ms")
-            st.write(f"Average RTT: {avg_rtt} ms")
-            
-            # Generating the Drop-Down Menu with the Different Analysis
-            drop_down_menu(df, sender)
+    file_buffer = st.file_uploader("Choose a CSV Log File or a Session Snapshot...", 
+                                   type=LOG_TYPES + [snapshot.SNAPSHOT_EXTENSION], encoding = None)
+    # A session snapshot is opened directly in the full analysis
+    shared = file_buffer is not None and snapshot.is_snapshot(file_buffer)
+    # Paired mode aligns the log files of both ends of the same link
+    paired_buffer = st.file_uploader("Choose the Log File of the Other End (Paired Analysis)...", 
+                                     type=LOG_TYPES, encoding = None)
+    # Streaming mode reads the log file in chunks and keeps the memory usage flat for large log files
+    streaming = st.checkbox("Streaming Mode (for large log files)")
+    # Live tail mode follows a log file which is still written by srt-live-transmit
+    live_path = st.text_input("Or Follow a Growing Local Log File (Live Tail):")
+    # The fleet index holds the stats of the log files analyzed by the batch analyzer
+    fleet = st.checkbox("Query the Fleet Index")
+    # The comparison mode analyzes several log files at the same time
+    compare = st.checkbox("Compare Several Log Files")
+    # The diagnostics panel shows where the time of the analysis goes
+    diagnostics = st.checkbox("Show Diagnostics")
+    if profiling.METRICS_PORT:
+        profiling.serve_metrics(profiling.METRICS_PORT)
+    if fleet:
+        fleet_view()
+    elif compare:
+        comparison_view()
+    elif live_path:
+        live_tail(live_path)
+    elif file_buffer and paired_buffer and not shared:
+        paired_analysis(file_buffer, paired_buffer, streaming)
+    elif file_buffer and streaming and not shared:
+        key = upload_key(file_buffer)
+        stats, _ = memo.lookup(("stream_stats", key), lambda: run_job(key, file_buffer, streaming = True))
+        stream_stats(stats)
+    elif file_buffer:
+        if shared:
+            session = load_snapshot(file_buffer)
+            st.info(f"Session Snapshot of {session.info['source'] or 'an uploaded log file'}, "
+                    f"created on {session.info['created'][:19].replace('T', ' ')} UTC")
+            df, sender = session.dataframe, session.sender
+        else:
+            df, sender = load_log(file_buffer)
+        if sender:
+            st.markdown("### SRT Sender Log:")
+        else:
+            st.write("### SRT Receiver Log:")
+        num_rows, num_cols = df.shape
+        min_rtt, max_rtt, avg_rtt = rtt_calc(df)
+        
+        # Printing some general stats of the line
+        st.write(f"Number of Columns: {num_cols}")
+        st.write(f"Number of Rows: {num_rows}")
+        st.write(f"Log Duration: {time_labels(df.Time.to_numpy()[-1:])[0]}")
+        st.write(f"Defined Latency: {df.RCVLATENCYms.iloc[-1]} ms")
+        st.write(f"Minimal RTT: {min_rtt} ms")
+        st.write(f"Maximal RTT: {max_rtt} ms")
+        st.write(f"Average RTT: {avg_rtt} ms")
+        
+        # Generating the Drop-Down Menu with the Different Analysis
+        drop_down_menu(df, sender)
+
+    if diagnostics:
+        diagnostics_panel()
+    if profiling.METRICS_FILE:
+        profiling.write_metrics(profiling.METRICS_FILE)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""Benchmarks of the analysis stages on synthetic SRT log files.
+
+Every stage of the analysis of a log file is timed and memory-profiled: parse, format, summary stats,
+top-N tables, anomaly checks, export, chart data preparation, the 10s rolling stats, the distribution
+sketches and the whole streaming analysis. The synthetic log files are generated once into the data
+directory and reused by the following runs. The results are appended to a JSON Lines file with the commit and the library
+versions, so the runs can be compared over time. The peak memory is measured with tracemalloc in a
+separate pass, which tracks the NumPy and Python allocations, but not the ones of Arrow.
+
+Usage:
+    python benchmarks/bench.py --rows 10000 100000 1000000
+    python benchmarks/bench.py --rows 10000000 50000000 --role both --no-memory
+    python benchmarks/bench.py --compare 2
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from srt_analyzer.core import df_format, line_tables  # noqa: E402
+from srt_analyzer.downsample import downsample  # noqa: E402
+from srt_analyzer.events import detect_events  # noqa: E402
+from srt_analyzer.export import export_frame  # noqa: E402
+from srt_analyzer.ingest import analyze_stream  # noqa: E402
+from srt_analyzer.rolling import rolling_stats  # noqa: E402
+from srt_analyzer.rollup import rollup_pyramid  # noqa: E402
+from srt_analyzer.schema import read_log  # noqa: E402
+from srt_analyzer.sketch import distributions  # noqa: E402
+from srt_analyzer.summary import summarize  # noqa: E402
+from srt_analyzer.synthetic import write_log  # noqa: E402
+
+# Sizes of the log files benchmarked by default, the suite is meant to cover 10k to 50M rows
+DEFAULT_ROWS = [10000, 100000, 1000000]
+
+# Results of all runs, one JSON object per stage
+RESULTS_PATH = os.path.join(REPO_DIR, "benchmarks", "results.jsonl")
+
+# Directory of the generated log files
+DATA_DIR = os.path.join(tempfile.gettempdir(), "srt_bench")
+
+
+def _export(dataframe):
+    """Exports the whole dataframe into a Parquet file and removes it"""
+    os.remove(export_frame(dataframe, "parquet"))
+
+
+def _chart(dataframe):
+    """Prepares the data of the Bandwidth Plot from the rows and from the rollup pyramid"""
+    downsample(dataframe, "Seconds", "mbpsBandwidth")
+    rollup_pyramid(dataframe)
+
+
+def stages(path, sender):
+    """Returns the benchmarked stages in the order of the analysis. Every stage is given the state
+    shared by the stages and stores its result there.
+
+    Args:
+        path ([str]): Path to the log file
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        stages ([list]): (name, function) of every stage
+    """
+    return [
+        ("parse", lambda state: state.update(raw = read_log(path, sender))),
+        ("format", lambda state: state.update(df = df_format(state.pop("raw"), sender)[0])),
+        ("summary", lambda state: summarize(state["df"]).describe()),
+        ("top_n", lambda state: line_tables(state["df"], sender, 10)),
+        ("anomalies", lambda state: detect_events(state["df"], sender)),
+        ("export", lambda state: _export(state["df"])),
+        ("chart", lambda state: _chart(state["df"])),
+        ("rolling", lambda state: rolling_stats(state["df"], sender, 10)),
+        ("sketch", lambda state: distributions(state["df"])),
+        ("stream", lambda state: analyze_stream(path)),
+    ]
+
+
+def run_stages(path, sender, memory = True):
+    """Times every stage and optionally measures its peak memory in a second pass. A failing stage is
+    recorded with its error and the following stages still run, so a single regression doesn't lose
+    the timings of the whole run.
+
+    Args:
+        path ([str]): Path to the log file
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        memory ([bool]): False to skip the memory profiling pass
+
+    Returns:
+        measures ([dict]): Stage names mapped to the elapsed seconds, the peak memory in MB and the
+            error of a failed stage
+    """
+    measures = {}
+    state = {}
+    for name, stage in stages(path, sender):
+        gc.collect()
+        start = time.perf_counter()
+        try:
+            stage(state)
+            measures[name] = {"seconds": round(time.perf_counter() - start, 4), "peak_mb": None,
+                              "error": None}
+        except Exception as error:
+            measures[name] = {"seconds": None, "peak_mb": None, "error": f"{type(error).__name__}: {error}"}
+    if memory:
+        state = {}
+        for name, stage in stages(path, sender):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                stage(state)
+                measures[name]["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+            except Exception:
+                # The error was already recorded by the timing pass
+                pass
+            finally:
+                tracemalloc.stop()
+    return measures
+
+
+def log_path(rows, sender, seed, data_dir = DATA_DIR):
+    """Returns the path of a synthetic log file, generating it on the first use
+
+    Args:
+        rows ([integer]): Number of rows
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        seed ([integer]): Seed of the generator
+        data_dir ([str]): Directory of the generated log files
+
+    Returns:
+        path ([str]): Path to the log file
+    """
+    os.makedirs(data_dir, exist_ok = True)
+    role = "sender" if sender else "receiver"
+    path = os.path.join(data_dir, f"{role}_{rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {path}...", file = sys.stderr)
+        write_log(f"{path}.tmp", rows, sender, seed = seed)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _commit():
+    """Returns the short hash of the benchmarked commit, None outside of a git checkout"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd = REPO_DIR,
+                                       stderr = subprocess.DEVNULL, text = True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(rows_list, roles, seed = 0, memory = True, data_dir = DATA_DIR):
+    """Benchmarks the stages on log files of every size and role
+
+    Args:
+        rows_list ([list]): Numbers of rows of the log files
+        roles ([list]): True for SRT Sender and False for SRT Receiver
+        seed ([integer]): Seed of the generator
+        memory ([bool]): False to skip the memory profiling pass
+        data_dir ([str]): Directory of the generated log files
+
+    Returns:
+        results ([list]): Result of every stage as a flat record
+    """
+    run = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    environment = {"run": run, "commit": _commit(), "python": platform.python_version(),
+                   "pandas": pd.__version__, "numpy": np.__version__}
+    results = []
+    for rows in rows_list:
+        for sender in roles:
+            path = log_path(rows, sender, seed, data_dir)
+            for stage, measure in run_stages(path, sender, memory).items():
+                role = "sender" if sender else "receiver"
+                if measure["error"] is not None:
+                    results.append(dict(environment, rows = rows, role = role, stage = stage,
+                                        rows_per_s = None, **measure))
+                    print(f"{rows:>10} {role:>8} {stage:>10} failed: {measure['error']}")
+                    continue
+                results.append(dict(environment, rows = rows, role = role, stage = stage,
+                                    rows_per_s = round(rows / max(measure["seconds"], 1e-9)), **measure))
+                print(f"{rows:>10} {role:>8} {stage:>10} {measure['seconds']:>10.4f} s "
+                      f"{measure['peak_mb'] if measure['peak_mb'] is not None else '-':>10} MB")
+    return results
+
+
+def save_results(results, path = RESULTS_PATH):
+    """Appends the results to the JSON Lines file of all runs
+
+    Args:
+        results ([list]): Result of every stage
+        path ([str]): Path of the results file
+    """
+    with open(path, "a") as results_file:
+        for result in results:
+            results_file.write(json.dumps(result) + "\n")
+
+
+def compare(runs = 2, path = RESULTS_PATH):
+    """Compares the elapsed time of every stage across the last runs
+
+    Args:
+        runs ([integer]): Number of the compared runs
+        path ([str]): Path of the results file
+
+    Returns:
+        comparison_df ([dataframe]): Seconds of every stage per run and the ratio of the last run to
+            the run before it
+    """
+    results_df = pd.read_json(path, lines = True)
+    last_runs = sorted(results_df.run.unique())[-runs:]
+    results_df = results_df[results_df.run.isin(last_runs)]
+    comparison_df = results_df.pivot_table(index = ["rows", "role", "stage"], columns = "run",
+                                           values = "seconds", sort = False)
+    if len(last_runs) > 1:
+        comparison_df["ratio"] = (comparison_df[last_runs[-1]] / comparison_df[last_runs[-2]]).round(3)
+    return comparison_df
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(description = "Benchmark the analysis stages on synthetic SRT logs")
+    parser.add_argument("--rows", type = int, nargs = "+", default = DEFAULT_ROWS,
+                        help = f"numbers of rows of the log files (default: {DEFAULT_ROWS})")
+    parser.add_argument("--role", choices = ("sender", "receiver", "both"), default = "sender")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--no-memory", action = "store_true", help = "skip the memory profiling pass")
+    parser.add_argument("--data-dir", default = DATA_DIR,
+                        help = f"directory of the generated log files (default: {DATA_DIR})")
+    parser.add_argument("--results", default = RESULTS_PATH,
+                        help = f"results file (default: {RESULTS_PATH})")
+    parser.add_argument("--compare", type = int, nargs = "?", const = 2, metavar = "RUNS",
+                        help = "compare the last runs instead of benchmarking (default: 2)")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    """Entry point of the benchmarks
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): 0 if every stage succeeded, 1 otherwise
+    """
+    args = parse_args(argv)
+    if args.compare is not None:
+        print(compare(args.compare, args.results).to_string())
+        return 0
+    roles = {"sender": [True], "receiver": [False], "both": [True, False]}[args.role]
+    results = benchmark(args.rows, roles, args.seed, not args.no_memory, args.data_dir)
+    save_results(results, args.results)
+    return 1 if any(result["error"] is not None for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Regression check of the log file readers on synthetic SRT log files.
+
+A sender and a receiver log file are generated and read by every entry point of the analysis: the
+role detection, the whole-file parse, the chunked parse and the streaming analysis. Every reader has to
+accept both log files and return all of their rows, a failure is reported with its exception.
+
+Usage:
+    python benchmarks/readers.py
+    python benchmarks/readers.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from srt_analyzer.ingest import analyze_stream, is_sender, read_chunks  # noqa: E402
+from srt_analyzer.schema import read_log  # noqa: E402
+from srt_analyzer.synthetic import write_log  # noqa: E402
+
+
+def readers(path, sender):
+    """Returns the readers of a log file, every one returns the detected role or the number of rows
+
+    Args:
+        path ([str]): Path to the log file
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        readers ([list]): (name, function) of every reader
+    """
+    return [
+        ("is_sender", lambda: is_sender(path)),
+        ("read_log", lambda: len(read_log(path, sender))),
+        ("read_log untyped", lambda: len(read_log(path, sender, typed = False))),
+        ("read_chunks", lambda: sum(len(chunk) for chunk in read_chunks(path, sender, 1000))),
+        ("analyze_stream", lambda: analyze_stream(path, 1000).num_rows),
+    ]
+
+
+def check_readers(rows = 5000):
+    """Reads a generated sender and receiver log file with every reader
+
+    Args:
+        rows ([integer]): Number of rows of the generated log files
+
+    Returns:
+        failures ([list]): Descriptions of the readers which failed or returned a wrong result
+    """
+    failures = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for sender in (True, False):
+            role = "sender" if sender else "receiver"
+            path = os.path.join(data_dir, f"{role}.csv")
+            write_log(path, rows, sender)
+            for name, reader in readers(path, sender):
+                expected = sender if name == "is_sender" else rows
+                try:
+                    result = reader()
+                except Exception as error:
+                    result = f"{type(error).__name__}: {error}"
+                print(f"{role:8} {name:18} {result}")
+                if result != expected:
+                    failures.append(f"{name} of the {role} log returned {result} instead of {expected}")
+    return failures
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(description = "Check the log file readers on generated log files")
+    parser.add_argument("--rows", type = int, default = 5000, help = "rows per log file (default: 5000)")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    """Entry point of the reader check
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): 0 if every reader accepts both log files, 1 otherwise
+    """
+    args = parse_args(argv)
+    failures = check_readers(args.rows)
+    for failure in failures:
+        print(failure, file = sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Startup budget of the analysis modules.
+
+The worker processes of the multi-file comparison, the batch analyzer and the cold starts of the
+container all pay for the imports of the analysis modules before the first row is parsed. Every module
+is imported in a fresh interpreter several times and the median wall time is compared with its
+budget. The UI-free modules must not import the heavy optional modules of the web portal and the
+exports at all, which is checked in the same interpreter.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --scale 2
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median import time in seconds allowed per module, pandas alone takes most of the budget
+STARTUP_BUDGET = {
+    "srt_analyzer.core": 0.8,
+    "srt_analyzer.cli": 0.8,
+    "srt_analyzer.jobs": 0.8,
+    "srt_analyzer.compare": 0.8,
+    "app": 2.0,
+}
+
+# Modules which are imported only when they are used, they must not be loaded by the UI-free modules
+DEFERRED_MODULES = ["streamlit", "altair", "xlsxwriter", "prometheus_client", "pyarrow.parquet", "zstandard"]
+
+# Imports a module and prints the elapsed time and the deferred modules which were loaded anyway
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def import_time(module, runs = 5):
+    """Measures the import time of a module in fresh interpreters
+
+    Args:
+        module ([str]): Name of the module
+        runs ([integer]): Number of interpreters
+
+    Returns:
+        seconds ([float]): Median import time in seconds
+        loaded ([list]): Deferred modules loaded by the import
+    """
+    probe = _PROBE.format(module = module, deferred = DEFERRED_MODULES)
+    times = []
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd = REPO_DIR, check = True,
+                                capture_output = True, text = True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded = result["loaded"]
+    return statistics.median(times), loaded
+
+
+def check_startup(runs = 5, scale = 1.0):
+    """Checks the import time of every module against its budget
+
+    Args:
+        runs ([integer]): Number of interpreters per module
+        scale ([float]): Factor applied to all budgets, for slower machines
+
+    Returns:
+        failures ([list]): Descriptions of the exceeded budgets and the deferred modules loaded too early
+    """
+    failures = []
+    for module, budget in STARTUP_BUDGET.items():
+        seconds, loaded = import_time(module, runs)
+        budget = budget * scale
+        print(f"{module:24} {seconds:7.3f}s  budget {budget:5.2f}s  loaded {', '.join(loaded) or '-'}")
+        if seconds > budget:
+            failures.append(f"{module} takes {seconds:.3f}s to import, over the budget of {budget:.2f}s")
+        if module != "app" and loaded:
+            failures.append(f"{module} imports the deferred modules {', '.join(loaded)}")
+    return failures
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(description = "Check the import times of the analysis modules")
+    parser.add_argument("--runs", type = int, default = 5, help = "interpreters per module (default: 5)")
+    parser.add_argument("--scale", type = float, default = 1.0,
+                        help = "factor applied to all budgets (default: 1.0)")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    """Entry point of the startup check
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): 0 if all modules are within their budget, 1 otherwise
+    """
+    args = parse_args(argv)
+    failures = check_startup(args.runs, args.scale)
+    for failure in failures:
+        print(failure, file = sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""SRT Log Analyzer core package.
+
+Contains the analysis logic of the SRT Log Analyzer which doesn't depend on the Streamlit web portal,
+so it can be reused for processing of large log files.
+"""
@@ -0,0 +1,212 @@
+"""Columnar on-disk cache of the formatted log files.
+
+After the first load the cleaned and typed dataframe is stored as an uncompressed Feather file, which
+is keyed by the hash of the original log file content. Re-opening the same log file memory-maps the
+Feather file instead of parsing the CSV file again, and the numeric columns of the dataframe are
+read-only views of the mapped file rather than copies. The least recently used entries are evicted
+when the total size of the cache, including the rollup pyramids and the path index, exceeds its limit.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Location and maximal size of the cache, which can be overridden by environment variables
+DEFAULT_CACHE_DIR = os.environ.get("SRT_CACHE_DIR",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "srt_log_analyzer"))
+DEFAULT_MAX_SIZE = int(os.environ.get("SRT_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+
+# Size of the blocks in which the log files are hashed
+HASH_BLOCK_SIZE = 1024 ** 2
+
+# Layout version of the cached dataframes, entries of older versions are parsed again
+FORMAT_VERSION = b"2"
+
+# File remembering the hashes of the local log files, so they are not hashed on every open
+PATH_INDEX = "paths.json"
+
+
+def content_hasher():
+    """Returns a new hasher of the log file content, which can be fed incrementally, like while a log
+    file is uploaded, and gives the same digest as file_hash
+
+    Returns:
+        hasher ([blake2b]): BLAKE2b hasher
+    """
+    return hashlib.blake2b(digest_size = 20)
+
+
+def _hash_stream(stream):
+    """Hashes the content of a binary stream block by block
+
+    Args:
+        stream ([file]): Binary file buffer
+
+    Returns:
+        digest ([str]): Hexadecimal BLAKE2b digest of the content
+    """
+    hasher = content_hasher()
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+        hasher.update(block)
+    return hasher.hexdigest()
+
+
+def file_hash(source, cache_dir = DEFAULT_CACHE_DIR):
+    """Returns the hash of the log file content, which is used as a cache key.
+
+    The hashes of the local log files are remembered together with their size and modification time,
+    so an unchanged log file is hashed only once.
+
+    Args:
+        source ([str or file]): Path to the log file or a binary file buffer
+        cache_dir ([str]): Cache directory
+
+    Returns:
+        digest ([str]): Hash of the log file content
+    """
+    if hasattr(source, "read"):
+        source.seek(0)
+        digest = _hash_stream(source)
+        source.seek(0)
+        return digest
+
+    path = os.path.abspath(source)
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    index_path = os.path.join(cache_dir, PATH_INDEX)
+    try:
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(path)
+    if entry and entry["signature"] == signature:
+        return entry["digest"]
+
+    with open(path, "rb") as log_file:
+        digest = _hash_stream(log_file)
+    index[path] = {"signature": signature, "digest": digest}
+    os.makedirs(cache_dir, exist_ok = True)
+    _atomic_write(index_path, lambda tmp_path: _dump_json(index, tmp_path))
+    return digest
+
+
+def _dump_json(data, path):
+    """Writes the data as JSON file"""
+    with open(path, "w") as json_file:
+        json.dump(data, json_file)
+
+
+def _atomic_write(path, write):
+    """Writes a file through a temporary file in the same directory, so readers never see partial files
+
+    Args:
+        path ([str]): Destination path
+        write ([function]): Function writing the content to the path it is called with
+    """
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _entry_path(key, cache_dir):
+    """Returns the path of the cached Feather file for a given key"""
+    return os.path.join(cache_dir, f"{key}.feather")
+
+
+def rollup_path(key, cache_dir = DEFAULT_CACHE_DIR):
+    """Returns the path of the persisted rollup pyramid of a cached log file
+
+    Args:
+        key ([str]): Hash of the log file content
+        cache_dir ([str]): Cache directory
+
+    Returns:
+        path ([str]): Path of the Parquet file of the pyramid
+    """
+    os.makedirs(cache_dir, exist_ok = True)
+    return os.path.join(cache_dir, f"{key}.rollup.parquet")
+
+
+def load(key, cache_dir = DEFAULT_CACHE_DIR):
+    """Loads a formatted log file from the cache, memory-mapping the Feather file and keeping the
+    numeric columns as zero-copy views of the mapped file
+
+    Args:
+        key ([str]): Hash of the log file content
+        cache_dir ([str]): Cache directory
+
+    Returns:
+        result ([tuple]): The cached dataframe and the sender flag, or None if the log file isn't cached
+    """
+    path = _entry_path(key, cache_dir)
+    try:
+        table = feather.read_table(path, memory_map = True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    # Refreshing the modification time, which is used as the last access time for the LRU eviction
+    os.utime(path)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"srt_format") != FORMAT_VERSION:
+        return None
+    sender = metadata.get(b"srt_sender") == b"1"
+    # Without consolidating the columns into blocks, the columns without missing values aren't copied
+    return table.to_pandas(split_blocks = True, self_destruct = True), sender
+
+
+def store(key, dataframe, sender, cache_dir = DEFAULT_CACHE_DIR, max_size = DEFAULT_MAX_SIZE):
+    """Stores a formatted log file in the cache and evicts the least recently used entries
+
+    Args:
+        key ([str]): Hash of the log file content
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        cache_dir ([str]): Cache directory
+        max_size ([integer]): Maximal total size of the cache in bytes
+    """
+    os.makedirs(cache_dir, exist_ok = True)
+    table = pa.Table.from_pandas(dataframe, preserve_index = False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"srt_sender"] = b"1" if sender else b"0"
+    metadata[b"srt_format"] = FORMAT_VERSION
+    table = table.replace_schema_metadata(metadata)
+    # Uncompressed Feather files can be memory-mapped on load
+    _atomic_write(_entry_path(key, cache_dir),
+                  lambda tmp_path: feather.write_feather(table, tmp_path, compression = "uncompressed"))
+    evict(cache_dir, max_size)
+
+
+def evict(cache_dir = DEFAULT_CACHE_DIR, max_size = DEFAULT_MAX_SIZE):
+    """Removes the least recently used entries until the cache fits into its maximal size
+
+    Args:
+        cache_dir ([str]): Cache directory
+        max_size ([integer]): Maximal total size of the cache in bytes
+    """
+    entries = []
+    total_size = 0
+    for name in os.listdir(cache_dir):
+        # The rollup pyramids and the path index count towards the size of the cache as well
+        if name.endswith((".feather", ".rollup.parquet")) or name == PATH_INDEX:
+            stat = os.stat(os.path.join(cache_dir, name))
+            total_size += stat.st_size
+            if name.endswith(".feather"):
+                entries.append((stat.st_mtime, stat.st_size, name))
+    for _, size, name in sorted(entries):
+        if total_size <= max_size:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total_size -= size
+        # The rollup pyramid of an evicted log file is removed together with it
+        pyramid_path = os.path.join(cache_dir, name.replace(".feather", ".rollup.parquet"))
+        if os.path.exists(pyramid_path):
+            total_size -= os.path.getsize(pyramid_path)
+            os.remove(pyramid_path)
@@ -0,0 +1,252 @@
+"""Headless command-line batch analyzer of the SRT CSV log files.
+
+Analyzes many log files in parallel across a pool of processes and writes a consolidated summary table
+with a row per log file. Every log file is analyzed in streaming mode, so the memory usage of a worker
+doesn't depend on the size of the log file. Streamlit is never imported.
+
+With --index only the new or modified log files are analyzed and their stats are stored into the
+fleet index, which can then be queried with --query without parsing the log files again. The
+--percentiles option prints the tail percentiles of the matching sessions, merged from their sketches.
+
+Usage:
+    python -m srt_analyzer /path/to/logs "/archive/2020-*/*.csv" --output summary.csv --jobs 8
+    python -m srt_analyzer /archive --index
+    python -m srt_analyzer --query "max_rtt_ms > 300 OR dropped_total > 0"
+    python -m srt_analyzer --query "role = 'sender'" --percentiles
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from srt_analyzer import index
+from srt_analyzer.ingest import DEFAULT_CHUNKSIZE, analyze_stream
+from srt_analyzer.rollup import pyramid_path
+from srt_analyzer.schema import COMPRESSED_EXTENSIONS
+
+
+def find_logs(patterns):
+    """Expands directories and glob patterns into a sorted list of log files
+
+    Args:
+        patterns ([list]): Paths of log files or directories and glob patterns
+
+    Returns:
+        paths ([list]): Paths of the log files without duplicates
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for extension in ["csv"] + [f"csv.{compressed}" for compressed in COMPRESSED_EXTENSIONS]:
+                paths.update(glob.glob(os.path.join(pattern, f"*.{extension}")))
+        elif glob.has_magic(pattern):
+            paths.update(path for path in glob.glob(pattern, recursive = True) if os.path.isfile(path))
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+def analyze_file(path, chunksize = DEFAULT_CHUNKSIZE, rollup = False, sketches = False):
+    """Analyzes a single log file, which is run in a worker process
+
+    Args:
+        path ([str]): Path to the log file
+        chunksize ([integer]): Maximal number of rows in a chunk
+        rollup ([bool]): True to persist the rollup pyramid of the log file next to it
+        sketches ([bool]): True to return the distribution sketches of the log file as well
+
+    Returns:
+        record ([dict]): Stats of the log file or the error which prevented the analysis
+    """
+    try:
+        stats = analyze_stream(path, chunksize)
+        record = stats.record()
+        if sketches:
+            record["distributions"] = stats.distributions
+        pyramid = stats.rollup.finish() if rollup else None
+        if pyramid is not None:
+            pyramid.save(pyramid_path(path))
+        record["error"] = None
+    except Exception as error:
+        record = {"error": f"{type(error).__name__}: {error}"}
+    record["file"] = path
+    return record
+
+
+def analyze_files(paths, jobs = None, chunksize = DEFAULT_CHUNKSIZE, rollup = False, sketches = False):
+    """Analyzes the log files in parallel across a pool of processes
+
+    Args:
+        paths ([list]): Paths of the log files
+        jobs ([integer]): Number of worker processes, the number of CPU cores by default
+        chunksize ([integer]): Maximal number of rows in a chunk
+        rollup ([bool]): True to persist the rollup pyramid of every log file next to it
+        sketches ([bool]): True to add the distribution sketches of every log file in the
+            distributions column
+
+    Returns:
+        summary_df ([dataframe]): Summary table with a row per log file
+    """
+    if jobs == 1 or len(paths) <= 1:
+        records = [analyze_file(path, chunksize, rollup, sketches) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers = jobs) as executor:
+            records = list(executor.map(analyze_file, paths, [chunksize] * len(paths),
+                                        [rollup] * len(paths), [sketches] * len(paths)))
+    # Nullable dtypes keep the integer columns as integers when some of the log files failed
+    summary_df = pd.DataFrame.from_records(records).convert_dtypes()
+    if summary_df.empty:
+        return summary_df
+    # Placing the file name first and the errors last
+    cols = ["file"] + [col for col in summary_df.columns if col not in ("file", "error")] + ["error"]
+    return summary_df[cols]
+
+
+def index_files(paths, index_path = index.DEFAULT_INDEX_PATH, jobs = None, chunksize = DEFAULT_CHUNKSIZE,
+                rollup = False):
+    """Analyzes the new or modified log files and stores their stats into the fleet index
+
+    Args:
+        paths ([list]): Paths of the log files
+        index_path ([str]): Path of the fleet index
+        jobs ([integer]): Number of worker processes, the number of CPU cores by default
+        chunksize ([integer]): Maximal number of rows in a chunk
+        rollup ([bool]): True to persist the rollup pyramid of every analyzed log file next to it
+
+    Returns:
+        summary_df ([dataframe]): Indexed stats of all given log files
+    """
+    paths = [os.path.abspath(path) for path in paths]
+    conn = index.connect(index_path)
+    try:
+        stale = index.stale_paths(conn, paths)
+        if stale:
+            index.upsert(conn, analyze_files(stale, jobs, chunksize, rollup, sketches = True))
+        sessions_df = index.query(conn, order_by = "file")
+    finally:
+        conn.close()
+    return sessions_df[sessions_df.file.isin(paths)].reset_index(drop = True)
+
+
+def query_index(where, index_path = index.DEFAULT_INDEX_PATH):
+    """Queries the fleet index without touching the log files
+
+    Args:
+        where ([str]): SQL WHERE clause, all sessions are returned for an empty clause
+        index_path ([str]): Path of the fleet index
+
+    Returns:
+        sessions_df ([dataframe]): Matching sessions with a row per log file
+    """
+    conn = index.connect(index_path, read_only = True)
+    try:
+        return index.query(conn, where)
+    finally:
+        conn.close()
+
+
+def fleet_percentiles(where, index_path = index.DEFAULT_INDEX_PATH):
+    """Estimates the tail percentiles of the indexed sessions from their merged sketches
+
+    Args:
+        where ([str]): SQL WHERE clause selecting the sessions, all sessions for an empty clause
+        index_path ([str]): Path of the fleet index
+
+    Returns:
+        percentiles_df ([dataframe]): Count and percentiles with a row per metric
+    """
+    conn = index.connect(index_path, read_only = True)
+    try:
+        return index.distributions(conn, where).percentiles()
+    finally:
+        conn.close()
+
+
+def write_summary(summary_df, output):
+    """Writes the summary table as CSV, Parquet or Excel file depending on the file extension
+
+    Args:
+        summary_df ([dataframe]): Summary table
+        output ([str]): Path of the output file
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension == ".parquet":
+        summary_df.to_parquet(output, index = False)
+    elif extension == ".xlsx":
+        summary_df.to_excel(output, index = False)
+    else:
+        summary_df.to_csv(output, index = False)
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(prog = "srt_analyzer",
+                                     description = "Analyze SRT CSV log files in batch")
+    parser.add_argument("logs", nargs = "*", help = "log files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help = "output summary file (.csv, .parquet or .xlsx), "
+                                                 "printed to stdout by default")
+    parser.add_argument("-j", "--jobs", type = int, default = None,
+                        help = "number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--chunksize", type = int, default = DEFAULT_CHUNKSIZE,
+                        help = f"rows parsed at once (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--rollup", action = "store_true",
+                        help = "save the 1s/10s/1min/10min rollup pyramid next to every log file")
+    parser.add_argument("--index", action = "store_true",
+                        help = "analyze only the new or modified log files and store them in the fleet index")
+    parser.add_argument("--index-path", default = index.DEFAULT_INDEX_PATH,
+                        help = f"fleet index database (default: {index.DEFAULT_INDEX_PATH})")
+    parser.add_argument("--query", metavar = "WHERE",
+                        help = "print the indexed sessions matching an SQL WHERE clause, "
+                               "e.g. \"max_rtt_ms > 300 OR dropped_total > 0\"")
+    parser.add_argument("--percentiles", action = "store_true",
+                        help = "print the tail percentiles of the indexed sessions matching --query, "
+                               "of all indexed sessions without it")
+    args = parser.parse_args(argv)
+    if not args.logs and args.query is None and not args.percentiles:
+        parser.error("either log files, --query or --percentiles are required")
+    return args
+
+
+def main(argv = None):
+    """Entry point of the command-line batch analyzer
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): 0 if all log files were analyzed, 1 otherwise
+    """
+    args = parse_args(argv)
+    failed = pd.DataFrame()
+    summary_df = None
+    if args.logs:
+        paths = find_logs(args.logs)
+        if not paths:
+            print("No log files found", file = sys.stderr)
+            return 1
+        if args.index:
+            summary_df = index_files(paths, args.index_path, args.jobs, args.chunksize, args.rollup)
+        else:
+            summary_df = analyze_files(paths, args.jobs, args.chunksize, args.rollup)
+        failed = summary_df[summary_df.error.notna()]
+    if args.query is not None:
+        try:
+            summary_df = query_index(args.query, args.index_path)
+        except sqlite3.Error as error:
+            print(f"Query of the fleet index {args.index_path} failed: {error}", file = sys.stderr)
+            return 1
+    if summary_df is not None and args.output:
+        write_summary(summary_df, args.output)
+    elif summary_df is not None:
+        print(summary_df.to_string(index = False))
+    if args.percentiles:
+        try:
+            print(fleet_percentiles(args.query, args.index_path).to_string())
+        except sqlite3.Error as error:
+            print(f"Percentiles of the fleet index {args.index_path} failed: {error}", file = sys.stderr)
+            return 1
+    for _, row in failed.iterrows():
+        print(f"{row.file}: {row.error}", file = sys.stderr)
+    return 1 if len(failed) else 0
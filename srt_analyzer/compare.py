@@ -0,0 +1,97 @@
+"""Side-by-side comparison of several log files, like the captures of the same link at different times.
+
+Every log file is analyzed in streaming mode in its own worker process, so the total time is bounded
+by the slowest log file and not by the sum of all of them, as long as there are enough CPU cores. The
+workers return the main stats of the log file and its rollup pyramid, from which the bandwidth and RTT
+series of all log files are drawn at the same resolution on a shared time axis.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from srt_analyzer.downsample import DEFAULT_POINTS
+from srt_analyzer.ingest import DEFAULT_CHUNKSIZE, analyze_stream
+
+# Stats of the side-by-side table, the same as the ones of the general stats and the Line Bandwidth Stats
+COMPARED_STATS = ["role", "rows", "duration_s", "latency_ms", "min_rtt_ms", "max_rtt_ms", "avg_rtt_ms",
+                  "p99_rtt_ms", "p999_rtt_ms", "min_bandwidth_mbps", "lost_max", "lost_total", "dropped_max",
+                  "dropped_total", "retransmitted_max", "retransmitted_total", "flow_window_violations",
+                  "congestion_window_violations"]
+
+
+def compare_file(source, chunksize = DEFAULT_CHUNKSIZE):
+    """Analyzes a single log file, which is run in a worker process
+
+    Args:
+        source ([str or bytes]): Path to the log file or the content of an uploaded log file
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        record ([dict]): Stats of the log file or the error which prevented the analysis
+        pyramid ([Pyramid]): Rollup pyramid of the log file, None if it failed or has no rows
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        stats = analyze_stream(source, chunksize)
+    except Exception as error:
+        return {"error": f"{type(error).__name__}: {error}"}, None
+    record = stats.record()
+    record["error"] = None
+    return record, stats.rollup.finish()
+
+
+def compare_files(sources, names, jobs = None, chunksize = DEFAULT_CHUNKSIZE):
+    """Analyzes the log files at the same time, each of them in its own worker process
+
+    Args:
+        sources ([list]): Paths to the log files or the contents of the uploaded log files
+        names ([list]): Unique names of the log files shown in the table and the charts
+        jobs ([integer]): Maximal number of worker processes, the number of CPU cores by default
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        stats_df ([dataframe]): Side-by-side table with a column per log file and a row per stat
+        pyramids ([dict]): Rollup pyramids keyed by the name of the log file
+    """
+    workers = min(len(sources), jobs or os.cpu_count() or 1)
+    if workers <= 1:
+        results = [compare_file(source, chunksize) for source in sources]
+    else:
+        # Spawned workers don't inherit the threads of the web server, which forked workers would do
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers = workers, mp_context = context) as executor:
+            results = list(executor.map(compare_file, sources, [chunksize] * len(sources)))
+    records = {name: record for name, (record, _) in zip(names, results)}
+    stats_df = pd.DataFrame(records).reindex(COMPARED_STATS + ["error"])
+    if stats_df.loc["error"].isna().all():
+        stats_df = stats_df.drop(index = "error")
+    pyramids = {name: pyramid for name, (_, pyramid) in zip(names, results) if pyramid is not None}
+    return stats_df, pyramids
+
+
+def overlay_series(pyramids, metric, max_points = DEFAULT_POINTS):
+    """Returns the series of a metric of all log files at the same resolution, which is selected for
+    the longest log file, so the series can be overlaid on a shared time axis
+
+    Args:
+        pyramids ([dict]): Rollup pyramids keyed by the name of the log file
+        metric ([str]): Metric column
+        max_points ([integer]): Maximal number of plotted buckets of a log file
+
+    Returns:
+        series_df ([dataframe]): Name of the log file, start of the bucket in seconds and the min, max
+            and mean values
+    """
+    if not pyramids:
+        return pd.DataFrame(columns = ["file", "Seconds", "min", "max", "mean"])
+    spans = [pyramid.levels[min(pyramid.levels)].index for pyramid in pyramids.values()]
+    x_range = (float(min(span[0] for span in spans)), float(max(span[-1] for span in spans) + 1))
+    resolution = next(iter(pyramids.values())).resolution_for(x_range, max_points)
+    frames = []
+    for name, pyramid in pyramids.items():
+        if metric in pyramid.metrics:
+            frames.append(pyramid.series(metric, resolution).assign(file = name))
+    series_df = pd.concat(frames, ignore_index = True)
+    return series_df[["file", "Seconds", "min", "max", "mean"]]
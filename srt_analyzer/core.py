@@ -0,0 +1,122 @@
+"""UI-free analysis core of a single log file.
+
+The formatting of the parsed log file, the RTT stats, the general stats, the line stats tables and
+the flight size checks, which are shown by the web portal, live here without any Streamlit or Altair
+import. So the worker processes, the batch analyzer and the benchmarks only pay for pandas and NumPy
+when they start.
+"""
+from srt_analyzer.events import CONGESTION_WINDOW_EVENT, FLOW_WINDOW_EVENT, detect_events
+from srt_analyzer.ingest import format_chunk, with_time_labels
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+from srt_analyzer.schema import RECEIVER_COLUMNS, RECEIVER_IMPAIRMENTS, SENDER_COLUMNS, SENDER_IMPAIRMENTS
+from srt_analyzer.summary import summarize
+from srt_analyzer.topk import topk_index
+
+
+@profiled("format")
+def df_format(dataframe, sender):
+    """Formats the Dataframe and removes the redundant columns whether the log files are for
+    receiver or sender device
+
+    Args:
+        dataframe ([dataframe]): Input dataframe
+        sender ([bool]): Returns True if the logs are for a SRT sender and False for SRT receiver
+
+    Returns:
+        cleaned_df ([dataframe]): Output and cleaned dataframe
+        num_rows ([integer]): Number of Rows of the new Cleaned Dataframe
+        num_cols ([integers]): Number of Columns in the new cleaned Dataframe
+    """
+    # Dropping the Receiver Columns for SRT Sender and the Sender Columns for SRT Receiver, the columns
+    # which are already skipped at parse time are ignored, so the parsed columns aren't copied
+    redundant = (RECEIVER_COLUMNS if sender else SENDER_COLUMNS) + ["SocketID"]
+    redundant = [col for col in redundant if col in dataframe.columns]
+    cleaned_df = dataframe.drop(redundant, axis = 1) if redundant else dataframe
+    # The Time column keeps the elapsed time in milliseconds, the Seconds column is placed at the
+    # beginning and the human readable times are formatted only for the displayed rows
+    cleaned_df = format_chunk(cleaned_df)
+    # Finding out the number of rows and columns
+    num_rows = cleaned_df.shape[0]
+    num_cols = cleaned_df.shape[1]
+
+    return cleaned_df, num_rows, num_cols
+
+
+def rtt_calc(dataframe):
+    """Calculates the minimum, maximum and average Round Trip Time(RTT)
+
+    Args:
+        dataframe ([dataframe]): Input Dataframe
+
+    Returns:
+        min_rtt ([float]): Minimum Round Trip Time in ms
+        max_rtt ([float]): Maximum Round Trip Time in ms
+        avg_rtt ([float]): Average Round Trip Time in ms
+    """
+    return summarize(dataframe).rtt()
+
+
+@memoized
+def general_stats(dataframe):
+    """Calculates the general stats of every column of the dataframe
+
+    Args:
+        dataframe ([dataframe]): Input Dataframe
+
+    Returns:
+        stats_df ([dataframe]): Transposed output of the describe method
+    """
+    return summarize(dataframe).describe()
+
+
+@memoized
+def line_tables(dataframe, sender, num_rows):
+    """Returns Dataframes containing the N number of rows with the lowest mbpsBandwidth and the highest
+    number of Lost, Dropped and Retransmitted Data Packets
+
+    Args:
+        dataframe ([dataframe]): Input Dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        num_rows ([integer]): Defines the number of rows
+
+    Returns:
+        tables ([dict]): Dataframes keyed by the sheet name, None if no such data packets are detected
+    """
+    summary = summarize(dataframe)
+    index = topk_index(dataframe, sender)
+    return index_tables(index, summary, num_rows)
+
+
+def index_tables(index, summary, num_rows):
+    """Looks up the line stats tables in the Top-K index of the log file, which is also built in
+    streaming mode
+
+    Args:
+        index ([TopK]): Top-K index of the log file
+        summary ([Summary]): Summary of the log file
+        num_rows ([integer]): Defines the number of rows
+
+    Returns:
+        tables ([dict]): Dataframes keyed by the sheet name, None if no such data packets are detected
+    """
+    bandwidth_sheet = "mbpsSendRate" if index.sender else "mbpsBandwidth"
+    tables = {bandwidth_sheet: with_time_labels(index.top("mbpsBandwidth", num_rows))}
+    for col in (SENDER_IMPAIRMENTS if index.sender else RECEIVER_IMPAIRMENTS):
+        tables[col] = with_time_labels(index.top(col, num_rows)) if summary.max(col) > 0 else None
+    return tables
+
+
+def window_checks(dataframe, sender):
+    """Checks whether the pktFlightSize exceeds the pktFlowWindow or the pktCongestionWindow
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        flow_events ([dataframe]): Merged intervals in which pktFlightSize > pktFlowWindow
+        congestion_events ([dataframe]): Merged intervals in which pktFlightSize > pktCongestionWindow
+    """
+    events = detect_events(dataframe, sender)
+    return events[events.event == FLOW_WINDOW_EVENT], events[events.event == CONGESTION_WINDOW_EVENT]
@@ -0,0 +1,110 @@
+"""Downsampling of the time series before they are plotted.
+
+Sending every row of a long log file to the browser makes the charts unusable, so the series are
+reduced to a number of points appropriate for the width of the chart. Both methods keep the extremes
+of the series, like the bandwidth dips and the RTT spikes:
+
+* min/max bucketing keeps the minimal and the maximal point of every bucket
+* LTTB (Largest-Triangle-Three-Buckets) keeps the visually most significant point of every bucket
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+
+# Number of points sent to the browser, about two points per pixel of a full width chart
+DEFAULT_POINTS = 2000
+
+
+def minmax_indices(y, max_points):
+    """Selects the positions of the minimal and maximal value of every bucket in linear time
+
+    Args:
+        y ([array]): Values of the series
+        max_points ([integer]): Maximal number of selected positions
+
+    Returns:
+        positions ([array]): Sorted positions of the selected points
+    """
+    num_rows = len(y)
+    if num_rows <= max_points:
+        return np.arange(num_rows)
+    bucket_size = int(np.ceil(num_rows / max(max_points // 2, 1)))
+    num_buckets = int(np.ceil(num_rows / bucket_size))
+    padded = np.full(num_buckets * bucket_size, np.nan)
+    padded[:num_rows] = y
+    buckets = padded.reshape(num_buckets, bucket_size)
+    # The NaN values (including the padding) never win the comparison
+    lowest = np.where(np.isnan(buckets), np.inf, buckets).argmin(axis = 1)
+    highest = np.where(np.isnan(buckets), -np.inf, buckets).argmax(axis = 1)
+    offsets = np.arange(num_buckets) * bucket_size
+    positions = np.unique(np.concatenate([offsets + lowest, offsets + highest]))
+    return positions[positions < num_rows]
+
+
+def lttb_indices(x, y, max_points):
+    """Selects the positions of the points with the Largest-Triangle-Three-Buckets algorithm
+
+    Args:
+        x ([array]): Sorted x values of the series
+        y ([array]): Values of the series
+        max_points ([integer]): Maximal number of selected positions
+
+    Returns:
+        positions ([array]): Sorted positions of the selected points
+    """
+    num_rows = len(y)
+    if num_rows <= max_points or max_points < 3:
+        return np.arange(num_rows)
+    x = np.asarray(x, dtype = np.float64)
+    y = np.asarray(y, dtype = np.float64)
+    # The first and the last points are always kept, the rest is split into equal buckets
+    edges = np.linspace(1, num_rows - 1, max_points - 1).astype(np.int64)
+    positions = np.empty(max_points, dtype = np.int64)
+    positions[0] = 0
+    positions[-1] = num_rows - 1
+    selected = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # The third point of the triangle is the average of the next bucket
+        next_stop = edges[i + 2] if i + 2 < len(edges) else num_rows
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        areas = np.abs((x[selected] - next_x) * (y[start:stop] - y[selected]) -
+                       (x[selected] - x[start:stop]) * (next_y - y[selected]))
+        selected = start + int(np.nanargmax(areas)) if not np.isnan(areas).all() else start
+        positions[i + 1] = selected
+    return positions
+
+
+@memoized
+@profiled("chart_data")
+def downsample(dataframe, x, y, x_range = None, max_points = DEFAULT_POINTS, method = "minmax"):
+    """Reduces a time series of the dataframe to a number of points appropriate for plotting. A
+    narrower x range is resampled at a finer resolution, since the same number of points covers
+    a shorter time.
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe sorted by the x column
+        x ([str]): Column of the x axis, usually Seconds
+        y ([str]): Column of the plotted series
+        x_range ([tuple]): Optional (start, end) of the plotted range in the units of the x column
+        max_points ([integer]): Maximal number of plotted points
+        method ([str]): Either "minmax" or "lttb"
+
+    Returns:
+        points ([dataframe]): Dataframe with the x and y columns of the selected points
+    """
+    x_values = dataframe[x].to_numpy()
+    y_values = dataframe[y].to_numpy()
+    if x_range is not None:
+        start, stop = np.searchsorted(x_values, x_range[0], "left"), np.searchsorted(x_values, x_range[1], "right")
+        x_values = x_values[start:stop]
+        y_values = y_values[start:stop]
+    if method == "lttb":
+        positions = lttb_indices(x_values, y_values, max_points)
+    elif method == "minmax":
+        positions = minmax_indices(y_values.astype(np.float64, copy = False), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return pd.DataFrame({x: x_values[positions], y: y_values[positions]})
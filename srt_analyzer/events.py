@@ -0,0 +1,228 @@
+"""Detection of the events of the line, like congestion and windowing violations or loss bursts.
+
+Every row-level condition is evaluated as a vectorized NumPy mask, which is turned into merged time
+intervals with run-length encoding. Every event has a start, end, duration and the peak value of its
+metric, so a long congestion episode is reported once instead of as thousands of rows. The detection
+runs in linear time, either on a whole dataframe or chunk by chunk, carrying the intervals which are
+still open at the end of a chunk into the next one.
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.ingest import time_labels
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+from srt_analyzer.schema import RECEIVER_IMPAIRMENTS, SENDER_IMPAIRMENTS
+
+# SRT latency should be at least this multiple of the RTT, otherwise lost packets can't be recovered
+DEFAULT_LATENCY_FACTOR = 3
+
+# Bandwidth below this fraction of the median bandwidth is considered a collapse of the bandwidth
+DEFAULT_COLLAPSE_RATIO = 0.5
+
+# Intervals separated by at most this number of rows are merged into a single event
+DEFAULT_MAX_GAP = 0
+
+EVENT_COLUMNS = ["event", "start", "end", "duration_s", "rows", "peak", "start_time"]
+
+FLOW_WINDOW_EVENT = "pktFlightSize > pktFlowWindow"
+CONGESTION_WINDOW_EVENT = "pktFlightSize > pktCongestionWindow"
+
+
+def mask_intervals(mask, max_gap = DEFAULT_MAX_GAP):
+    """Run-length encodes a boolean mask into intervals of consecutive True values
+
+    Args:
+        mask ([array]): Boolean mask
+        max_gap ([integer]): Intervals separated by at most this number of False values are merged
+
+    Returns:
+        starts ([array]): First position of every interval
+        ends ([array]): Position after the last one of every interval
+    """
+    padded = np.concatenate(([0], np.asarray(mask, dtype = np.int8), [0]))
+    changes = np.flatnonzero(np.diff(padded))
+    starts, ends = changes[0::2], changes[1::2]
+    if max_gap > 0 and len(starts) > 1:
+        separate = starts[1:] - ends[:-1] > max_gap
+        starts = starts[np.concatenate(([True], separate))]
+        ends = ends[np.concatenate((separate, [True]))]
+    return starts, ends
+
+
+def _segment_reduce(ufunc, values, starts, ends):
+    """Reduces the values of every interval with a NumPy ufunc in a single vectorized call
+
+    Args:
+        ufunc ([ufunc]): Reduction, like np.maximum or np.minimum
+        values ([array]): Values of the metric
+        starts ([array]): First position of every interval
+        ends ([array]): Position after the last one of every interval
+
+    Returns:
+        reduced ([array]): Reduced value of every interval
+    """
+    if not len(starts):
+        return np.empty(0, dtype = values.dtype)
+    # Interleaving the starts and the ends, reduceat then reduces every interval and every gap
+    indices = np.empty(2 * len(starts), dtype = np.int64)
+    indices[0::2] = starts
+    indices[1::2] = ends
+    if indices[-1] == len(values):
+        indices = indices[:-1]
+    return ufunc.reduceat(values, indices)[0::2]
+
+
+def conditions(dataframe, sender, latency_factor = DEFAULT_LATENCY_FACTOR,
+               collapse_ratio = DEFAULT_COLLAPSE_RATIO, median_bandwidth = None):
+    """Evaluates the row-level conditions of the events
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        latency_factor ([float]): Minimal ratio between the RCVLATENCYms and the msRTT
+        collapse_ratio ([float]): Fraction of the median bandwidth, below which the bandwidth collapsed
+        median_bandwidth ([float]): Median bandwidth of the whole log file, the median of the
+            dataframe by default
+
+    Returns:
+        conditions ([dict]): Event names mapped to the mask, the peak values and the peak reduction
+    """
+    flight = dataframe.pktFlightSize.to_numpy().astype(np.int64)
+    flow = dataframe.pktFlowWindow.to_numpy().astype(np.int64)
+    congestion = dataframe.pktCongestionWindow.to_numpy().astype(np.int64)
+    rtt = dataframe.msRTT.to_numpy()
+    latency = dataframe.RCVLATENCYms.to_numpy()
+    bandwidth = dataframe.mbpsBandwidth.to_numpy()
+    loss_col, drop_col, _ = SENDER_IMPAIRMENTS if sender else RECEIVER_IMPAIRMENTS
+    loss = dataframe[loss_col].to_numpy()
+    drop = dataframe[drop_col].to_numpy()
+    if median_bandwidth is None:
+        median_bandwidth = np.nanmedian(bandwidth) if len(bandwidth) else 0
+    collapse_level = collapse_ratio * median_bandwidth
+
+    return {
+        FLOW_WINDOW_EVENT: (flight > flow, flight, np.maximum),
+        CONGESTION_WINDOW_EVENT: (flight > congestion, flight, np.maximum),
+        f"{loss_col} burst": (loss > 0, loss, np.maximum),
+        f"{drop_col} burst": (drop > 0, drop, np.maximum),
+        f"msRTT above RCVLATENCYms / {latency_factor:g}": (rtt * latency_factor > latency, rtt, np.maximum),
+        f"mbpsBandwidth below {collapse_ratio:.0%} of median": (bandwidth < collapse_level, bandwidth,
+                                                                  np.minimum),
+    }
+
+
+@memoized
+@profiled("anomalies")
+def detect_events(dataframe, sender, latency_factor = DEFAULT_LATENCY_FACTOR,
+                  collapse_ratio = DEFAULT_COLLAPSE_RATIO, max_gap = DEFAULT_MAX_GAP):
+    """Detects the events of the line as merged time intervals
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        latency_factor ([float]): Minimal ratio between the RCVLATENCYms and the msRTT
+        collapse_ratio ([float]): Fraction of the median bandwidth, below which the bandwidth collapsed
+        max_gap ([integer]): Intervals separated by at most this number of rows are merged
+
+    Returns:
+        events_df ([dataframe]): Event name, start and end in seconds, duration, number of rows, peak
+            value of the metric and the human readable start time of every event
+    """
+    seconds = dataframe.Seconds.to_numpy()
+    events = []
+    for name, (mask, values, reduction) in conditions(dataframe, sender, latency_factor,
+                                                      collapse_ratio).items():
+        starts, ends = mask_intervals(mask, max_gap)
+        if not len(starts):
+            continue
+        events.append(pd.DataFrame({
+            "event": name,
+            "start": seconds[starts],
+            "end": seconds[ends - 1],
+            "duration_s": seconds[ends - 1] - seconds[starts],
+            "rows": ends - starts,
+            "peak": _segment_reduce(reduction, values, starts, ends),
+            "start_time": time_labels(dataframe.Time.to_numpy()[starts]),
+        }))
+    if not events:
+        return pd.DataFrame(columns = EVENT_COLUMNS)
+    return pd.concat(events, ignore_index = True)
+
+
+class EventDetector:
+    """Detects the events of the line chunk by chunk, which gives the same events as detect_events on
+    the whole dataframe. Only the intervals are kept, an interval still open at the end of a chunk is
+    extended by the next chunk.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        median_bandwidth ([float]): Median bandwidth of the whole log file, which isn't known from a
+            single chunk, like the estimate of the distribution sketches
+        latency_factor ([float]): Minimal ratio between the RCVLATENCYms and the msRTT
+        collapse_ratio ([float]): Fraction of the median bandwidth, below which the bandwidth collapsed
+        max_gap ([integer]): Intervals separated by at most this number of rows are merged
+    """
+
+    def __init__(self, sender, median_bandwidth, latency_factor = DEFAULT_LATENCY_FACTOR,
+                 collapse_ratio = DEFAULT_COLLAPSE_RATIO, max_gap = DEFAULT_MAX_GAP):
+        self.sender = sender
+        self.median_bandwidth = median_bandwidth
+        self.latency_factor = latency_factor
+        self.collapse_ratio = collapse_ratio
+        self.max_gap = max_gap
+        self.num_rows = 0
+        # Event name mapped to the intervals of every chunk, as a list of
+        # [start row, end row, start in s, end in s, start Time, peak] arrays
+        self.intervals = {}
+
+    def update(self, chunk):
+        """Detects the intervals of a new chunk of the log file
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        seconds = chunk.Seconds.to_numpy()
+        for name, (mask, values, reduction) in conditions(chunk, self.sender, self.latency_factor,
+                                                          self.collapse_ratio,
+                                                          self.median_bandwidth).items():
+            parts = self.intervals.setdefault(name, [])
+            starts, ends = mask_intervals(mask, self.max_gap)
+            if not len(starts):
+                continue
+            part = [starts + self.num_rows, ends + self.num_rows, seconds[starts], seconds[ends - 1],
+                    chunk.Time.to_numpy()[starts], _segment_reduce(reduction, values, starts, ends)]
+            if parts and part[0][0] - parts[-1][1][-1] <= self.max_gap:
+                # The first interval of the chunk continues the last interval of the previous chunks
+                last = parts[-1]
+                last[1][-1], last[3][-1] = part[1][0], part[3][0]
+                last[5][-1] = reduction(last[5][-1], part[5][0])
+                part = [array[1:] for array in part]
+            if len(part[0]):
+                parts.append(part)
+        self.num_rows += len(chunk)
+
+    def finish(self):
+        """Returns the detected events
+
+        Returns:
+            events_df ([dataframe]): Event name, start and end in seconds, duration, number of rows, peak
+                value of the metric and the human readable start time of every event
+        """
+        events = []
+        for name, parts in self.intervals.items():
+            if not parts:
+                continue
+            starts, ends, start_s, end_s, start_ms, peaks = (np.concatenate(arrays)
+                                                             for arrays in zip(*parts))
+            events.append(pd.DataFrame({
+                "event": name,
+                "start": start_s,
+                "end": end_s,
+                "duration_s": end_s - start_s,
+                "rows": ends - starts,
+                "peak": peaks,
+                "start_time": time_labels(start_ms),
+            }))
+        if not events:
+            return pd.DataFrame(columns = EVENT_COLUMNS)
+        return pd.concat(events, ignore_index = True)
@@ -0,0 +1,183 @@
+"""Export of the analyzed log files into Excel, CSV and Parquet files.
+
+The files are streamed to a temporary file on disk instead of being built in memory:
+
+* the Excel spreadsheets are written row by row with the constant memory mode of xlsxwriter
+* the CSV and Parquet files of the whole log file are written in chunks of rows
+* the session snapshots are written section by section by the snapshot module
+
+xlsxwriter and the Parquet writer are imported only when such a file is exported.
+"""
+import os
+import tempfile
+import pyarrow as pa
+from srt_analyzer import snapshot
+from srt_analyzer.ingest import with_time_labels
+from srt_analyzer.profiling import profiled
+
+# Number of rows written at once to the CSV and Parquet files
+EXPORT_CHUNKSIZE = 100000
+
+# MIME types of the supported export formats
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "srtsnap": "application/octet-stream",
+}
+
+
+def _temp_path(extension):
+    """Creates an empty temporary file with the given extension
+
+    Args:
+        extension ([str]): File extension without the dot
+
+    Returns:
+        path ([str]): Path of the temporary file
+    """
+    fd, path = tempfile.mkstemp(prefix = "srt_export_", suffix = f".{extension}")
+    os.close(fd)
+    return path
+
+
+def _python_values(series):
+    """Converts the values of a column to Python objects, which are understood by xlsxwriter. The
+    float32 values are converted through their shortest representation, so 30.876 isn't exported
+    as 30.875999450683594.
+
+    Args:
+        series ([series]): Column of a dataframe
+
+    Returns:
+        values ([list]): Python values of the column
+    """
+    if series.dtype == "float32":
+        return [float(str(value)) for value in series.to_numpy()]
+    return series.tolist()
+
+
+def write_excel(path, **dataframes):
+    """Writes every dataframe into a separate sheet of an Excel spreadsheet. Only the current row of
+    a sheet is kept in memory, since the rows are written in order in constant memory mode.
+
+    Args:
+        path ([str]): Path of the Excel file
+        dataframes ([dataframe]): Dataframes keyed by the sheet name, None values are skipped
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+    time_format = workbook.add_format({"num_format": "hh:mm:ss.000"})
+    try:
+        for sheet_name, dataframe in dataframes.items():
+            # Creating a new Sheet only if the df is not empty
+            if dataframe is None:
+                continue
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 1, [str(col) for col in dataframe.columns])
+            columns = [dataframe.index.tolist()] + [_python_values(dataframe[col]) for col in dataframe.columns]
+            for row_num, row in enumerate(zip(*columns), start = 1):
+                for col_num, value in enumerate(row):
+                    if hasattr(value, "hour"):
+                        worksheet.write_datetime(row_num, col_num, value, time_format)
+                    else:
+                        worksheet.write(row_num, col_num, value)
+    finally:
+        workbook.close()
+
+
+def write_csv(path, dataframe, chunksize = EXPORT_CHUNKSIZE):
+    """Writes the dataframe into a CSV file in chunks of rows, the elapsed times are formatted one
+    chunk at a time
+
+    Args:
+        path ([str]): Path of the CSV file
+        dataframe ([dataframe]): Dataframe to export
+        chunksize ([integer]): Number of rows written at once
+    """
+    with open(path, "w", newline = "") as csv_file:
+        for start in range(0, max(len(dataframe), 1), chunksize):
+            chunk = with_time_labels(dataframe.iloc[start:start + chunksize])
+            chunk.to_csv(csv_file, index = False, header = start == 0)
+
+
+def write_parquet(path, dataframe, chunksize = EXPORT_CHUNKSIZE):
+    """Writes the dataframe into a Parquet file, converting a single row group at a time
+
+    Args:
+        path ([str]): Path of the Parquet file
+        dataframe ([dataframe]): Dataframe to export
+        chunksize ([integer]): Number of rows in a row group
+    """
+    import pyarrow.parquet as pq
+    first = pa.Table.from_pandas(_durations(dataframe.iloc[:chunksize]), preserve_index = False)
+    with pq.ParquetWriter(path, first.schema) as writer:
+        writer.write_table(first)
+        for start in range(chunksize, len(dataframe), chunksize):
+            chunk = _durations(dataframe.iloc[start:start + chunksize])
+            writer.write_table(pa.Table.from_pandas(chunk, schema = first.schema, preserve_index = False))
+
+
+def _durations(dataframe):
+    """Converts the elapsed milliseconds of the Time column into a duration, which is a view of the
+    same integers and is stored as the duration type of Parquet
+
+    Args:
+        dataframe ([dataframe]): Rows with the numeric Time column
+
+    Returns:
+        dataframe ([dataframe]): Rows with the Time durations
+    """
+    if "Time" not in dataframe.columns or dataframe.Time.dtype.kind not in "iu":
+        return dataframe
+    return dataframe.assign(Time = dataframe.Time.to_numpy().astype("timedelta64[ms]"))
+
+
+@profiled("export_tables")
+def export_tables(**dataframes):
+    """Exports the tables into a temporary Excel spreadsheet
+
+    Args:
+        dataframes ([dataframe]): Dataframes keyed by the sheet name, None values are skipped
+
+    Returns:
+        path ([str]): Path of the temporary Excel file, which should be removed by the caller
+    """
+    path = _temp_path("xlsx")
+    write_excel(path, **dataframes)
+    return path
+
+
+@profiled("export")
+def export_frame(dataframe, file_format):
+    """Exports the whole dataframe into a temporary CSV or Parquet file
+
+    Args:
+        dataframe ([dataframe]): Dataframe to export
+        file_format ([str]): Either "csv" or "parquet"
+
+    Returns:
+        path ([str]): Path of the temporary file, which should be removed by the caller
+    """
+    writers = {"csv": write_csv, "parquet": write_parquet}
+    if file_format not in writers:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    path = _temp_path(file_format)
+    writers[file_format](path, dataframe)
+    return path
+
+
+@profiled("export_snapshot")
+def export_snapshot(dataframe, sender):
+    """Exports the session snapshot of the analyzed log file into a temporary file
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        path ([str]): Path of the temporary file, which should be removed by the caller
+    """
+    path = _temp_path(snapshot.SNAPSHOT_EXTENSION)
+    snapshot.write(path, dataframe, sender)
+    return path
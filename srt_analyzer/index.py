@@ -0,0 +1,234 @@
+"""Persistent fleet index of the analyzed log files.
+
+The stats of every analyzed log file are stored as a row of an embedded SQLite database, together with
+the size and modification time of the file. The index is updated incrementally: only the new or
+modified log files are analyzed again. The sessions are queried with plain SQL WHERE clauses over the
+indexed columns, without touching the raw CSV files, for example:
+
+    modified >= datetime('now', '-7 days') AND (max_rtt_ms > 300 OR dropped_total > 0)
+
+The distribution sketches of every log file are stored as well, with a row per non-empty bin. The
+tail percentiles of any set of sessions are estimated by adding up the counts of their bins in SQL.
+"""
+import datetime
+import os
+import sqlite3
+import pandas as pd
+from srt_analyzer.cache import DEFAULT_CACHE_DIR
+from srt_analyzer.sketch import Distributions
+
+# Location of the index, which can be overridden by an environment variable
+DEFAULT_INDEX_PATH = os.environ.get("SRT_INDEX_PATH", os.path.join(DEFAULT_CACHE_DIR, "index.sqlite"))
+
+# Columns of the sessions table, the stats columns are the keys of StreamStats.record()
+INDEX_COLUMNS = {
+    "file": "TEXT PRIMARY KEY",
+    "size": "INTEGER",
+    "mtime_ns": "INTEGER",
+    "modified": "TEXT",
+    "role": "TEXT",
+    "rows": "INTEGER",
+    "duration_s": "REAL",
+    "latency_ms": "INTEGER",
+    "min_rtt_ms": "REAL",
+    "max_rtt_ms": "REAL",
+    "avg_rtt_ms": "REAL",
+    "p99_rtt_ms": "REAL",
+    "p999_rtt_ms": "REAL",
+    "min_bandwidth_mbps": "REAL",
+    "lost_max": "INTEGER",
+    "lost_total": "INTEGER",
+    "dropped_max": "INTEGER",
+    "dropped_total": "INTEGER",
+    "retransmitted_max": "INTEGER",
+    "retransmitted_total": "INTEGER",
+    "flow_window_violations": "INTEGER",
+    "congestion_window_violations": "INTEGER",
+    "error": "TEXT",
+}
+
+# Columns which are the most often filtered on
+INDEXED_COLUMNS = ["modified", "max_rtt_ms", "lost_total", "dropped_total"]
+
+# Columns and comparisons of the structured filters, whose values are bound as parameters
+NUMERIC_COLUMNS = [col for col, sql_type in INDEX_COLUMNS.items() if sql_type in ("INTEGER", "REAL")]
+FILTER_OPERATORS = (">", ">=", "<", "<=", "=")
+
+
+def connect(path = DEFAULT_INDEX_PATH, read_only = False):
+    """Opens the fleet index, creating it when it doesn't exist
+
+    Args:
+        path ([str]): Path of the SQLite database
+        read_only ([bool]): True to open an existing index for queries only
+
+    Returns:
+        conn ([Connection]): Connection to the index
+    """
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri = True)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    conn = sqlite3.connect(path)
+    # Write-ahead logging lets the app query the index while the CLI is updating it
+    conn.execute("PRAGMA journal_mode=WAL")
+    columns = ", ".join(f"{name} {sql_type}" for name, sql_type in INDEX_COLUMNS.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS sessions ({columns})")
+    # The columns added since the index was created are appended to its table
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+    for name, sql_type in INDEX_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE sessions ADD COLUMN {name} {sql_type}")
+    for col in INDEXED_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS sessions_{col} ON sessions ({col})")
+    conn.execute("CREATE TABLE IF NOT EXISTS distributions "
+                 "(file TEXT, metric TEXT, kind TEXT, bin INTEGER, count INTEGER)")
+    conn.execute("CREATE INDEX IF NOT EXISTS distributions_file ON distributions (file)")
+    conn.commit()
+    return conn
+
+
+def stale_paths(conn, paths):
+    """Selects the log files which are not indexed yet or were modified since they were indexed
+
+    Args:
+        conn ([Connection]): Connection to the index
+        paths ([list]): Absolute paths of the log files
+
+    Returns:
+        stale ([list]): Paths of the log files which should be analyzed, including the missing or
+            unreadable ones, whose analysis records the error
+    """
+    indexed = {file: (size, mtime_ns) for file, size, mtime_ns in
+               conn.execute("SELECT file, size, mtime_ns FROM sessions")}
+    stale = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stale.append(path)
+            continue
+        if indexed.get(path) != (stat.st_size, stat.st_mtime_ns):
+            stale.append(path)
+    return stale
+
+
+def upsert(conn, summary_df):
+    """Stores the stats of the analyzed log files, replacing their previous rows
+
+    Args:
+        conn ([Connection]): Connection to the index
+        summary_df ([dataframe]): Summary table with a row per log file, as returned by the CLI, with
+            the Distributions of every log file in the optional distributions column
+    """
+    rows = []
+    bins = []
+    for record in summary_df.astype(object).where(summary_df.notna(), None).to_dict("records"):
+        if record.get("distributions") is not None:
+            state_df = record["distributions"].to_frame()
+            bins.extend(zip([record["file"]] * len(state_df), state_df.metric, state_df.kind,
+                            state_df.bin.tolist(), state_df["count"].tolist()))
+        try:
+            stat = os.stat(record["file"])
+        except OSError as error:
+            # The log file vanished or became unreadable, it is stored with the error and without a
+            # size, so it is analyzed again on the next run
+            record["error"] = record.get("error") or f"{type(error).__name__}: {error}"
+            stat = None
+        if stat is not None:
+            record["size"] = stat.st_size
+            record["mtime_ns"] = stat.st_mtime_ns
+            modified = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc)
+            # The same format as the SQLite datetime() function, so both can be compared
+            record["modified"] = modified.strftime("%Y-%m-%d %H:%M:%S")
+        rows.append(tuple(_sql_value(record.get(name)) for name in INDEX_COLUMNS))
+    columns = ", ".join(INDEX_COLUMNS)
+    placeholders = ", ".join("?" * len(INDEX_COLUMNS))
+    with conn:
+        conn.executemany(f"INSERT OR REPLACE INTO sessions ({columns}) VALUES ({placeholders})", rows)
+        conn.executemany("DELETE FROM distributions WHERE file = ?", [(row[0],) for row in rows])
+        conn.executemany("INSERT INTO distributions VALUES (?, ?, ?, ?, ?)", bins)
+
+
+def _sql_value(value):
+    """Converts NumPy scalars into Python values, which can be stored by SQLite"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def query(conn, where = None, params = (), order_by = "modified DESC", limit = None):
+    """Queries the indexed sessions
+
+    Args:
+        conn ([Connection]): Connection to the index
+        where ([str]): Optional SQL WHERE clause over the INDEX_COLUMNS
+        params ([tuple]): Parameters of the placeholders in the WHERE clause
+        order_by ([str]): SQL ORDER BY clause
+        limit ([integer]): Optional maximal number of returned sessions
+
+    Returns:
+        sessions_df ([dataframe]): Matching sessions with a row per log file, sqlite3.Error is raised
+            for a malformed WHERE or ORDER BY clause
+    """
+    sql = "SELECT * FROM sessions"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    # Nullable dtypes keep the integer columns as integers for the log files which failed
+    return pd.DataFrame.from_records(cursor.fetchall(), columns = columns).convert_dtypes()
+
+
+def filter_clause(role = None, min_rows = None, column = None, operator = ">", threshold = None):
+    """Builds the WHERE clause of structured filters, which only references known columns and binds
+    all values as parameters, so no user input ends up in the SQL text
+
+    Args:
+        role ([str]): "sender" or "receiver", all sessions by default
+        min_rows ([integer]): Minimal number of rows of the log file
+        column ([str]): One of the NUMERIC_COLUMNS compared with the threshold
+        operator ([str]): One of the FILTER_OPERATORS
+        threshold ([float]): Value the column is compared with, the column isn't filtered without it
+
+    Returns:
+        where ([str]): WHERE clause, None without any filter, ValueError is raised for an unknown
+            column or operator
+        params ([tuple]): Parameters of the placeholders in the WHERE clause
+    """
+    conditions = []
+    params = []
+    if role:
+        conditions.append("role = ?")
+        params.append(role)
+    if min_rows:
+        conditions.append("rows >= ?")
+        params.append(int(min_rows))
+    if column is not None and threshold is not None:
+        if column not in NUMERIC_COLUMNS or operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter: {column} {operator}")
+        conditions.append(f"{column} {operator} ?")
+        params.append(threshold)
+    return " AND ".join(conditions) or None, tuple(params)
+
+
+def distributions(conn, where = None, params = ()):
+    """Merges the distribution sketches of the indexed sessions
+
+    Args:
+        conn ([Connection]): Connection to the index
+        where ([str]): Optional SQL WHERE clause over the INDEX_COLUMNS selecting the sessions
+        params ([tuple]): Parameters of the placeholders in the WHERE clause
+
+    Returns:
+        distributions ([Distributions]): Merged distributions of the matching sessions, sqlite3.Error
+            is raised for a malformed WHERE clause
+    """
+    sql = "SELECT metric, kind, bin, SUM(count) AS count FROM distributions"
+    if where:
+        sql += f" WHERE file IN (SELECT file FROM sessions WHERE {where})"
+    sql += " GROUP BY metric, kind, bin"
+    cursor = conn.execute(sql, params)
+    return Distributions.from_frame(pd.DataFrame.from_records(cursor.fetchall(),
+                                                              columns = ["metric", "kind", "bin", "count"]))
@@ -0,0 +1,249 @@
+"""Streaming ingest of the SRT CSV log files.
+
+The log files are read in chunks with a bounded number of rows, so the memory usage stays flat
+regardless of the size of the log file. The sender/receiver irrelevant columns are dropped while
+parsing the CSV file and every chunk is fed to an incremental aggregator.
+
+The Time column keeps the elapsed time in milliseconds as parsed, the Seconds column is derived from
+it with a single vectorized division. The human readable times are formatted only for the rows which
+are displayed or exported.
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.profiling import profiled
+from srt_analyzer.rolling import RollingBuilder
+from srt_analyzer.rollup import RollupBuilder
+from srt_analyzer.schema import (RECEIVER_IMPAIRMENTS, SENDER_IMPAIRMENTS, apply_schema, check_columns,
+                                 compression_of, layout_errors, read_header, read_options)
+from srt_analyzer.sketch import Distributions
+from srt_analyzer.summary import Summary
+from srt_analyzer.topk import TopK
+
+# Number of rows parsed at once in streaming mode
+DEFAULT_CHUNKSIZE = 100000
+
+
+def _rewind(source):
+    """Moves the position of a file buffer back to its beginning, so it can be parsed again
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def is_sender(source):
+    """Checks whether the log file is for SRT sender or SRT receiver reading only its first row
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+
+    Returns:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver, ValueError is raised for a
+            file which isn't an SRT statistics log or has no rows
+    """
+    try:
+        first_row = pd.read_csv(source, nrows = 1, compression = compression_of(source))
+    except (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError):
+        raise ValueError("The file is not an SRT statistics log, it isn't a CSV file") from None
+    _rewind(source)
+    return sender_of(first_row)
+
+
+def sender_of(first_row):
+    """Checks whether the first row of a log file is from SRT sender or SRT receiver
+
+    Args:
+        first_row ([dataframe]): Header and first row of the log file
+
+    Returns:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver, ValueError is raised for a
+            file which isn't an SRT statistics log or has no rows
+    """
+    check_columns(first_row.columns)
+    if first_row.empty:
+        raise ValueError("The log file has no rows")
+    return bool(first_row.byteSent.iloc[0] != 0)
+
+
+def format_chunk(chunk):
+    """Formats a single chunk of the log file in the same way as the whole dataframe is formatted
+
+    Args:
+        chunk ([dataframe]): Chunk of the log file without the redundant columns
+
+    Returns:
+        chunk ([dataframe]): Formatted chunk with the Seconds column placed at the beginning
+    """
+    # The Time column contains the elapsed time in milliseconds and is kept numeric
+    chunk.insert(0, "Seconds", chunk.Time.to_numpy() / 10 ** 3)
+    return chunk
+
+
+def time_labels(milliseconds):
+    """Formats elapsed times as HH:MM:SS.mmm strings, the hours keep counting past a day
+
+    Args:
+        milliseconds ([array]): Elapsed times in milliseconds
+
+    Returns:
+        labels ([list]): Human readable elapsed times
+    """
+    hours, rest = np.divmod(np.asarray(milliseconds, dtype = np.int64), 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    seconds, millis = np.divmod(rest, 1000)
+    return [f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}" for h, m, s, ms in
+            zip(hours.tolist(), minutes.tolist(), seconds.tolist(), millis.tolist())]
+
+
+def with_time_labels(dataframe):
+    """Returns the rows with the Time column formatted as human readable elapsed times, meant for
+    the few rows which are displayed or exported at once
+
+    Args:
+        dataframe ([dataframe]): Formatted rows with the numeric Time column
+
+    Returns:
+        labeled_df ([dataframe]): Copy of the rows with the Time strings
+    """
+    if dataframe is None or "Time" not in dataframe.columns or dataframe.Time.dtype == object:
+        return dataframe
+    return dataframe.assign(Time = time_labels(dataframe.Time.to_numpy()))
+
+
+def read_chunks(source, sender, chunksize = DEFAULT_CHUNKSIZE, typed = True):
+    """Reads the log file in chunks, applying the SRT schema and dropping the redundant columns 
+    at parse time
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        chunksize ([integer]): Maximal number of rows in a chunk
+        typed ([bool]): False for log files not matching the SRT schema
+
+    Yields:
+        chunk ([dataframe]): Formatted chunk of the log file
+    """
+    reader = pd.read_csv(source, chunksize = chunksize, compression = compression_of(source),
+                         **read_options(sender, typed))
+    for chunk in reader:
+        yield format_chunk(apply_schema(chunk) if typed else chunk)
+
+
+class StreamStats:
+    """Incremental aggregator of the line stats, which is updated chunk by chunk and never keeps
+    more than a single chunk of the log file in memory.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        rolling ([bool]): True to compute the rolling-window stats as well
+    """
+
+    def __init__(self, sender, rolling = False):
+        self.sender = sender
+        self.impairment_cols = SENDER_IMPAIRMENTS if sender else RECEIVER_IMPAIRMENTS
+        self.num_rows = 0
+        self.num_cols = 0
+        self.duration = None
+        self.latency = None
+        self.summary = None
+        self.topk = TopK(sender)
+        self.rollup = RollupBuilder()
+        self.rolling = RollingBuilder(sender) if rolling else None
+        self.distributions = Distributions()
+        self.flow_window_violations = 0
+        self.congestion_window_violations = 0
+
+    @property
+    def nbytes(self):
+        """Memory size of the aggregated state in bytes, which doesn't grow with the log file"""
+        parts = [self.summary, self.topk, self.rollup, self.rolling, self.distributions]
+        return sum(part.nbytes for part in parts if part is not None)
+
+    def update(self, chunk):
+        """Updates the aggregated stats with a new chunk of the log file
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        if chunk.empty:
+            return
+        self.num_rows += chunk.shape[0]
+        self.num_cols = chunk.shape[1]
+        self.duration = time_labels(chunk.Time.to_numpy()[-1:])[0]
+        self.latency = chunk.RCVLATENCYms.iloc[-1]
+
+        chunk_summary = Summary.from_frame(chunk, quantiles = False)
+        self.summary = chunk_summary if self.summary is None else self.summary.merge(chunk_summary)
+        self.topk.update(chunk)
+        self.rollup.update(chunk)
+        self.distributions.update(chunk)
+        if self.rolling is not None:
+            self.rolling.update(chunk)
+
+        self.flow_window_violations += int((chunk.pktFlightSize > chunk.pktFlowWindow).sum())
+        self.congestion_window_violations += int((chunk.pktFlightSize > chunk.pktCongestionWindow).sum())
+
+    def rtt(self):
+        """Returns the minimum, maximum and average Round Trip Time(RTT) of the processed chunks
+
+        Returns:
+            min_rtt ([float]): Minimum Round Trip Time in ms
+            max_rtt ([float]): Maximum Round Trip Time in ms
+            avg_rtt ([float]): Average Round Trip Time in ms
+        """
+        if self.summary is None:
+            return None, None, None
+        return self.summary.rtt()
+
+    def record(self):
+        """Returns the main stats of the log file as a flat record, used for the summary tables of
+        many log files
+
+        Returns:
+            record ([dict]): Stats keyed by name, with the same keys for SRT Sender and Receiver
+        """
+        # The float32 values are rounded, so they are reported the same way as on the screen
+        min_rtt, max_rtt, avg_rtt = (None if value is None else round(float(value), 3) for value in self.rtt())
+        # The tail percentiles of the RTT are estimated from the sketch, since the rows are not kept
+        p99_rtt, p999_rtt = (None if np.isnan(value) else round(float(value), 3)
+                             for value in self.distributions.quantiles("msRTT", (0.99, 0.999)))
+        record = {
+            "role": "sender" if self.sender else "receiver",
+            "rows": self.num_rows,
+            "duration_s": self.summary.max("Seconds") if self.summary else None,
+            "latency_ms": int(self.latency) if self.latency is not None else None,
+            "min_rtt_ms": min_rtt,
+            "max_rtt_ms": max_rtt,
+            "avg_rtt_ms": avg_rtt,
+            "p99_rtt_ms": p99_rtt,
+            "p999_rtt_ms": p999_rtt,
+            "min_bandwidth_mbps": round(float(self.summary.min("mbpsBandwidth")), 3) if self.summary else None,
+        }
+        for name, col in zip(("lost", "dropped", "retransmitted"), self.impairment_cols):
+            record[f"{name}_max"] = self.summary.max(col) if self.summary else 0
+            record[f"{name}_total"] = self.summary.sum(col) if self.summary else 0
+        record["flow_window_violations"] = self.flow_window_violations
+        record["congestion_window_violations"] = self.congestion_window_violations
+        return record
+
+
+@profiled("stream", rows = lambda stats: stats.num_rows)
+def analyze_stream(source, chunksize = DEFAULT_CHUNKSIZE, rolling = False):
+    """Analyzes the log file chunk by chunk without loading the whole file in memory
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+        chunksize ([integer]): Maximal number of rows in a chunk
+        rolling ([bool]): True to compute the rolling-window stats as well
+
+    Returns:
+        stats ([StreamStats]): Aggregated stats of the whole log file
+    """
+    typed = not layout_errors(read_header(source))
+    sender = is_sender(source)
+    stats = StreamStats(sender, rolling)
+    for chunk in read_chunks(source, sender, chunksize, typed):
+        stats.update(chunk)
+    return stats
@@ -0,0 +1,222 @@
+"""Background analysis of the log files with progress reporting and cooperative cancellation.
+
+The log file is parsed chunk by chunk on a worker thread, so the UI stays responsive and can poll the
+progress of the job. The first summary numbers, like the duration, RCVLATENCYms and the RTT, are
+updated after every chunk and can be shown long before the whole log file is parsed. A cancelled job
+stops at the next chunk boundary. Threads are used instead of processes, since the uploaded file
+buffers can't be passed to another process and the C parser of pandas releases the GIL.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from srt_analyzer.ingest import DEFAULT_CHUNKSIZE, StreamStats, is_sender, read_chunks, time_labels
+from srt_analyzer.schema import layout_errors, read_header
+
+# Maximal number of log files analyzed at the same time
+MAX_JOBS = 2
+
+# Finished jobs whose result was never collected are forgotten after this number of seconds
+JOB_TTL = 600
+
+# Interval in seconds between two refreshes of the progress in the UI
+POLL_INTERVAL = 0.5
+
+_executor = ThreadPoolExecutor(max_workers = MAX_JOBS, thread_name_prefix = "srt_job")
+_jobs = {}
+_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    """Raised when the result of a cancelled job is requested"""
+
+
+def _total_size(source):
+    """Returns the size of the log file in bytes, used as the total of the progress
+
+    Args:
+        source ([file]): Binary file buffer
+
+    Returns:
+        size ([integer]): Size in bytes, None if it's unknown
+    """
+    size = getattr(source, "size", None)
+    if size is None and hasattr(source, "seek"):
+        position = source.tell()
+        size = source.seek(0, 2)
+        source.seek(position)
+    return size
+
+
+class AnalysisJob:
+    """Analysis of a single log file running on a worker thread.
+
+    Args:
+        source ([file]): Binary file buffer of the log file, which is read by the worker only
+        streaming ([bool]): True to aggregate the StreamStats without keeping the rows, False to
+            build the whole formatted dataframe
+        chunksize ([integer]): Maximal number of rows in a chunk
+    """
+
+    def __init__(self, source, streaming, chunksize = DEFAULT_CHUNKSIZE):
+        self.source = source
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.total_bytes = _total_size(source)
+        self.bytes_read = 0
+        self.rows = 0
+        self.sender = None
+        self.layout_errors = []
+        self.last_ms = None
+        self.latency = None
+        self.rtt_min = np.inf
+        self.rtt_max = -np.inf
+        self.rtt_sum = 0.0
+        self.rtt_count = 0
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self.future = None
+
+    @property
+    def progress(self):
+        """Fraction of the log file parsed so far, between 0 and 1"""
+        if self.future is not None and self.future.done():
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+    @property
+    def cancelled(self):
+        """True if the job was asked to stop"""
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        """True if the job finished, failed or stopped after a cancellation"""
+        return self.future is not None and self.future.done()
+
+    def cancel(self):
+        """Asks the job to stop at the next chunk boundary"""
+        self._cancel.set()
+
+    def wait(self, timeout = None):
+        """Waits until the job finishes or the timeout expires
+
+        Args:
+            timeout ([float]): Maximal waiting time in seconds, no limit by default
+
+        Returns:
+            done ([bool]): True if the job finished
+        """
+        return bool(wait([self.future], timeout).done)
+
+    def result(self):
+        """Returns the result of the finished job, the errors of the worker are raised here
+
+        Returns:
+            result ([tuple]): (dataframe, sender) or (StreamStats, sender) in streaming mode
+        """
+        return self.future.result()
+
+    def duration(self):
+        """Returns the elapsed time of the last parsed row, None before the first chunk"""
+        return None if self.last_ms is None else time_labels([self.last_ms])[0]
+
+    def rtt(self):
+        """Returns the minimum, maximum and average RTT of the rows parsed so far
+
+        Returns:
+            min_rtt ([float]): Minimum Round Trip Time in ms
+            max_rtt ([float]): Maximum Round Trip Time in ms
+            avg_rtt ([float]): Average Round Trip Time in ms
+        """
+        if not self.rtt_count:
+            return None, None, None
+        return (round(float(self.rtt_min), 3), round(float(self.rtt_max), 3),
+                round(self.rtt_sum / self.rtt_count, 3))
+
+    def _observe(self, chunk):
+        """Updates the early summary numbers with a parsed chunk"""
+        rtt = chunk.msRTT.to_numpy(np.float64)
+        self.rtt_min = min(self.rtt_min, np.nanmin(rtt))
+        self.rtt_max = max(self.rtt_max, np.nanmax(rtt))
+        self.rtt_sum += float(np.nansum(rtt))
+        self.rtt_count += int(np.count_nonzero(~np.isnan(rtt)))
+        self.last_ms = int(chunk.Time.iloc[-1])
+        self.latency = int(chunk.RCVLATENCYms.iloc[-1])
+        self.rows += len(chunk)
+
+    def run(self):
+        """Parses the log file on the worker thread
+
+        Returns:
+            result ([tuple]): (dataframe, sender) or (StreamStats, sender) in streaming mode
+        """
+        try:
+            self.layout_errors = layout_errors(read_header(self.source))
+            self.sender = is_sender(self.source)
+            stats = StreamStats(self.sender, rolling = True) if self.streaming else None
+            chunks = []
+            typed = not self.layout_errors
+            for chunk in read_chunks(self.source, self.sender, self.chunksize, typed):
+                if self.cancelled:
+                    raise Cancelled("The analysis of the log file was cancelled")
+                if chunk.empty:
+                    continue
+                self._observe(chunk)
+                if stats is not None:
+                    stats.update(chunk)
+                else:
+                    chunks.append(chunk)
+                self.bytes_read = self.source.tell()
+            if stats is not None:
+                return stats, self.sender
+            return pd.concat(chunks, ignore_index = True) if chunks else pd.DataFrame(), self.sender
+        finally:
+            self.finished_at = time.monotonic()
+
+
+def _prune():
+    """Forgets the finished jobs whose result wasn't collected in time"""
+    now = time.monotonic()
+    for key, job in list(_jobs.items()):
+        if job.finished_at is not None and now - job.finished_at > JOB_TTL:
+            del _jobs[key]
+
+
+def start(key, source, streaming, chunksize = DEFAULT_CHUNKSIZE):
+    """Starts the analysis of a log file, unless a job for the same key already exists
+
+    Args:
+        key ([str]): Key of the job, like the hash of the log file content and the mode
+        source ([file]): Binary file buffer of the log file
+        streaming ([bool]): True to aggregate the StreamStats without keeping the rows
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        job ([AnalysisJob]): New or already running job
+    """
+    with _lock:
+        _prune()
+        job = _jobs.get(key)
+        if job is None:
+            job = AnalysisJob(source, streaming, chunksize)
+            job.future = _executor.submit(job.run)
+            _jobs[key] = job
+        return job
+
+
+def get(key):
+    """Returns the job of a key, None if there is no such job"""
+    with _lock:
+        return _jobs.get(key)
+
+
+def forget(key):
+    """Removes the job of a key, a running job is cancelled first"""
+    with _lock:
+        job = _jobs.pop(key, None)
+    if job is not None and not job.done:
+        job.cancel()
@@ -0,0 +1,156 @@
+"""In-process memoization of the parsed log files and the derived stats.
+
+Streamlit reruns the whole script on every widget change, so the parsed dataframe, the summary stats,
+the top-N tables and the exported spreadsheets are kept in a size-bounded LRU cache. The entries are
+keyed by the content hash of the uploaded log file plus the parameters of the computation.
+"""
+import functools
+import os
+import sys
+import threading
+import weakref
+import cachetools
+
+# Maximal total size of the memoized results, which can be overridden by environment variable
+DEFAULT_MAX_SIZE = int(os.environ.get("SRT_MEMO_MAX_BYTES", 1024 ** 3))
+
+_lock = threading.RLock()
+_frames = {}
+
+
+def _sizeof(value):
+    """Estimates the memory size of a memoized result
+
+    Args:
+        value ([object]): Memoized result
+
+    Returns:
+        size ([integer]): Approximate size in bytes
+    """
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(item) for item in value) + sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sum(_sizeof(item) for item in value.values()) + sys.getsizeof(value)
+    if hasattr(value, "memory_usage"):
+        # The shallow memory usage is used, since the deep one iterates over all Python objects
+        usage = value.memory_usage(index = True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):
+        # Arrays and the stats objects, like the rollup pyramids, the Top-K indexes and the sketches
+        return int(value.nbytes) + sys.getsizeof(value)
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+_results = cachetools.LRUCache(maxsize = DEFAULT_MAX_SIZE, getsizeof = _sizeof)
+
+
+def register(dataframe, key):
+    """Associates a dataframe with the content hash of the log file it was parsed from, so the
+    memoized functions can recognize it on the next rerun
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        key ([str]): Hash of the log file content
+    """
+    frame_id = id(dataframe)
+
+    def forget(ref):
+        # Removing the entry once the dataframe is garbage collected, unless the id was already reused
+        with _lock:
+            if _frames.get(frame_id, (None,))[0] is ref:
+                del _frames[frame_id]
+
+    with _lock:
+        _frames[frame_id] = (weakref.ref(dataframe, forget), key)
+
+
+def frame_key(dataframe):
+    """Returns the content hash of a registered dataframe
+
+    Args:
+        dataframe ([dataframe]): Dataframe
+
+    Returns:
+        key ([str]): Hash of the log file content or None for frames which are not registered
+    """
+    with _lock:
+        entry = _frames.get(id(dataframe))
+    if entry is not None and entry[0]() is dataframe:
+        return entry[1]
+    return None
+
+
+def lookup(key, compute):
+    """Returns the memoized result for a key, computing and storing it on a miss
+
+    Args:
+        key ([tuple]): Hashable key containing the content hash and the parameters
+        compute ([function]): Function computing the result
+
+    Returns:
+        result ([object]): Memoized or freshly computed result
+    """
+    with _lock:
+        try:
+            return _results[key]
+        except KeyError:
+            pass
+    result = compute()
+    with _lock:
+        try:
+            _results[key] = result
+        except ValueError:
+            # The result is larger than the whole cache, so it is not memoized
+            pass
+    return result
+
+
+def memoized(func):
+    """Decorator memoizing a function whose first argument is a registered dataframe. The remaining
+    arguments have to be hashable. Calls with dataframes which are not registered are not memoized.
+
+    Args:
+        func ([function]): Function to memoize
+
+    Returns:
+        wrapper ([function]): Memoized function
+    """
+    @functools.wraps(func)
+    def wrapper(dataframe, *args, **kwargs):
+        key = frame_key(dataframe)
+        if key is None:
+            return func(dataframe, *args, **kwargs)
+        return lookup(_memo_key(func, key, args, kwargs), lambda: func(dataframe, *args, **kwargs))
+    return wrapper
+
+
+def _memo_key(func, key, args, kwargs):
+    """Returns the key of a memoized call, the wrapper has the same name as the wrapped function"""
+    return (func.__module__, func.__qualname__, key, args, tuple(sorted(kwargs.items())))
+
+
+def prime(func, key, result, *args, **kwargs):
+    """Stores an already known result of a memoized function, like the results loaded from a session
+    snapshot, so the function isn't computed on the first call. The arguments have to be passed the
+    same way as in the later calls.
+
+    Args:
+        func ([function]): Memoized function
+        key ([str]): Hash of the log file content of the dataframe argument
+        result ([object]): Result of the call
+        args ([tuple]): Remaining arguments of the call
+        kwargs ([dict]): Keyword arguments of the call
+    """
+    with _lock:
+        try:
+            _results[_memo_key(func, key, args, kwargs)] = result
+        except ValueError:
+            pass
+
+
+def clear():
+    """Removes all memoized results"""
+    with _lock:
+        _results.clear()
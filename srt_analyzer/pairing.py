@@ -0,0 +1,202 @@
+"""Paired analysis of the sender and receiver log files of the same SRT link.
+
+Both ends write their stats on the elapsed time axis of the Time column. The rows of the receiver are
+aligned to the rows of the sender with a sorted as-of join, which runs in linear time on the already
+sorted logs. The join is streamed: only a window of receiver rows around the current sender chunk is
+kept in memory. The per-row counters of every side are summed per interval, while the RTT asymmetry
+is averaged over the aligned rows of the interval.
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.ingest import DEFAULT_CHUNKSIZE, is_sender, read_chunks
+from srt_analyzer.profiling import profiled
+from srt_analyzer.schema import layout_errors, read_header
+
+# Length of the reported intervals in seconds
+DEFAULT_INTERVAL = 10
+
+# Maximal distance in seconds between a sender row and the receiver row aligned to it
+DEFAULT_TOLERANCE = 1.0
+
+# Counters summed per interval on every side of the link
+SENDER_COUNTERS = ["pktSent", "pktSndLoss", "pktSndDrop", "pktRetrans"]
+RECEIVER_COUNTERS = ["pktRecv", "pktRcvLoss", "pktRcvDrop", "pktRcvRetrans"]
+
+PAIR_COLUMNS = ["start_s", "pktSent", "pktRecv", "e2e_lost", "e2e_loss_pct", "pktSndLoss", "pktRcvLoss",
+                "pktRcvDrop", "pktRetrans", "pktRcvRetrans", "retrans_efficiency_pct", "rtt_snd_ms",
+                "rtt_rcv_ms", "rtt_asymmetry_ms", "aligned_rows"]
+
+
+def _sum_intervals(chunk, columns, interval):
+    """Sums the counters of a chunk per interval
+
+    Args:
+        chunk ([dataframe]): Formatted chunk of a log file
+        columns ([list]): Counter columns
+        interval ([float]): Length of the intervals in seconds
+
+    Returns:
+        sums_df ([dataframe]): Sums of the counters indexed by the interval number
+    """
+    buckets = np.floor(chunk.Seconds.to_numpy() / interval).astype(np.int64)
+    return chunk[columns].astype(np.int64).groupby(buckets).sum()
+
+
+def align_chunks(sender_chunks, receiver_chunks, tolerance = DEFAULT_TOLERANCE, on_receiver = None):
+    """Aligns the receiver rows to the sender rows with a streamed as-of join on the Seconds column.
+    Every receiver chunk is read only once, when the sender rows get close to it.
+
+    Args:
+        sender_chunks ([iterable]): Formatted chunks of the sender log file
+        receiver_chunks ([iterable]): Formatted chunks of the receiver log file
+        tolerance ([float]): Maximal distance in seconds between the aligned rows
+        on_receiver ([callable]): Optional callback, which is given every receiver chunk once
+
+    Yields:
+        aligned ([dataframe]): Sender chunk with the nearest receiver row of every sender row, the
+            columns present in both logs have the _snd and _rcv suffixes
+    """
+    receiver_chunks = iter(receiver_chunks)
+    window = None
+    exhausted = False
+    for chunk in sender_chunks:
+        if chunk.empty:
+            continue
+        horizon = chunk.Seconds.iloc[-1] + tolerance
+        # Reading the receiver rows until they pass the last sender row of the chunk
+        while not exhausted and (window is None or window.Seconds.iloc[-1] <= horizon):
+            receiver_chunk = next(receiver_chunks, None)
+            if receiver_chunk is None:
+                exhausted = True
+                break
+            if on_receiver is not None:
+                on_receiver(receiver_chunk)
+            window = receiver_chunk if window is None else pd.concat([window, receiver_chunk])
+        if window is None:
+            return
+        yield pd.merge_asof(chunk, window, on = "Seconds", direction = "nearest", tolerance = tolerance,
+                            suffixes = ("_snd", "_rcv"))
+        # Only the receiver rows which can still be aligned to the following sender rows are kept
+        window = window[window.Seconds >= chunk.Seconds.iloc[-1] - tolerance]
+    # The remaining receiver rows are still counted
+    for receiver_chunk in receiver_chunks:
+        if on_receiver is not None:
+            on_receiver(receiver_chunk)
+
+
+@profiled("pairing")
+def pair_intervals(sender_chunks, receiver_chunks, interval = DEFAULT_INTERVAL,
+                   tolerance = DEFAULT_TOLERANCE):
+    """Computes the end-to-end stats of the link per interval
+
+    Args:
+        sender_chunks ([iterable]): Formatted chunks or the whole dataframe of the sender log file
+        receiver_chunks ([iterable]): Formatted chunks or the whole dataframe of the receiver log file
+        interval ([float]): Length of the intervals in seconds
+        tolerance ([float]): Maximal distance in seconds between the aligned rows
+
+    Returns:
+        pairs_df ([dataframe]): Stats of every interval, see PAIR_COLUMNS
+    """
+    if isinstance(sender_chunks, pd.DataFrame):
+        sender_chunks = [sender_chunks]
+    if isinstance(receiver_chunks, pd.DataFrame):
+        receiver_chunks = [receiver_chunks]
+    sender_sums, receiver_sums, rtt_sums = [], [], []
+
+    def on_receiver(receiver_chunk):
+        receiver_sums.append(_sum_intervals(receiver_chunk, RECEIVER_COUNTERS, interval))
+
+    for aligned in align_chunks(sender_chunks, receiver_chunks, tolerance, on_receiver):
+        sender_sums.append(_sum_intervals(aligned, SENDER_COUNTERS, interval))
+        matched = aligned[aligned.msRTT_rcv.notna()]
+        buckets = np.floor(matched.Seconds.to_numpy() / interval).astype(np.int64)
+        rtt = pd.DataFrame({"rtt_snd": matched.msRTT_snd.to_numpy(np.float64),
+                            "rtt_rcv": matched.msRTT_rcv.to_numpy(np.float64)})
+        rtt_sums.append(rtt.groupby(buckets).agg(["sum", "count"]))
+    if not sender_sums or not receiver_sums:
+        return pd.DataFrame(columns = PAIR_COLUMNS)
+
+    # The partial sums of the intervals spanning several chunks are added up
+    sender_df = pd.concat(sender_sums).groupby(level = 0).sum()
+    receiver_df = pd.concat(receiver_sums).groupby(level = 0).sum()
+    rtt_df = pd.concat(rtt_sums).groupby(level = 0).sum()
+    pairs_df = sender_df.join(receiver_df, how = "outer").fillna(0).astype(np.int64)
+    rtt_df = rtt_df.reindex(pairs_df.index)
+
+    pairs_df.insert(0, "start_s", pairs_df.index * interval)
+    pairs_df["e2e_lost"] = pairs_df.pktSent - pairs_df.pktRecv
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        pairs_df["e2e_loss_pct"] = 100 * pairs_df.e2e_lost / pairs_df.pktSent.where(pairs_df.pktSent > 0)
+        pairs_df["retrans_efficiency_pct"] = (100 * pairs_df.pktRcvRetrans
+                                              / pairs_df.pktRetrans.where(pairs_df.pktRetrans > 0))
+    pairs_df["rtt_snd_ms"] = rtt_df["rtt_snd", "sum"] / rtt_df["rtt_snd", "count"]
+    pairs_df["rtt_rcv_ms"] = rtt_df["rtt_rcv", "sum"] / rtt_df["rtt_rcv", "count"]
+    pairs_df["rtt_asymmetry_ms"] = pairs_df.rtt_snd_ms - pairs_df.rtt_rcv_ms
+    pairs_df["aligned_rows"] = rtt_df["rtt_snd", "count"].fillna(0).astype(np.int64)
+    return pairs_df[PAIR_COLUMNS].reset_index(drop = True).round(3)
+
+
+def pair_totals(pairs_df):
+    """Aggregates the stats of the intervals into the stats of the whole link
+
+    Args:
+        pairs_df ([dataframe]): Stats of every interval
+
+    Returns:
+        totals ([dict]): End-to-end stats of the whole link
+    """
+    sent, received = pairs_df.pktSent.sum(), pairs_df.pktRecv.sum()
+    retrans, rcv_retrans = pairs_df.pktRetrans.sum(), pairs_df.pktRcvRetrans.sum()
+    weights = pairs_df.aligned_rows
+    return {
+        "pktSent": int(sent),
+        "pktRecv": int(received),
+        "e2e_lost": int(sent - received),
+        "e2e_loss_pct": round(float(100 * (sent - received) / sent), 3) if sent else None,
+        "pktRcvDrop": int(pairs_df.pktRcvDrop.sum()),
+        "retrans_efficiency_pct": round(float(100 * rcv_retrans / retrans), 3) if retrans else None,
+        "rtt_asymmetry_ms": (round(float((pairs_df.rtt_asymmetry_ms * weights).sum() / weights.sum()), 3)
+                             if weights.sum() else None),
+    }
+
+
+def _read_role(source, chunksize):
+    """Detects the role of a log file and returns the reader of its chunks
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        chunks ([generator]): Formatted chunks of the log file
+    """
+    typed = not layout_errors(read_header(source))
+    sender = is_sender(source)
+    return sender, read_chunks(source, sender, chunksize, typed)
+
+
+def analyze_pair(first_source, second_source, interval = DEFAULT_INTERVAL, tolerance = DEFAULT_TOLERANCE,
+                 chunksize = DEFAULT_CHUNKSIZE):
+    """Analyzes the sender and receiver log files of a link in streaming mode. The log files can be
+    given in any order, the sender is recognized from the first row.
+
+    Args:
+        first_source ([str or file]): Path to a log file or a file buffer
+        second_source ([str or file]): Path to the log file of the other end or a file buffer
+        interval ([float]): Length of the intervals in seconds
+        tolerance ([float]): Maximal distance in seconds between the aligned rows
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        pairs_df ([dataframe]): Stats of every interval, see PAIR_COLUMNS
+    """
+    first_sender, first_chunks = _read_role(first_source, chunksize)
+    second_sender, second_chunks = _read_role(second_source, chunksize)
+    if first_sender == second_sender:
+        role = "sender" if first_sender else "receiver"
+        raise ValueError(f"Both log files are {role} logs, a sender and a receiver log are needed")
+    if first_sender:
+        return pair_intervals(first_chunks, second_chunks, interval, tolerance)
+    return pair_intervals(second_chunks, first_chunks, interval, tolerance)
@@ -0,0 +1,251 @@
+"""Stage-level timing instrumentation of the analysis pipeline.
+
+Every stage, like the parsing of the CSV file or the summary stats, records its wall time, the number
+of processed rows and the peak memory of the process while the stage ran. The measures are kept in a
+short history for the diagnostics panel of the app and exported as Prometheus metrics, either served
+over HTTP or written into a text file for the textfile collector of the node exporter.
+
+The peak memory of a stage is the highest resident set size of the process sampled by a background
+thread every SAMPLE_INTERVAL while the stage runs, so it also covers the allocations of Arrow, which
+tracemalloc doesn't see, and nested or concurrent stages don't disturb each other. The peak growth is
+the peak over the resident set size at the start of the stage. Allocations shorter than the interval
+can be missed. The resident set size is read from /proc, on other platforms the peak is not reported.
+
+The Prometheus client is imported and the metrics are registered on the first measured stage, so the
+processes which never run a stage, like the workers which are just starting, don't pay for it.
+"""
+import collections
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Number of the last stage measures kept for the diagnostics panel
+HISTORY_SIZE = 200
+
+# Port of the /metrics endpoint and path of the metrics text file, both disabled by default
+METRICS_PORT = int(os.environ.get("SRT_METRICS_PORT", 0))
+METRICS_FILE = os.environ.get("SRT_METRICS_FILE")
+
+# Interval of the sampling of the resident set size while a stage runs, in seconds
+SAMPLE_INTERVAL = 0.005
+
+history = collections.deque(maxlen = HISTORY_SIZE)
+
+_metrics_lock = threading.Lock()
+_metrics = None
+
+_server_lock = threading.Lock()
+_server_port = None
+
+
+def metrics():
+    """Returns the Prometheus metrics of the pipeline, which are registered on the first call in a
+    registry separated from the default registry of the process
+
+    Returns:
+        metrics ([dict]): Registry and the stage metrics keyed by their name
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+            registry = CollectorRegistry()
+            _metrics = {
+                "registry": registry,
+                "seconds": Histogram("srt_stage_duration_seconds", "Wall time of the pipeline stages",
+                                     ["stage"], registry = registry,
+                                     buckets = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300,
+                                                float("inf"))),
+                "rows": Counter("srt_stage_rows", "Rows processed by the pipeline stages", ["stage"],
+                                registry = registry),
+                "rows_per_second": Gauge("srt_stage_rows_per_second",
+                                         "Throughput of the last run of the stages", ["stage"],
+                                         registry = registry),
+                "peak_memory": Gauge("srt_peak_memory_bytes",
+                                     "Peak resident set size during the last run of the stages",
+                                     ["stage"],
+                                     registry = registry),
+            }
+    return _metrics
+
+
+def current_memory():
+    """Returns the current resident set size of the process
+
+    Returns:
+        rss ([integer]): Memory in bytes, None if it can't be measured on this platform
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _MemorySampler:
+    """Background thread sampling the resident set size while at least one stage runs and keeping the
+    peak of every running stage.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.peaks = {}
+        self.thread = None
+
+    def _update(self, rss):
+        """Raises the peaks of the running stages to the sampled resident set size"""
+        with self.lock:
+            for token, peak in self.peaks.items():
+                if rss > peak:
+                    self.peaks[token] = rss
+
+    def _run(self):
+        """Samples the resident set size every SAMPLE_INTERVAL, sleeping while no stage runs"""
+        while True:
+            self.wake.wait()
+            self._update(current_memory())
+            time.sleep(SAMPLE_INTERVAL)
+
+    def start(self, rss):
+        """Starts tracking the peak of a stage
+
+        Args:
+            rss ([integer]): Resident set size at the start of the stage
+
+        Returns:
+            token ([object]): Token of the stage for stop
+        """
+        token = object()
+        with self.lock:
+            self.peaks[token] = rss
+            if self.thread is None:
+                self.thread = threading.Thread(target = self._run, name = "srt-memory-sampler", daemon = True)
+                self.thread.start()
+            self.wake.set()
+        return token
+
+    def stop(self, token, rss):
+        """Stops tracking the peak of a stage
+
+        Args:
+            token ([object]): Token returned by start
+            rss ([integer]): Resident set size at the end of the stage
+
+        Returns:
+            peak ([integer]): Peak resident set size while the stage ran
+        """
+        with self.lock:
+            peak = max(self.peaks.pop(token), rss)
+            if not self.peaks:
+                self.wake.clear()
+        return peak
+
+
+_sampler = _MemorySampler()
+
+
+@contextmanager
+def stage(name, rows = None):
+    """Measures a stage of the pipeline
+
+    Args:
+        name ([str]): Name of the stage
+        rows ([integer]): Number of processed rows, which can also be set later through the record
+
+    Yields:
+        record ([dict]): Measures of the stage, the "rows" key can be updated inside of the block
+    """
+    record = {"stage": name, "rows": rows}
+    rss_before = current_memory()
+    token = _sampler.start(rss_before) if rss_before is not None else None
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        peak = _sampler.stop(token, current_memory() or 0) if token is not None else None
+        record["seconds"] = round(seconds, 4)
+        record["rows_per_s"] = round(record["rows"] / seconds) if record["rows"] and seconds > 0 else None
+        record["peak_mb"] = round(peak / 1024 ** 2, 1) if peak is not None else None
+        record["peak_growth_mb"] = round((peak - rss_before) / 1024 ** 2, 1) if peak is not None else None
+        record["time"] = time.strftime("%H:%M:%S")
+        history.append(record)
+        stage_metrics = metrics()
+        stage_metrics["seconds"].labels(name).observe(seconds)
+        if record["rows"]:
+            stage_metrics["rows"].labels(name).inc(record["rows"])
+            stage_metrics["rows_per_second"].labels(name).set(record["rows_per_s"] or 0)
+        if peak is not None:
+            stage_metrics["peak_memory"].labels(name).set(peak)
+
+
+def _count_rows(value):
+    """Returns the number of rows of a dataframe or None for other values"""
+    return len(value) if hasattr(value, "columns") else None
+
+
+def profiled(name, rows = None):
+    """Decorator measuring every call of a pipeline function as a stage. Placed below @memoized only
+    the actual computations are measured, not the memo hits.
+
+    Args:
+        name ([str]): Name of the stage
+        rows ([callable]): Returns the number of processed rows from the result, the length of the
+            first argument when it is a dataframe by default
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    record["rows"] = rows(result)
+                elif args:
+                    record["rows"] = _count_rows(args[0])
+            return result
+        return wrapper
+    return decorator
+
+
+def metrics_text():
+    """Returns the metrics in the Prometheus text exposition format
+
+    Returns:
+        text ([bytes]): Exposition of all stage metrics
+    """
+    from prometheus_client import generate_latest
+    return generate_latest(metrics()["registry"])
+
+
+def write_metrics(path):
+    """Writes the metrics into a text file, which is replaced atomically, so the textfile collector
+    of the node exporter never reads a partial file
+
+    Args:
+        path ([str]): Path of the .prom file
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as metrics_file:
+        metrics_file.write(metrics_text())
+    os.replace(tmp_path, path)
+
+
+def serve_metrics(port):
+    """Serves the metrics over HTTP on the /metrics endpoint, only the first call starts the server
+
+    Args:
+        port ([integer]): TCP port of the endpoint
+
+    Returns:
+        port ([integer]): Port of the running endpoint
+    """
+    global _server_port
+    with _server_lock:
+        if _server_port is None:
+            from prometheus_client import start_http_server
+            start_http_server(port, registry = metrics()["registry"])
+            _server_port = port
+    return _server_port
@@ -0,0 +1,235 @@
+"""Rolling-window stats of the line: RTT jitter, loss rate and throughput.
+
+For every row the stats are computed over the rows of the last 1s, 10s or 60s of the log file. The
+windows are bounded by the elapsed time and not by a number of rows, so a window covers the same time
+span whatever the reporting period of srt-live-transmit is. Both bounds of the windows only move
+forward, which keeps all the stats linear in the number of rows:
+
+* the sums, means and variances are differences of cumulative sums
+* the minimum and maximum come from the monotonic deques of the pandas rolling aggregations
+* only the 95th percentile of the RTT uses a skiplist, which adds a log factor of the window size
+
+In streaming mode the rows of the last window of a chunk are carried into the next chunk, so the
+windows which span several chunks give the same stats as in the whole dataframe.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+from srt_analyzer.rollup import RollupBuilder
+from srt_analyzer.topk import MAX_K, TopK
+
+# Window sizes in seconds
+WINDOWS = (1, 10, 60)
+
+# Columns of the rolling stats
+ROLLING_METRICS = ["rtt_mean_ms", "rtt_jitter_ms", "rtt_p95_ms", "rtt_max_ms", "loss_pct", "throughput_mbps",
+                   "min_bandwidth_mbps"]
+
+# Titles of the rolling stats in the plots and tables
+ROLLING_LABELS = {"rtt_mean_ms": "Mean RTT, [ms]", "rtt_jitter_ms": "RTT Jitter (std), [ms]",
+                  "rtt_p95_ms": "95th Percentile RTT, [ms]", "rtt_max_ms": "Maximal RTT, [ms]",
+                  "loss_pct": "Loss Rate, [%]", "throughput_mbps": "Throughput, [Mbps]",
+                  "min_bandwidth_mbps": "Minimal Bandwidth, [Mbps]"}
+
+# The windows with the lowest throughput and the highest jitter and loss rate are the worst
+RANKED_METRICS = {"throughput_mbps": True, "rtt_jitter_ms": False, "rtt_p95_ms": False, "loss_pct": False}
+
+# Lost packets, sent or received packets and rate columns of SRT Sender and SRT Receiver
+SENDER_INPUTS = ("pktSndLoss", "pktSent", "mbpsSendRate")
+RECEIVER_INPUTS = ("pktRcvLoss", "pktRecv", "mbpsRecvRate")
+
+
+def window_bounds(milliseconds, window):
+    """Returns the rows of the window ending at every row. The integer milliseconds of the Time
+    column are compared, so the rows exactly one window apart are never included by a rounding error.
+
+    Args:
+        milliseconds ([array]): Sorted elapsed times in milliseconds
+        window ([float]): Window size in seconds
+
+    Returns:
+        start ([array]): First row of every window
+        end ([array]): Row after the last row of every window
+    """
+    end = np.arange(1, len(milliseconds) + 1, dtype = np.int64)
+    start = np.searchsorted(milliseconds, milliseconds - round(window * 1000), side = "right").astype(np.int64)
+    return start, end
+
+
+class _TimeWindows(BaseIndexer):
+    """Windows of the pandas rolling aggregations given by their precomputed bounds"""
+
+    def get_window_bounds(self, num_values = 0, min_periods = None, center = None, closed = None, step = None):
+        return self.start, self.end
+
+
+def _window_sums(values, start, end):
+    """Sums the values of every window as the difference of two cumulative sums
+
+    Args:
+        values ([array]): Values without NaN, the integers are summed exactly
+        start ([array]): First row of every window
+        end ([array]): Row after the last row of every window
+
+    Returns:
+        sums ([array]): Sum of every window
+    """
+    totals = np.concatenate(([0], np.cumsum(values)))
+    return totals[end] - totals[start]
+
+
+def rolling_frame(dataframe, sender, window):
+    """Computes the rolling stats over the windows ending at every row
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe or chunk sorted by the Time column
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        window ([float]): Window size in seconds
+
+    Returns:
+        rolling_df ([dataframe]): Seconds, Time and the ROLLING_METRICS of every row, with the index
+            of the input dataframe
+    """
+    lost_col, packets_col, rate_col = SENDER_INPUTS if sender else RECEIVER_INPUTS
+    start, end = window_bounds(dataframe.Time.to_numpy(np.int64), window)
+    rtt = dataframe.msRTT.to_numpy(np.float64)
+    valid = ~np.isnan(rtt)
+    # Centering the RTT on its first value keeps the variance of the cumulative sums accurate
+    reference = rtt[valid][0] if valid.any() else 0.0
+    centered = np.where(valid, rtt - reference, 0.0)
+    count = _window_sums(valid.astype(np.int64), start, end)
+    rtt_sum = _window_sums(centered, start, end)
+    rtt_squares = _window_sums(centered * centered, start, end)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        rtt_mean = rtt_sum / count
+        variance = (rtt_squares - rtt_sum * rtt_mean) / (count - 1)
+    jitter = np.sqrt(np.clip(variance, 0, None))
+
+    windows = _TimeWindows(start = start, end = end)
+    rtt_rolling = pd.Series(rtt, index = dataframe.index).rolling(windows, min_periods = 1)
+    bandwidth = dataframe.mbpsBandwidth.astype(np.float64).rolling(windows, min_periods = 1)
+
+    lost = _window_sums(dataframe[lost_col].to_numpy(np.int64), start, end)
+    packets = _window_sums(dataframe[packets_col].to_numpy(np.int64), start, end)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        loss_pct = np.where(packets + lost > 0, 100 * lost / (packets + lost), 0.0)
+    rate = np.nan_to_num(dataframe[rate_col].to_numpy(np.float64))
+
+    return pd.DataFrame({
+        "Seconds": dataframe.Seconds.to_numpy(),
+        "Time": dataframe.Time.to_numpy(),
+        "rtt_mean_ms": rtt_mean + reference,
+        "rtt_jitter_ms": jitter,
+        "rtt_p95_ms": rtt_rolling.quantile(0.95).to_numpy(),
+        "rtt_max_ms": rtt_rolling.max().to_numpy(),
+        "loss_pct": loss_pct,
+        "throughput_mbps": _window_sums(rate, start, end) / (end - start),
+        "min_bandwidth_mbps": bandwidth.min().to_numpy(),
+    }, index = dataframe.index)
+
+
+class RollingTopK(TopK):
+    """Index of the K worst windows of the line for the RANKED_METRICS.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        k ([integer]): Number of windows kept per metric
+    """
+
+    def __init__(self, sender, k = MAX_K):
+        super().__init__(sender, k)
+        self.columns = ["Time"] + ROLLING_METRICS
+        self.smallest = dict(RANKED_METRICS)
+        self.tables = dict.fromkeys(self.smallest)
+
+
+class RollingBuilder:
+    """Computes the rolling stats chunk by chunk, keeping only the worst windows and the rollup
+    pyramids of the rolling stats instead of a row per window.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        windows ([tuple]): Window sizes in seconds
+    """
+
+    def __init__(self, sender, windows = WINDOWS):
+        self.sender = sender
+        self.windows = windows
+        self.inputs = ["Seconds", "Time", "msRTT", "mbpsBandwidth"] + list(SENDER_INPUTS if sender
+                                                                             else RECEIVER_INPUTS)
+        self.carry = None
+        self.topk = {window: RollingTopK(sender) for window in windows}
+        self.rollup = {window: RollupBuilder(ROLLING_METRICS) for window in windows}
+
+    @property
+    def nbytes(self):
+        """Memory size of the carried rows, the worst windows and the partial rollups in bytes"""
+        size = 0 if self.carry is None else int(self.carry.memory_usage(index = True).sum())
+        return (size + sum(topk.nbytes for topk in self.topk.values())
+                + sum(builder.nbytes for builder in self.rollup.values()))
+
+    def update(self, chunk):
+        """Computes the rolling stats of the rows of a new chunk of the log file
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        if chunk.empty:
+            return
+        frame = chunk[self.inputs]
+        if self.carry is not None:
+            frame = pd.concat([self.carry, frame])
+        first = len(frame) - len(chunk)
+        for window in self.windows:
+            rolling_df = rolling_frame(frame, self.sender, window).iloc[first:]
+            self.topk[window].update(rolling_df)
+            self.rollup[window].update(rolling_df)
+        # Only the rows which can still be inside of the windows of the next chunk are carried
+        milliseconds = frame.Time.to_numpy()
+        self.carry = frame[milliseconds > milliseconds[-1] - round(max(self.windows) * 1000)]
+
+    def finish(self, window):
+        """Builds the rollup pyramid of the rolling stats of a window size
+
+        Args:
+            window ([float]): Window size in seconds
+
+        Returns:
+            pyramid ([Pyramid]): Rollup pyramid of the rolling stats, None if no rows were processed
+        """
+        return self.rollup[window].finish()
+
+
+@memoized
+@profiled("rolling")
+def rolling_stats(dataframe, sender, window):
+    """Returns the rolling stats of a whole dataframe
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        window ([float]): Window size in seconds
+
+    Returns:
+        rolling_df ([dataframe]): Seconds, Time and the ROLLING_METRICS of every row
+    """
+    return rolling_frame(dataframe, sender, window)
+
+
+@memoized
+def rolling_topk(dataframe, sender, window):
+    """Builds the index of the worst windows of a whole dataframe
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        window ([float]): Window size in seconds
+
+    Returns:
+        index ([RollingTopK]): Index of the worst windows
+    """
+    index = RollingTopK(sender)
+    index.update(rolling_stats(dataframe, sender, window))
+    return index
@@ -0,0 +1,246 @@
+"""Time-bucketed rollup pyramid for multi-resolution browsing of long log files.
+
+The rows of the log file are aggregated into buckets of 1s, 10s, 1min and 10min, every bucket holding
+the minimum, maximum, sum and mean of the metric columns. The pyramid is built in a single streaming
+pass: only the 1s level is aggregated from the rows, the coarser levels are aggregated from it. The
+views pick the finest resolution whose number of buckets in the requested time range fits the plot.
+"""
+import os
+import numpy as np
+import pandas as pd
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+from srt_analyzer.schema import log_stem
+
+# Bucket sizes of the levels of the pyramid in seconds
+RESOLUTIONS = (1, 10, 60, 600)
+
+# Time ranges with more rows than this are plotted from the pyramid instead of the downsampled rows
+ROLLUP_MIN_ROWS = 200000
+
+# Metric columns aggregated in the pyramid, only the ones present in the log file are used
+ROLLUP_METRICS = ["msRTT", "mbpsBandwidth", "mbpsSendRate", "mbpsRecvRate", "pktFlightSize",
+                  "pktSent", "pktSndLoss", "pktSndDrop", "pktRetrans",
+                  "pktRecv", "pktRcvLoss", "pktRcvDrop", "pktRcvRetrans"]
+
+# Aggregations of the partial buckets, which are merged when the buckets span several chunks
+_MERGE = {"min": "min", "max": "max", "sum": "sum"}
+
+# Number of partial 1s levels kept before they are merged, which bounds the memory of the builder
+_MAX_PARTIALS = 32
+
+
+def _merge_buckets(frames):
+    """Merges partial aggregates of the same buckets
+
+    Args:
+        frames ([list]): Aggregated dataframes indexed by the bucket number
+
+    Returns:
+        merged ([dataframe]): Aggregated dataframe with a single row per bucket
+    """
+    merged = pd.concat(frames) if len(frames) > 1 else frames[0]
+    if merged.index.is_unique:
+        return merged.sort_index()
+    aggregations = {col: _MERGE[col.rsplit("_", 1)[1]] for col in merged.columns if col != "count"}
+    aggregations["count"] = "sum"
+    return merged.groupby(level = 0, sort = True).agg(aggregations)
+
+
+class Pyramid:
+    """Levels of the rollup pyramid.
+
+    Args:
+        levels ([dict]): Aggregated dataframes keyed by the resolution in seconds, indexed by the
+            bucket number, with a <metric>_min, <metric>_max and <metric>_sum column per metric and
+            the count of rows in the bucket
+    """
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    @property
+    def nbytes(self):
+        """Memory size of the levels in bytes"""
+        return int(sum(level.memory_usage(index = True).sum() for level in self.levels.values()))
+
+    @property
+    def metrics(self):
+        """Names of the aggregated metric columns"""
+        level = self.levels[RESOLUTIONS[0]]
+        return [col[:-4] for col in level.columns if col.endswith("_min")]
+
+    def resolution_for(self, x_range, max_points):
+        """Selects the finest resolution whose number of buckets in the time range fits the plot
+
+        Args:
+            x_range ([tuple]): (start, end) of the time range in seconds
+            max_points ([integer]): Maximal number of plotted buckets
+
+        Returns:
+            resolution ([integer]): Bucket size in seconds, the coarsest one for very long ranges
+        """
+        span = x_range[1] - x_range[0]
+        for resolution in RESOLUTIONS:
+            if span / resolution <= max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def series(self, metric, resolution, x_range = None):
+        """Returns the aggregated series of a metric at the given resolution
+
+        Args:
+            metric ([str]): Metric column
+            resolution ([integer]): Bucket size in seconds
+            x_range ([tuple]): Optional (start, end) of the time range in seconds
+
+        Returns:
+            series_df ([dataframe]): Start of the bucket in seconds and the min, max and mean values
+        """
+        level = self.levels[resolution]
+        series_df = pd.DataFrame({
+            "Seconds": level.index.to_numpy() * resolution,
+            "min": level[f"{metric}_min"].to_numpy(),
+            "max": level[f"{metric}_max"].to_numpy(),
+            "mean": level[f"{metric}_sum"].to_numpy() / level["count"].to_numpy(),
+        })
+        if x_range is not None:
+            # Keeping the buckets which overlap the time range
+            overlap = (series_df.Seconds + resolution > x_range[0]) & (series_df.Seconds <= x_range[1])
+            series_df = series_df[overlap]
+        return series_df
+
+    def to_frame(self):
+        """Returns all levels of the pyramid as a single dataframe
+
+        Returns:
+            levels_df ([dataframe]): Rows of all levels with their resolution and bucket number
+        """
+        frames = [level.assign(resolution = resolution).rename_axis("bucket").reset_index()
+                  for resolution, level in self.levels.items()]
+        return pd.concat(frames, ignore_index = True)
+
+    @classmethod
+    def from_frame(cls, levels_df):
+        """Restores a pyramid from the dataframe returned by to_frame
+
+        Args:
+            levels_df ([dataframe]): Rows of all levels with their resolution and bucket number
+
+        Returns:
+            pyramid ([Pyramid]): Restored pyramid
+        """
+        levels = {}
+        for resolution, level in levels_df.groupby("resolution", sort = True):
+            levels[int(resolution)] = level.drop(columns = "resolution").set_index("bucket")
+        return cls(levels)
+
+    def save(self, path):
+        """Saves all levels of the pyramid into a single Parquet file
+
+        Args:
+            path ([str]): Path of the Parquet file
+        """
+        tmp_path = f"{path}.tmp"
+        self.to_frame().to_parquet(tmp_path, index = False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a pyramid saved into a Parquet file
+
+        Args:
+            path ([str]): Path of the Parquet file
+
+        Returns:
+            pyramid ([Pyramid]): Loaded pyramid
+        """
+        return cls.from_frame(pd.read_parquet(path))
+
+
+def pyramid_path(log_path):
+    """Returns the path of the pyramid persisted next to a log file
+
+    Args:
+        log_path ([str]): Path of the log file
+
+    Returns:
+        path ([str]): Path of the Parquet file of the pyramid
+    """
+    return f"{log_stem(log_path)}.rollup.parquet"
+
+
+class RollupBuilder:
+    """Builds the rollup pyramid chunk by chunk in a single pass over the log file.
+
+    Args:
+        metrics ([list]): Metric columns, the ROLLUP_METRICS present in the log file by default
+    """
+
+    def __init__(self, metrics = None):
+        self.metrics = metrics
+        self.partials = []
+
+    @property
+    def nbytes(self):
+        """Memory size of the partial aggregates in bytes"""
+        return int(sum(partial.memory_usage(index = True).sum() for partial in self.partials))
+
+    def update(self, chunk):
+        """Aggregates a chunk of the log file into the 1s buckets
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        if chunk.empty:
+            return
+        if self.metrics is None:
+            self.metrics = [col for col in ROLLUP_METRICS if col in chunk.columns]
+        buckets = np.floor(chunk.Seconds.to_numpy() / RESOLUTIONS[0]).astype(np.int64)
+        grouped = chunk[self.metrics].groupby(buckets, sort = True)
+        level = grouped.agg(list(_MERGE))
+        level.columns = [f"{metric}_{stat}" for metric, stat in level.columns]
+        level["count"] = grouped.size()
+        self.partials.append(level)
+        if len(self.partials) > _MAX_PARTIALS:
+            self.partials = [_merge_buckets(self.partials)]
+
+    def finish(self):
+        """Merges the partial aggregates and builds the coarser levels from the 1s level
+
+        Returns:
+            pyramid ([Pyramid]): Rollup pyramid, None if no rows were processed
+        """
+        if not self.partials:
+            return None
+        finest = _merge_buckets(self.partials)
+        self.partials = [finest]
+        levels = {RESOLUTIONS[0]: finest}
+        for resolution in RESOLUTIONS[1:]:
+            coarse = finest.copy()
+            coarse.index = coarse.index // (resolution // RESOLUTIONS[0])
+            levels[resolution] = _merge_buckets([coarse])
+        return Pyramid(levels)
+
+
+@memoized
+@profiled("rollup")
+def rollup_pyramid(dataframe, path = None):
+    """Returns the rollup pyramid of a whole dataframe, loading it from the path if it was already
+    built and persisting it there otherwise
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        path ([str]): Optional path of the persisted pyramid
+
+    Returns:
+        pyramid ([Pyramid]): Rollup pyramid of the dataframe
+    """
+    if path is not None and os.path.exists(path):
+        return Pyramid.load(path)
+    builder = RollupBuilder()
+    builder.update(dataframe)
+    pyramid = builder.finish()
+    if path is not None and pyramid is not None:
+        pyramid.save(path)
+    return pyramid
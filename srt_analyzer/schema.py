@@ -0,0 +1,255 @@
+"""Declared schema of the SRT CSV log files.
+
+Every one of the 30 columns written by srt-live-transmit is mapped to the narrowest safe dtype. The
+float columns are parsed directly into their dtype together with the list of columns relevant for the
+SRT Sender or Receiver. The C parser of pandas silently wraps integers which don't fit into the
+requested dtype and fails on a single missing value, so the integer counters are parsed with the
+inferred dtype and narrowed afterwards, only when all their values fit. The incomplete last row of a
+log file which is still being written is dropped instead of failing the whole file.
+
+The log files can also be compressed with gzip, xz or Zstandard. The compression is detected from the
+leading bytes of the file and the CSV parser decompresses it as a stream, chunk by chunk, so the
+decompressed text is never held in memory as a whole.
+"""
+import importlib.util
+import os
+import numpy as np
+import pandas as pd
+from srt_analyzer.profiling import profiled
+
+# The 30 columns of the SRT CSV log file in the order srt-live-transmit writes them
+SRT_SCHEMA = {
+    "Time": "int64",
+    "SocketID": "int32",
+    "pktFlowWindow": "uint32",
+    "pktCongestionWindow": "uint32",
+    "pktFlightSize": "int32",
+    "msRTT": "float32",
+    "mbpsBandwidth": "float32",
+    "mbpsMaxBW": "float32",
+    "pktSent": "uint32",
+    "pktSndLoss": "uint32",
+    "pktSndDrop": "uint32",
+    "pktRetrans": "uint32",
+    "byteSent": "uint64",
+    "byteSndDrop": "uint64",
+    "mbpsSendRate": "float32",
+    "usPktSndPeriod": "float32",
+    "pktRecv": "uint32",
+    "pktRcvLoss": "uint32",
+    "pktRcvDrop": "uint32",
+    "pktRcvRetrans": "uint32",
+    "pktRcvBelated": "uint32",
+    "byteRecv": "uint64",
+    "byteRcvLoss": "uint64",
+    "byteRcvDrop": "uint64",
+    "mbpsRecvRate": "float32",
+    "RCVLATENCYms": "uint16",
+    "pktSndFilterExtra": "uint32",
+    "pktRcvFilterExtra": "uint32",
+    "pktRcvFilterSupply": "uint32",
+    "pktRcvFilterLoss": "uint32",
+}
+
+SRT_COLUMNS = list(SRT_SCHEMA)
+
+# Integer counters which are narrowed after parsing, a missing value means an incomplete row
+INTEGER_COLUMNS = [col for col, dtype in SRT_SCHEMA.items() if "int" in dtype]
+
+# Columns which are relevant only for SRT Receiver logs
+RECEIVER_COLUMNS = ["pktRecv", "pktRcvLoss", "pktRcvDrop", "pktRcvRetrans", "pktRcvBelated",
+                    "byteRecv", "byteRcvLoss", "byteRcvDrop", "mbpsRecvRate", "mbpsMaxBW",
+                    "pktRcvFilterExtra", "pktRcvFilterSupply", "pktRcvFilterLoss"]
+
+# Columns which are relevant only for SRT Sender logs
+SENDER_COLUMNS = ["pktSent", "pktSndLoss", "pktSndDrop", "pktRetrans", "byteSent",
+                  "byteSndDrop", "mbpsSendRate", "mbpsMaxBW", "pktSndFilterExtra"]
+
+# Columns written by every version of srt-live-transmit, a file without them isn't an SRT statistics log
+REQUIRED_COLUMNS = ["Time", "msRTT", "mbpsBandwidth", "byteSent", "byteRecv"]
+
+# Lost, Dropped and Retransmitted Data Packets columns for SRT Sender and SRT Receiver
+SENDER_IMPAIRMENTS = ["pktSndLoss", "pktSndDrop", "pktRetrans"]
+RECEIVER_IMPAIRMENTS = ["pktRcvLoss", "pktRcvDrop", "pktRcvRetrans"]
+
+
+def read_header(source):
+    """Reads only the header of the log file and moves a file buffer back to its beginning
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+
+    Returns:
+        columns ([list]): Column names of the log file
+    """
+    columns = list(pd.read_csv(source, nrows = 0, compression = compression_of(source)).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return columns
+
+
+def layout_errors(columns):
+    """Validates the column layout of the log file against the SRT schema
+
+    Args:
+        columns ([list]): Column names of the log file
+
+    Returns:
+        errors ([list]): Description of every layout problem, empty for a valid SRT log file
+    """
+    errors = []
+    if len(columns) != len(SRT_COLUMNS):
+        errors.append(f"The uploaded file has {len(columns)} columns instead of {len(SRT_COLUMNS)}!")
+    missing = [col for col in SRT_COLUMNS if col not in columns]
+    if missing:
+        errors.append(f"Missing SRT columns: {', '.join(missing)}")
+    unknown = [col for col in columns if col not in SRT_SCHEMA]
+    if unknown:
+        errors.append(f"Unknown columns: {', '.join(unknown)}")
+    return errors
+
+
+def check_columns(columns):
+    """Checks that the file is an SRT statistics log at all, unlike layout_errors, which reports the
+    deviations of an SRT log file from the schema. ValueError is raised for any other CSV file.
+
+    Args:
+        columns ([list]): Column names of the log file
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f"The file is not an SRT statistics log, it has no {', '.join(missing)} column")
+
+
+# Leading bytes of the compressed log files mapped to the compression argument of read_csv
+COMPRESSION_MAGIC = {b"\x1f\x8b": "gzip", b"\xfd7zXZ\x00": "xz", b"\x28\xb5\x2f\xfd": "zstd"}
+
+# Extensions of the compressed log files
+COMPRESSED_EXTENSIONS = ["gz", "xz", "zst"]
+
+
+def compression_of(source):
+    """Detects the compression of the log file from its leading bytes, regardless of its extension
+
+    Args:
+        source ([str or file]): Path to the log file or a binary file buffer
+
+    Returns:
+        compression ([str]): Compression argument of read_csv, None for an uncompressed log file
+    """
+    length = max(len(magic) for magic in COMPRESSION_MAGIC)
+    if hasattr(source, "read"):
+        position = source.tell()
+        head = source.read(length)
+        source.seek(position)
+    else:
+        with open(source, "rb") as log_file:
+            head = log_file.read(length)
+    if not isinstance(head, bytes):
+        # Text buffers are never compressed
+        return None
+    for magic, compression in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            # The Zstandard compressed log files are read only when the optional zstandard package is
+            # installed, which is looked up without importing it
+            if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+                raise ValueError("Reading Zstandard compressed log files requires the zstandard package")
+            return compression
+    return None
+
+
+def log_stem(path):
+    """Returns the path of the log file without the CSV and compression extensions
+
+    Args:
+        path ([str]): Path of the log file, like srt_stats.csv.gz
+
+    Returns:
+        stem ([str]): Path without the extensions, like srt_stats
+    """
+    stem, extension = os.path.splitext(path)
+    if extension.lstrip(".") in COMPRESSED_EXTENSIONS:
+        stem, extension = os.path.splitext(stem)
+    return stem if extension == ".csv" else f"{stem}{extension}"
+
+
+def relevant_columns(sender):
+    """Returns the columns of the log file relevant for SRT Sender or SRT Receiver
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        columns ([list]): Relevant column names in the order of the log file
+    """
+    dropped = set(RECEIVER_COLUMNS if sender else SENDER_COLUMNS)
+    dropped.add("SocketID")
+    return [col for col in SRT_COLUMNS if col not in dropped]
+
+
+def read_options(sender, typed = True):
+    """Returns the read_csv keyword arguments which apply the schema at parse time
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        typed ([bool]): False for log files not matching the SRT schema, which are parsed with
+            the default dtypes and only the redundant columns are skipped
+
+    Returns:
+        options ([dict]): The usecols and dtype arguments of read_csv
+    """
+    if typed:
+        usecols = relevant_columns(sender)
+        return {"usecols": usecols,
+                "dtype": {col: SRT_SCHEMA[col] for col in usecols if col not in INTEGER_COLUMNS}}
+    dropped = set(RECEIVER_COLUMNS if sender else SENDER_COLUMNS)
+    dropped.add("SocketID")
+    return {"usecols": lambda col: col not in dropped}
+
+
+def apply_schema(chunk):
+    """Narrows the integer counters of a parsed chunk to their dtypes of the SRT schema
+
+    The rows with a missing counter are dropped, as they are left by a log file cut off in the middle
+    of a row. A counter with a value out of the range of its dtype keeps the wider inferred dtype,
+    so its values never wrap around.
+
+    Args:
+        chunk ([dataframe]): Chunk of the log file parsed with the typed read_csv options
+
+    Returns:
+        chunk ([dataframe]): Chunk with the narrowed counters and only the complete rows
+    """
+    columns = [col for col in INTEGER_COLUMNS if col in chunk.columns]
+    for col in columns:
+        if chunk[col].dtype == object:
+            chunk[col] = pd.to_numeric(chunk[col], errors = "coerce")
+    incomplete = chunk[columns].isna().any(axis = 1)
+    if incomplete.any():
+        chunk = chunk[~incomplete].copy()
+    for col in columns:
+        values = chunk[col]
+        limits = np.iinfo(SRT_SCHEMA[col])
+        if values.empty or (values.min() >= limits.min and values.max() <= limits.max):
+            chunk[col] = values.astype(SRT_SCHEMA[col])
+    return chunk
+
+
+@profiled("parse", rows = len)
+def read_log(source, sender, typed = True):
+    """Reads the whole log file applying the SRT schema at parse time
+
+    Args:
+        source ([str or file]): Path to the log file or a file buffer
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        typed ([bool]): False for log files not matching the SRT schema
+
+    Returns:
+        dataframe ([dataframe]): Log file without the redundant columns, ValueError is raised for a
+            file which isn't an SRT statistics log
+    """
+    # The whole header is checked, since the parsed columns of a sender or receiver log never hold all
+    # of the REQUIRED_COLUMNS
+    check_columns(read_header(source))
+    dataframe = pd.read_csv(source, compression = compression_of(source), **read_options(sender, typed))
+    return apply_schema(dataframe) if typed else dataframe
@@ -0,0 +1,385 @@
+"""Local HTTP analysis service returning the analysis of the SRT CSV log files as JSON.
+
+A log file is either uploaded as the raw request body or given as a path on the server, below one of
+the allowed root directories. The uploaded log file is written to a temporary file and hashed while it
+is received, so it is never held in memory as a whole. The analysis runs on a bounded pool of worker
+processes, which keeps the event loop free to serve many clients at the same time. At most
+--max-queue log files wait for a free worker, further requests are rejected with 503 until the queue
+drains.
+
+The results are cached by the hash of the log file content: a log file which was already analyzed,
+or which is being analyzed for another client, is never parsed again. Every result holds the main
+stats, the general stats, the tail percentiles, the MAX_K worst rows of the line and the detected
+events.
+
+Usage:
+    python -m srt_analyzer.service --port 8765 --jobs 4 --root /var/log/srt
+    curl --data-binary @srt_stats.csv "http://localhost:8765/analyze?top=5"
+    curl "http://localhost:8765/analyze?path=/var/log/srt/srt_stats.csv"
+    curl "http://localhost:8765/health"
+"""
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import tornado.ioloop
+import tornado.web
+from srt_analyzer import cache
+from srt_analyzer.core import index_tables
+from srt_analyzer.events import EventDetector
+from srt_analyzer.ingest import DEFAULT_CHUNKSIZE, StreamStats, is_sender, read_chunks
+from srt_analyzer.schema import layout_errors, read_header
+from srt_analyzer.topk import MAX_K
+
+DEFAULT_PORT = 8765
+
+# Maximal number of log files waiting for a free worker process
+DEFAULT_QUEUE = 16
+
+# Number of analysis results kept in memory
+RESULT_CACHE_SIZE = 256
+
+# Maximal size of an uploaded log file in bytes
+DEFAULT_MAX_BODY_SIZE = 4 * 1024 ** 3
+
+# Number of the worst rows returned per table, unless the top query argument is given
+DEFAULT_TOP = 10
+
+
+def _records(dataframe):
+    """Converts a dataframe into a list of JSON objects, NaN values become null"""
+    return json.loads(dataframe.to_json(orient = "records"))
+
+
+def _json_value(value):
+    """Converts NumPy scalars into Python values, which can be encoded as JSON"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def analyze_log(path, chunksize = DEFAULT_CHUNKSIZE):
+    """Analyzes a log file, which is run in a worker process
+
+    Args:
+        path ([str]): Path to the log file, which can be compressed
+        chunksize ([integer]): Maximal number of rows in a chunk
+
+    Returns:
+        result ([dict]): JSON-ready analysis of the log file, ValueError is raised for a log file
+            without rows
+    """
+    # Rejecting the files which aren't SRT statistics logs before anything else is parsed
+    sender = is_sender(path)
+    errors = layout_errors(read_header(path))
+    stats = StreamStats(sender)
+    for chunk in read_chunks(path, sender, chunksize, typed = not errors):
+        stats.update(chunk)
+    if stats.summary is None:
+        raise ValueError("The log file has no rows")
+    # The collapse of the bandwidth is relative to its median over the whole log file, so the events
+    # are detected in a second pass over the chunks, with the median estimated by the sketch
+    median_bandwidth = stats.distributions.quantiles("mbpsBandwidth", (0.5,))[0]
+    detector = EventDetector(sender, median_bandwidth)
+    for chunk in read_chunks(path, sender, chunksize, typed = not errors):
+        detector.update(chunk)
+    events = detector.finish()
+    tables = index_tables(stats.topk, stats.summary, MAX_K)
+    return {
+        "sender": sender,
+        "layout_errors": errors,
+        "summary": {name: _json_value(value) for name, value in stats.record().items()},
+        "stats": _records(stats.summary.describe().rename_axis("column").reset_index()),
+        "percentiles": _records(stats.distributions.percentiles().rename_axis("metric").reset_index()),
+        "top": {sheet: None if table is None else _records(table) for sheet, table in tables.items()},
+        "events": _records(events),
+    }
+
+
+class AnalysisService:
+    """Pool of worker processes with a bounded queue and the cache of the analysis results.
+
+    Args:
+        jobs ([integer]): Number of worker processes, the number of CPU cores by default
+        max_queue ([integer]): Maximal number of log files waiting for a free worker
+        roots ([list]): Directories whose log files can be analyzed by their path
+        chunksize ([integer]): Maximal number of rows in a chunk
+    """
+
+    def __init__(self, jobs = None, max_queue = DEFAULT_QUEUE, roots = (), chunksize = DEFAULT_CHUNKSIZE):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.chunksize = chunksize
+        # Spawned workers don't inherit the threads and sockets of the server, unlike forked workers
+        self.executor = ProcessPoolExecutor(max_workers = self.jobs,
+                                            mp_context = multiprocessing.get_context("spawn"))
+        self.results = collections.OrderedDict()
+        self.pending = {}
+
+    @property
+    def busy(self):
+        """True if all workers are busy and the queue is full"""
+        return len(self.pending) >= self.jobs + self.max_queue
+
+    def status(self):
+        """Returns the load of the service
+
+        Returns:
+            status ([dict]): Number of workers, running and queued analyses and cached results
+        """
+        return {"workers": self.jobs, "running": min(len(self.pending), self.jobs),
+                "queued": max(len(self.pending) - self.jobs, 0), "cached": len(self.results)}
+
+    def allowed(self, path):
+        """Checks whether a path on the server is below one of the allowed root directories
+
+        Args:
+            path ([str]): Path to the log file
+
+        Returns:
+            allowed ([bool]): True if the log file can be analyzed
+        """
+        real_path = os.path.realpath(path)
+        return any(os.path.commonpath([real_path, root]) == root for root in self.roots)
+
+    def cached(self, key):
+        """Returns the cached result of a log file, None if it wasn't analyzed yet"""
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def _store(self, key, future):
+        """Stores the result of a finished analysis and evicts the least recently used results"""
+        self.pending.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.results[key] = future.result()
+        while len(self.results) > RESULT_CACHE_SIZE:
+            self.results.popitem(last = False)
+
+    async def analyze(self, key, path, temporary = False):
+        """Analyzes a log file on the worker processes, unless its result is cached. The requests for
+        a log file which is already being analyzed wait for the same analysis.
+
+        Args:
+            key ([str]): Hash of the log file content
+            path ([str]): Path to the log file
+            temporary ([bool]): True to remove the log file once it's no longer needed, which is after
+                the analysis, even if the client disconnects before it finishes
+
+        Returns:
+            result ([dict]): JSON-ready analysis of the log file
+        """
+        result = self.cached(key)
+        future = self.pending.get(key)
+        if result is None and future is None:
+            future = asyncio.wrap_future(self.executor.submit(analyze_log, path, self.chunksize))
+            future.add_done_callback(lambda done: self._store(key, done))
+            if temporary:
+                future.add_done_callback(lambda done: os.remove(path))
+            self.pending[key] = future
+        elif temporary:
+            # The same log file is already analyzed or being analyzed from another copy of it
+            os.remove(path)
+        if result is not None:
+            return result
+        # Shielded, so a client which disconnects doesn't cancel the analysis for the other clients
+        return await asyncio.shield(future)
+
+    def shutdown(self):
+        """Stops the worker processes"""
+        self.executor.shutdown(wait = False)
+
+
+class JSONHandler(tornado.web.RequestHandler):
+    """Request handler replying with JSON objects, also for the errors"""
+
+    def initialize(self, service):
+        self.service = service
+
+    def write_error(self, status_code, **kwargs):
+        # The message of the error is sent in the body, the reason of the status line stays short
+        error = kwargs.get("exc_info", (None, None, None))[1]
+        message = getattr(error, "log_message", None)
+        self.finish({"error": message % error.args if message else self._reason})
+
+
+class HealthHandler(JSONHandler):
+    """Reports the load of the service"""
+
+    def get(self):
+        self.write(dict(status = "ok", **self.service.status()))
+
+
+@tornado.web.stream_request_body
+class AnalyzeHandler(JSONHandler):
+    """Analyzes the log file uploaded as the request body (POST) or given by its path (GET)"""
+
+    def initialize(self, service):
+        super().initialize(service)
+        self.upload = None
+        self.hasher = None
+
+    def prepare(self):
+        if self.request.method != "POST":
+            return
+        # The upload is rejected before its body is received when the queue is full
+        if self.service.busy:
+            self.set_header("Retry-After", "5")
+            raise tornado.web.HTTPError(503, "All workers are busy and the queue is full")
+        self.upload = tempfile.NamedTemporaryFile(prefix = "srt_upload_", suffix = ".csv", delete = False)
+        self.hasher = cache.content_hasher()
+
+    def data_received(self, chunk):
+        self.upload.write(chunk)
+        self.hasher.update(chunk)
+
+    def _remove_upload(self):
+        """Removes the temporary file of the uploaded log file"""
+        if self.upload is not None:
+            self.upload.close()
+            if os.path.exists(self.upload.name):
+                os.remove(self.upload.name)
+            self.upload = None
+
+    def on_finish(self):
+        self._remove_upload()
+
+    def on_connection_close(self):
+        self._remove_upload()
+
+    def _top(self):
+        """Returns the number of the worst rows requested by the client"""
+        try:
+            top = int(self.get_query_argument("top", DEFAULT_TOP))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "The top argument has to be an integer")
+        return min(max(top, 1), MAX_K)
+
+    async def post(self):
+        top = self._top()
+        self.upload.close()
+        if not os.path.getsize(self.upload.name):
+            raise tornado.web.HTTPError(400, "The request body has to be the log file")
+        # The temporary file is handed over to the service, which removes it after the analysis
+        path = self.upload.name
+        self.upload = None
+        await self._respond(self.hasher.hexdigest(), path, top, temporary = True)
+
+    async def get(self):
+        top = self._top()
+        path = self.get_query_argument("path", None)
+        if not path:
+            raise tornado.web.HTTPError(400, "Upload the log file with POST or give its path")
+        if not self.service.allowed(path):
+            raise tornado.web.HTTPError(403, "The path is not below an allowed root directory")
+        if not os.path.isfile(path):
+            raise tornado.web.HTTPError(404, "No such log file: %s", path)
+        # Hashing a large log file for the first time takes a while, which would block the event loop
+        key = await tornado.ioloop.IOLoop.current().run_in_executor(None, cache.file_hash, path)
+        await self._respond(key, path, top)
+
+    async def _respond(self, key, path, top, temporary = False):
+        """Replies with the analysis of a log file
+
+        Args:
+            key ([str]): Hash of the log file content
+            path ([str]): Path to the log file
+            top ([integer]): Number of the worst rows per table
+            temporary ([bool]): True for an uploaded log file, which is removed after the analysis
+        """
+        cached = self.service.cached(key) is not None
+        if not cached and key not in self.service.pending and self.service.busy:
+            if temporary:
+                os.remove(path)
+            self.set_header("Retry-After", "5")
+            raise tornado.web.HTTPError(503, "All workers are busy and the queue is full")
+        try:
+            result = await self.service.analyze(key, path, temporary)
+        except ValueError as error:
+            # Not an SRT statistics log or a log file without rows
+            raise tornado.web.HTTPError(400, "%s", error)
+        except Exception as error:
+            raise tornado.web.HTTPError(422, "%s: %s", type(error).__name__, error)
+        response = dict(result, key = key, cached = cached)
+        response["top"] = {sheet: None if rows is None else rows[:top]
+                            for sheet, rows in result["top"].items()}
+        self.write(response)
+
+
+def make_app(service):
+    """Creates the web application of the service
+
+    Args:
+        service ([AnalysisService]): Worker pool and result cache
+
+    Returns:
+        app ([Application]): Tornado web application
+    """
+    return tornado.web.Application([
+        (r"/analyze", AnalyzeHandler, {"service": service}),
+        (r"/health", HealthHandler, {"service": service}),
+    ])
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(prog = "srt_analyzer.service",
+                                     description = "Serve the analysis of SRT CSV log files as JSON")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT,
+                        help = f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--address", default = "127.0.0.1", help = "listening address (default: 127.0.0.1)")
+    parser.add_argument("-j", "--jobs", type = int, default = None,
+                        help = "number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--max-queue", type = int, default = DEFAULT_QUEUE,
+                        help = f"log files waiting for a free worker (default: {DEFAULT_QUEUE})")
+    parser.add_argument("--root", action = "append", default = [],
+                        help = "directory whose log files can be analyzed by their path, can be repeated")
+    parser.add_argument("--chunksize", type = int, default = DEFAULT_CHUNKSIZE,
+                        help = f"rows parsed at once (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--max-body-size", type = int, default = DEFAULT_MAX_BODY_SIZE,
+                        help = f"maximal size of an uploaded log file in bytes "
+                               f"(default: {DEFAULT_MAX_BODY_SIZE})")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    """Runs the service until the process is stopped
+
+    Args:
+        args ([Namespace]): Parsed command-line arguments
+    """
+    service = AnalysisService(args.jobs, args.max_queue, args.root, args.chunksize)
+    server = make_app(service).listen(args.port, args.address, max_body_size = args.max_body_size)
+    print(f"Serving the SRT log analysis on http://{args.address}:{args.port}", file = sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.shutdown()
+
+
+def main(argv = None):
+    """Entry point of the analysis service
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): Always 0
+    """
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
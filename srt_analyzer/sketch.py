@@ -0,0 +1,340 @@
+"""Mergeable distribution sketches of the line metrics: tail percentiles and histograms.
+
+The quantiles of the describe method need the sorted values of the whole column, which are never held
+in streaming mode and can't be combined across log files. Instead, every value is counted in two sets
+of integer bins while the log file is read, in a single pass and chunk by chunk:
+
+* the logarithmic bins of the quantile sketch (DDSketch), whose bounds grow by a constant factor, so
+  every quantile is estimated within RELATIVE_ACCURACY of its exact value, from p50 up to p99.9
+* the fixed-width bins of the histogram, with a width per metric
+
+Only the non-empty bins are kept and their number depends on the range of the values, not on the
+number of rows. The bins are absolute, so the sketches of different chunks, log files or of the whole
+fleet are merged by adding the counts of the same bins, which gives the same result as sketching all
+the rows at once.
+"""
+import math
+import numpy as np
+import pandas as pd
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+
+# Metric columns with a distribution sketch, the ones present in the log file are sketched
+SKETCH_METRICS = ["msRTT", "mbpsBandwidth", "mbpsSendRate", "mbpsRecvRate", "usPktSndPeriod"]
+
+# Titles of the metrics in the plots and tables
+SKETCH_LABELS = {"msRTT": "RTT, [ms]", "mbpsBandwidth": "Bandwidth, [Mbps]",
+                 "mbpsSendRate": "Send Rate, [Mbps]", "mbpsRecvRate": "Receive Rate, [Mbps]",
+                 "usPktSndPeriod": "Packet Send Period, [us]"}
+
+# Maximal relative error of the estimated quantiles
+RELATIVE_ACCURACY = 0.01
+
+# Percentiles reported for every metric
+TAIL_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+# Width of the histogram bins in the unit of every metric
+HISTOGRAM_WIDTHS = {"msRTT": 1.0, "mbpsBandwidth": 10.0, "mbpsSendRate": 0.1, "mbpsRecvRate": 0.1,
+                    "usPktSndPeriod": 1.0}
+
+# Maximal number of plotted histogram bars, the adjacent bins are merged above it
+DEFAULT_BARS = 100
+
+# The values at or below this one are counted in the zero bin of the quantile sketch, the metrics
+# are never negative
+MIN_VALUE = 1e-6
+
+# Maximal number of bins of a quantile sketch, the lowest bins are merged above it
+MAX_BINS = 4096
+
+# Maximal span of the bins of a chunk which are counted in a dense array, the bins spread wider by
+# outliers are counted by sorting them
+MAX_DENSE_SPAN = 2 ** 20
+
+# Key of the zero bin, which sorts before all the logarithmic bins
+ZERO_BIN = np.iinfo(np.int64).min
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def sketch_bins(values):
+    """Maps the values to the logarithmic bins of the quantile sketch
+
+    Args:
+        values ([array]): Values without NaN
+
+    Returns:
+        bins ([array]): Bin of every value, ZERO_BIN for the values at or below MIN_VALUE
+    """
+    bins = np.full(len(values), ZERO_BIN, dtype = np.int64)
+    positive = values > MIN_VALUE
+    bins[positive] = np.ceil(np.log(values[positive]) / _LOG_GAMMA)
+    return bins
+
+
+def sketch_values(bins):
+    """Returns the value represented by every bin of the quantile sketch, which is within
+    RELATIVE_ACCURACY of all the values of the bin
+
+    Args:
+        bins ([array]): Bins of the quantile sketch
+
+    Returns:
+        values ([array]): Value of every bin
+    """
+    bins = np.asarray(bins, dtype = np.int64)
+    zero = bins == ZERO_BIN
+    values = 2 * np.power(_GAMMA, np.where(zero, 0, bins).astype(np.float64)) / (_GAMMA + 1)
+    return np.where(zero, 0.0, values)
+
+
+class BinCounts:
+    """Sparse counts of integer bins, sorted by the bin.
+
+    Args:
+        bins ([array]): Non-empty bins
+        counts ([array]): Number of values of every bin
+    """
+
+    def __init__(self, bins = None, counts = None):
+        self.bins = np.empty(0, np.int64) if bins is None else np.asarray(bins, dtype = np.int64)
+        self.counts = np.empty(0, np.int64) if counts is None else np.asarray(counts, dtype = np.int64)
+
+    @property
+    def nbytes(self):
+        """Memory size of the bins and counts in bytes"""
+        return self.bins.nbytes + self.counts.nbytes
+
+    @property
+    def total(self):
+        """Number of counted values"""
+        return int(self.counts.sum())
+
+    def add(self, bins):
+        """Counts the bins of new values
+
+        Args:
+            bins ([array]): Bin of every value
+        """
+        if not len(bins):
+            return
+        # The bins of a chunk usually span a narrow range, so they are counted in linear time without
+        # sorting, unless a single outlier would make the dense array of counts huge
+        regular = bins[bins != ZERO_BIN]
+        new_bins, new_counts = [], []
+        if len(regular):
+            low = regular.min()
+            if regular.max() - low <= MAX_DENSE_SPAN:
+                counts = np.bincount(regular - low)
+                nonzero = np.flatnonzero(counts)
+                new_bins.append(nonzero + low)
+                new_counts.append(counts[nonzero])
+            else:
+                unique_bins, counts = np.unique(regular, return_counts = True)
+                new_bins.append(unique_bins)
+                new_counts.append(counts)
+        if len(regular) < len(bins):
+            new_bins.append(np.array([ZERO_BIN]))
+            new_counts.append(np.array([len(bins) - len(regular)]))
+        merged = self.merge(BinCounts(np.concatenate(new_bins), np.concatenate(new_counts)))
+        self.bins, self.counts = merged.bins, merged.counts
+
+    def merge(self, other):
+        """Adds the counts of the same bins
+
+        Args:
+            other ([BinCounts]): Counts of another chunk or log file
+
+        Returns:
+            counts ([BinCounts]): Merged counts
+        """
+        if not len(self.bins):
+            return BinCounts(other.bins, other.counts)
+        bins, inverse = np.unique(np.concatenate([self.bins, other.bins]), return_inverse = True)
+        counts = np.zeros(len(bins), np.int64)
+        np.add.at(counts, inverse, np.concatenate([self.counts, other.counts]))
+        return BinCounts(bins, counts)
+
+    def collapse(self, max_bins):
+        """Merges the lowest bins into a single one, so at most max_bins are kept. The quantiles of the
+        highest bins, like the tail percentiles, are not affected.
+
+        Args:
+            max_bins ([integer]): Maximal number of bins
+        """
+        excess = len(self.bins) - max_bins
+        if excess > 0:
+            self.counts = np.concatenate([[self.counts[:excess + 1].sum()], self.counts[excess + 1:]])
+            self.bins = self.bins[excess:]
+
+
+class Distributions:
+    """Quantile sketches and histograms of the SKETCH_METRICS, which are updated chunk by chunk and
+    merged across log files.
+
+    Args:
+        metrics ([list]): Metric columns, the SKETCH_METRICS present in the log file by default
+        sketches ([dict]): BinCounts of the quantile sketch keyed by the metric
+        histograms ([dict]): BinCounts of the histogram keyed by the metric
+    """
+
+    def __init__(self, metrics = None, sketches = None, histograms = None):
+        self.metrics = metrics
+        self.sketches = sketches or {}
+        self.histograms = histograms or {}
+
+    @property
+    def nbytes(self):
+        """Memory size of the sketches and histograms in bytes"""
+        counts = list(self.sketches.values()) + list(self.histograms.values())
+        return sum(bin_counts.nbytes for bin_counts in counts)
+
+    def update(self, chunk):
+        """Counts the values of a new chunk of the log file
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        if chunk.empty:
+            return
+        if self.metrics is None:
+            self.metrics = [col for col in SKETCH_METRICS if col in chunk.columns]
+        for metric in self.metrics:
+            values = chunk[metric].to_numpy(np.float64)
+            values = values[~np.isnan(values)]
+            sketch = self.sketches.setdefault(metric, BinCounts())
+            sketch.add(sketch_bins(values))
+            sketch.collapse(MAX_BINS)
+            histogram_bins = np.floor(values / HISTOGRAM_WIDTHS[metric]).astype(np.int64)
+            self.histograms.setdefault(metric, BinCounts()).add(histogram_bins)
+
+    def merge(self, other):
+        """Merges the distributions of another chunk or log file, the metrics of both are kept
+
+        Args:
+            other ([Distributions]): Distributions of another chunk or log file
+
+        Returns:
+            distributions ([Distributions]): Merged distributions
+        """
+        metrics = list(self.metrics or [])
+        metrics += [metric for metric in other.metrics or [] if metric not in metrics]
+        sketches = {}
+        histograms = {}
+        for metric in metrics:
+            sketches[metric] = self.sketches.get(metric, BinCounts()).merge(
+                other.sketches.get(metric, BinCounts()))
+            sketches[metric].collapse(MAX_BINS)
+            histograms[metric] = self.histograms.get(metric, BinCounts()).merge(
+                other.histograms.get(metric, BinCounts()))
+        return Distributions(metrics, sketches, histograms)
+
+    def count(self, metric):
+        """Returns the number of sketched values of a metric"""
+        return self.sketches[metric].total if metric in self.sketches else 0
+
+    def quantiles(self, metric, quantiles = TAIL_QUANTILES):
+        """Estimates the quantiles of a metric within RELATIVE_ACCURACY
+
+        Args:
+            metric ([str]): Metric column
+            quantiles ([tuple]): Quantiles between 0 and 1
+
+        Returns:
+            values ([array]): Estimated quantiles, NaN if the metric has no values
+        """
+        sketch = self.sketches.get(metric)
+        if sketch is None or not sketch.total:
+            return np.full(len(quantiles), np.nan)
+        cumulative = np.cumsum(sketch.counts)
+        # The same rank as the linear interpolation of the describe method, rounded down to a value
+        ranks = np.floor(np.asarray(quantiles) * (cumulative[-1] - 1))
+        return sketch_values(sketch.bins[np.searchsorted(cumulative, ranks, side = "right")])
+
+    def percentiles(self, quantiles = TAIL_QUANTILES):
+        """Returns the tail percentiles of all metrics
+
+        Args:
+            quantiles ([tuple]): Quantiles between 0 and 1
+
+        Returns:
+            percentiles_df ([dataframe]): Count and percentiles with a row per metric
+        """
+        columns = [f"p{q * 100:g}" for q in quantiles]
+        metrics = self.metrics or []
+        rows = [self.quantiles(metric, quantiles) for metric in metrics]
+        percentiles_df = pd.DataFrame(rows, index = metrics, columns = columns).round(3)
+        percentiles_df.insert(0, "count", [self.count(metric) for metric in metrics])
+        return percentiles_df
+
+    def histogram(self, metric, max_bars = DEFAULT_BARS):
+        """Returns the histogram of a metric, merging the adjacent bins into at most max_bars bars
+
+        Args:
+            metric ([str]): Metric column
+            max_bars ([integer]): Maximal number of bars
+
+        Returns:
+            histogram_df ([dataframe]): Start and end of every bar in the unit of the metric and the
+                number of values, the empty bars are omitted
+        """
+        counts = self.histograms.get(metric, BinCounts())
+        if not counts.total:
+            return pd.DataFrame(columns = ["start", "end", "count"])
+        factor = max(1, -(-(int(counts.bins[-1]) - int(counts.bins[0]) + 1) // max_bars))
+        bars = pd.Series(counts.counts).groupby(counts.bins // factor).sum()
+        width = HISTOGRAM_WIDTHS[metric] * factor
+        return pd.DataFrame({"start": bars.index * width, "end": (bars.index + 1) * width,
+                             "count": bars.to_numpy()})
+
+    def to_frame(self):
+        """Returns the state of the distributions as a dataframe with a row per non-empty bin, which
+        can be stored in a file or a database and restored with from_frame
+
+        Returns:
+            state_df ([dataframe]): Metric, kind ("sketch" or "histogram"), bin and count of every bin
+        """
+        frames = [pd.DataFrame(columns = ["metric", "kind", "bin", "count"]).astype(
+            {"metric": object, "kind": object, "bin": np.int64, "count": np.int64})]
+        for kind, bin_counts in (("sketch", self.sketches), ("histogram", self.histograms)):
+            for metric, counts in bin_counts.items():
+                frames.append(pd.DataFrame({"metric": metric, "kind": kind, "bin": counts.bins,
+                                            "count": counts.counts}))
+        return pd.concat(frames, ignore_index = True)
+
+    @classmethod
+    def from_frame(cls, state_df):
+        """Restores the distributions from the dataframe returned by to_frame, the counts of the same
+        bins are added, so the concatenated states of several log files are merged
+
+        Args:
+            state_df ([dataframe]): State of the distributions
+
+        Returns:
+            distributions ([Distributions]): Restored distributions
+        """
+        metrics = [metric for metric in SKETCH_METRICS if metric in set(state_df.metric)]
+        kinds = {"sketch": {}, "histogram": {}}
+        grouped = state_df.groupby(["kind", "metric", "bin"], sort = True)["count"].sum()
+        for (kind, metric), counts in grouped.groupby(level = [0, 1]):
+            kinds[kind][metric] = BinCounts(counts.index.get_level_values("bin"), counts.to_numpy())
+        for sketch in kinds["sketch"].values():
+            sketch.collapse(MAX_BINS)
+        return cls(metrics, kinds["sketch"], kinds["histogram"])
+
+
+@memoized
+@profiled("sketch")
+def distributions(dataframe):
+    """Builds the distribution sketches of a whole dataframe
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+
+    Returns:
+        distributions ([Distributions]): Quantile sketches and histograms of the SKETCH_METRICS
+    """
+    result = Distributions()
+    result.update(dataframe)
+    return result
@@ -0,0 +1,296 @@
+"""Self-contained session snapshots of an analyzed log file.
+
+A snapshot holds everything needed to open the same analysis without the original CSV file: the
+formatted and typed columns, the state of the summary engine, the detected events, the rollup pyramid,
+the distribution sketches and the downsampled series of the Bandwidth Plot. Every part is an Arrow IPC
+section of a single file:
+
+    magic | section | section | ... | JSON footer | footer length | magic
+
+The footer holds the offsets of the sections, the sender flag and the hash of the original log file.
+The section of the formatted columns is written uncompressed and the snapshot is memory-mapped on open,
+so the numeric columns of the dataframe are views of the mapped file instead of copies and only the
+pages which are accessed are read from the disk. The small sections of the results are compressed and
+decompressed on open. The loaded results are primed into the
+memo layer under the hash of the original log file, so the views of the app don't compute them again.
+
+Usage:
+    python -m srt_analyzer.snapshot log.csv session.srtsnap
+"""
+import argparse
+import datetime
+import json
+import os
+import struct
+import sys
+import uuid
+import pyarrow as pa
+import pandas as pd
+from srt_analyzer import cache, memo
+from srt_analyzer.downsample import downsample
+from srt_analyzer.events import detect_events
+from srt_analyzer.ingest import is_sender, read_chunks
+from srt_analyzer.rollup import Pyramid, rollup_pyramid
+from srt_analyzer.schema import layout_errors, log_stem, read_header
+from srt_analyzer.sketch import Distributions, distributions
+from srt_analyzer.summary import Summary, summarize
+
+# Extension of the snapshot files
+SNAPSHOT_EXTENSION = "srtsnap"
+
+# Leading and trailing bytes of every snapshot file
+MAGIC = b"SRTSNAP1"
+
+# Layout version of the snapshots, a snapshot of another version isn't opened
+SNAPSHOT_VERSION = 1
+
+# Compression of the sections of the results, ZSTD gives the smallest files and is fast to decompress.
+# The section of the formatted columns is never compressed, so it can be mapped without copying it
+DEFAULT_COMPRESSION = "zstd"
+
+# The sections start at multiples of this number of bytes, which keeps the mapped buffers aligned
+_ALIGNMENT = 64
+
+_FOOTER = struct.Struct("<Q8s")
+
+
+class Session:
+    """Analyzed log file loaded from a snapshot.
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        key ([str]): Hash of the original log file content
+        summary ([Summary]): Summary of the dataframe
+        events ([dataframe]): Detected events
+        pyramid ([Pyramid]): Rollup pyramid, None for an empty log file
+        bandwidth ([dataframe]): Downsampled series of the whole Bandwidth Plot
+        info ([dict]): Footer of the snapshot, like the name of the original log file and the creation
+            time
+        distributions ([Distributions]): Distribution sketches, None for the snapshots written before
+            they were added
+    """
+
+    def __init__(self, dataframe, sender, key, summary, events, pyramid, bandwidth, info,
+                 distributions = None):
+        self.dataframe = dataframe
+        self.sender = sender
+        self.key = key
+        self.summary = summary
+        self.events = events
+        self.pyramid = pyramid
+        self.bandwidth = bandwidth
+        self.info = info
+        self.distributions = distributions
+
+    @property
+    def nbytes(self):
+        """Memory size of the dataframe and the loaded results in bytes"""
+        frames = [self.dataframe, self.events, self.bandwidth]
+        size = sum(int(frame.memory_usage(index = True).sum()) for frame in frames if frame is not None)
+        parts = [self.summary, self.pyramid, self.distributions]
+        return size + sum(part.nbytes for part in parts if part is not None)
+
+    def prime(self):
+        """Registers the dataframe under the hash of the original log file and stores the loaded
+        results in the memo layer, with the same arguments as the views of the app call them
+        """
+        memo.register(self.dataframe, self.key)
+        memo.prime(summarize, self.key, self.summary)
+        memo.prime(detect_events, self.key, self.events, self.sender)
+        if self.pyramid is not None:
+            memo.prime(rollup_pyramid, self.key, self.pyramid, cache.rollup_path(self.key))
+        memo.prime(downsample, self.key, self.bandwidth, "Seconds", "mbpsBandwidth",
+                   _full_range(self.dataframe))
+        if self.distributions is not None:
+            memo.prime(distributions, self.key, self.distributions)
+
+
+def _full_range(dataframe):
+    """Returns the default time range of the Bandwidth Plot, which covers the whole log file"""
+    return float(dataframe.Seconds.iloc[0]), float(dataframe.Seconds.iloc[-1])
+
+
+def _write_section(sink, dataframe, options):
+    """Writes a dataframe as an Arrow IPC section at the next aligned offset
+
+    Args:
+        sink ([NativeFile]): Snapshot file opened for writing
+        dataframe ([dataframe]): Dataframe of the section
+        options ([IpcWriteOptions]): Compression of the section
+
+    Returns:
+        bounds ([list]): Offset and length of the section in bytes
+    """
+    sink.write(b"\0" * (-sink.tell() % _ALIGNMENT))
+    offset = sink.tell()
+    table = pa.Table.from_pandas(dataframe, preserve_index = False)
+    with pa.ipc.new_file(sink, table.schema, options = options) as writer:
+        writer.write_table(table)
+    return [offset, sink.tell() - offset]
+
+
+def write(path, dataframe, sender, key = None, source = None, compression = DEFAULT_COMPRESSION):
+    """Writes the snapshot of an analyzed log file
+
+    Args:
+        path ([str]): Path of the snapshot file
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        key ([str]): Hash of the original log file content, the registered key of the dataframe by
+            default
+        source ([str]): Name of the original log file
+        compression ([str]): Compression of the sections of the results, "zstd", "lz4" or None
+    """
+    # A snapshot of a dataframe of unknown origin gets a key of its own, under which it is memoized
+    key = key or memo.frame_key(dataframe) or uuid.uuid4().hex
+    pyramid = rollup_pyramid(dataframe)
+    sections = {
+        "frame": dataframe,
+        "summary": summarize(dataframe).to_frame(),
+        "events": detect_events(dataframe, sender),
+        "pyramid": pyramid.to_frame() if pyramid is not None else None,
+        "bandwidth": downsample(dataframe, "Seconds", "mbpsBandwidth", _full_range(dataframe)),
+        "distributions": distributions(dataframe).to_frame(),
+    }
+    options = pa.ipc.IpcWriteOptions(compression = compression)
+    frame_options = pa.ipc.IpcWriteOptions(compression = None)
+    footer = {"version": SNAPSHOT_VERSION, "sender": bool(sender), "key": key, "source": source,
+              "rows": len(dataframe), "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+              "sections": {}}
+    tmp_path = f"{path}.tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            sink.write(MAGIC)
+            for name, section_df in sections.items():
+                if section_df is not None:
+                    footer["sections"][name] = _write_section(sink, section_df,
+                                                              frame_options if name == "frame" else options)
+            footer_bytes = json.dumps(footer).encode()
+            sink.write(footer_bytes)
+            sink.write(_FOOTER.pack(len(footer_bytes), MAGIC))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def is_snapshot(source):
+    """Checks whether a file is a session snapshot instead of a CSV log file
+
+    Args:
+        source ([str or file]): Path to the file or a binary file buffer
+
+    Returns:
+        snapshot ([bool]): True for a snapshot file
+    """
+    if hasattr(source, "read"):
+        position = source.tell()
+        source.seek(0)
+        head = source.read(len(MAGIC))
+        source.seek(position)
+    else:
+        with open(source, "rb") as snapshot_file:
+            head = snapshot_file.read(len(MAGIC))
+    return head == MAGIC
+
+
+def _buffer(source):
+    """Returns the content of the snapshot as an Arrow buffer without copying it
+
+    Args:
+        source ([str or file]): Path to the snapshot file, which is memory-mapped, or a binary file
+            buffer
+
+    Returns:
+        buffer ([Buffer]): Content of the snapshot
+    """
+    if not hasattr(source, "read"):
+        mapped = pa.memory_map(source)
+        return mapped.read_buffer(mapped.size())
+    if hasattr(source, "getbuffer"):
+        # The uploaded files are already in memory
+        return pa.py_buffer(source.getbuffer())
+    source.seek(0)
+    return pa.py_buffer(source.read())
+
+
+def load(source):
+    """Opens a session snapshot
+
+    Args:
+        source ([str or file]): Path to the snapshot file or a binary file buffer
+
+    Returns:
+        session ([Session]): Loaded session, ValueError is raised for files which are not valid snapshots
+    """
+    buffer = _buffer(source)
+    if buffer.size < len(MAGIC) + _FOOTER.size or buffer.slice(0, len(MAGIC)).to_pybytes() != MAGIC:
+        raise ValueError("The file is not an SRT session snapshot")
+    footer_size, magic = _FOOTER.unpack(buffer.slice(buffer.size - _FOOTER.size).to_pybytes())
+    if magic != MAGIC:
+        raise ValueError("The SRT session snapshot is truncated")
+    footer_end = buffer.size - _FOOTER.size
+    info = json.loads(buffer.slice(footer_end - footer_size, footer_size).to_pybytes())
+    if info.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported version of the SRT session snapshot: {info.get('version')}")
+
+    def section(name):
+        if name not in info["sections"]:
+            return None
+        offset, length = info["sections"][name]
+        # The IPC footer of a section points to its record batches by their offset in the whole file
+        table = pa.ipc.open_file(buffer.slice(0, offset + length)).read_all()
+        # Without consolidating the columns into blocks, the uncompressed columns without missing values
+        # stay views of the buffer
+        return table.to_pandas(split_blocks = True, self_destruct = True)
+
+    pyramid_df = section("pyramid")
+    distributions_df = section("distributions")
+    return Session(section("frame"), info["sender"], info["key"], Summary.from_state(section("summary")),
+                   section("events"), Pyramid.from_frame(pyramid_df) if pyramid_df is not None else None,
+                   section("bandwidth"), info,
+                   Distributions.from_frame(distributions_df) if distributions_df is not None else None)
+
+
+def snapshot_log(log_path, path):
+    """Parses a log file and writes its snapshot
+
+    Args:
+        log_path ([str]): Path to the CSV log file
+        path ([str]): Path of the snapshot file
+    """
+    typed = not layout_errors(read_header(log_path))
+    sender = is_sender(log_path)
+    dataframe = pd.concat(read_chunks(log_path, sender, typed = typed), ignore_index = True)
+    write(path, dataframe, sender, cache.file_hash(log_path), os.path.basename(log_path))
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(prog = "srt_analyzer.snapshot",
+                                     description = "Write the session snapshot of an SRT CSV log file")
+    parser.add_argument("log", help = "path of the CSV log file, which can be compressed")
+    parser.add_argument("output", nargs = "?",
+                        help = f"path of the snapshot (default: the log file with the "
+                               f".{SNAPSHOT_EXTENSION} extension)")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    """Entry point of the snapshot writer
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): Always 0
+    """
+    args = parse_args(argv)
+    output = args.output or f"{log_stem(args.log)}.{SNAPSHOT_EXTENSION}"
+    snapshot_log(args.log, output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
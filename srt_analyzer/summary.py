@@ -0,0 +1,242 @@
+"""Single-pass summary engine of the metric columns.
+
+The count, minimum, maximum, sum, mean and standard deviation of every numeric column are computed at
+once with batched NumPy reductions over contiguous blocks of rows, instead of scanning every column
+separately for every stat. The partial results of different chunks or log files can be merged.
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+
+# Number of rows reduced at once, which bounds the size of the contiguous float64 block
+BLOCK_ROWS = 2 ** 18
+
+# Quantiles reported in the General Stats, the same as the ones of the describe method
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+class Summary:
+    """Summary stats of the metric columns of a dataframe or a chunk of the log file.
+
+    The count, minimum, maximum, sum and the sum of squared deviations (used for the standard
+    deviation) are merged exactly. The quantiles are exact only for a summary of a single dataframe
+    and are unknown (NaN) after merging partial results.
+
+    Args:
+        columns ([list]): Names of the metric columns
+        count ([array]): Number of non-NaN values per column
+        minimum ([array]): Minimal value per column
+        maximum ([array]): Maximal value per column
+        total ([array]): Sum per column
+        m2 ([array]): Sum of squared deviations from the mean per column
+        quantiles ([array]): Quantiles per column with shape (number of quantiles, number of columns)
+        dtypes ([list]): Original dtypes of the columns, used for the reported values
+    """
+
+    def __init__(self, columns, count, minimum, maximum, total, m2, quantiles = None, dtypes = None):
+        self.columns = list(columns)
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = total
+        self.m2 = m2
+        if quantiles is None:
+            quantiles = np.full((len(QUANTILES), len(self.columns)), np.nan)
+        self.quantiles = quantiles
+        if dtypes is None:
+            dtypes = [np.dtype(np.float64)] * len(self.columns)
+        self.dtypes = dtypes
+
+    @property
+    def nbytes(self):
+        """Memory size of the stats arrays in bytes"""
+        arrays = [self.count, self.minimum, self.maximum, self.total, self.m2, self.quantiles]
+        return int(sum(np.asarray(array).nbytes for array in arrays))
+
+    @classmethod
+    def from_frame(cls, dataframe, columns = None, quantiles = True):
+        """Computes the summary of a dataframe in a single pass over blocks of rows
+
+        Args:
+            dataframe ([dataframe]): Input Dataframe
+            columns ([list]): Metric columns, all numeric columns by default
+            quantiles ([bool]): False to skip the quantiles, which are not needed for partial results
+
+        Returns:
+            summary ([Summary]): Summary of the dataframe
+        """
+        if columns is None:
+            # The elapsed milliseconds of the Time column duplicate the Seconds column
+            columns = [col for col in dataframe.select_dtypes(include = "number").columns if col != "Time"]
+        arrays = [dataframe[col].to_numpy() for col in columns]
+        dtypes = [array.dtype for array in arrays]
+        num_cols = len(columns)
+        summary = cls(columns, np.zeros(num_cols), np.full(num_cols, np.nan), np.full(num_cols, np.nan),
+                      np.zeros(num_cols), np.zeros(num_cols), dtypes = dtypes)
+
+        num_rows = len(dataframe)
+        for start in range(0, num_rows, BLOCK_ROWS):
+            # Stacking the columns into a contiguous block, so every stat is a single reduction
+            block = np.empty((min(BLOCK_ROWS, num_rows - start), num_cols), dtype = np.float64)
+            for i, array in enumerate(arrays):
+                block[:, i] = array[start:start + BLOCK_ROWS]
+            summary = summary.merge(cls._from_block(columns, block, dtypes))
+
+        if quantiles and num_rows:
+            summary.quantiles = np.array([np.nanquantile(array.astype(np.float64, copy = False), QUANTILES)
+                                          for array in arrays]).T
+        return summary
+
+    @classmethod
+    def _from_block(cls, columns, block, dtypes):
+        """Reduces a contiguous block of rows
+
+        Args:
+            columns ([list]): Names of the metric columns
+            block ([array]): Block with shape (number of rows, number of columns)
+            dtypes ([list]): Original dtypes of the columns
+
+        Returns:
+            summary ([Summary]): Summary of the block without quantiles
+        """
+        valid = ~np.isnan(block)
+        count = valid.sum(axis = 0).astype(np.float64)
+        if valid.all():
+            minimum = block.min(axis = 0)
+            maximum = block.max(axis = 0)
+            total = block.sum(axis = 0)
+            m2 = ((block - total / count) ** 2).sum(axis = 0)
+        else:
+            with np.errstate(invalid = "ignore", divide = "ignore"):
+                minimum = np.nanmin(block, axis = 0)
+                maximum = np.nanmax(block, axis = 0)
+                total = np.nansum(block, axis = 0)
+                m2 = np.nansum((block - total / count) ** 2, axis = 0)
+        return cls(columns, count, minimum, maximum, total, m2, dtypes = dtypes)
+
+    def merge(self, other):
+        """Merges two partial summaries of the same columns
+
+        Args:
+            other ([Summary]): Summary of another chunk or log file
+
+        Returns:
+            summary ([Summary]): Merged summary without quantiles
+        """
+        if self.columns != other.columns:
+            raise ValueError("Only summaries of the same columns can be merged")
+        count = self.count + other.count
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            # Combining the sums of squared deviations with the parallel algorithm of Chan et al.
+            delta = other.total / other.count - self.total / self.count
+            m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        m2 = np.where(self.count == 0, other.m2, np.where(other.count == 0, self.m2, m2))
+        return Summary(self.columns, count, np.fmin(self.minimum, other.minimum),
+                       np.fmax(self.maximum, other.maximum), self.total + other.total, m2,
+                       dtypes = self.dtypes)
+
+    def to_frame(self):
+        """Returns the state of the summary as a dataframe with a row per metric column, which can be
+        stored in a file and restored with from_state
+
+        Returns:
+            state_df ([dataframe]): Dtype, count, minimum, maximum, sum, m2 and quantiles per column
+        """
+        state_df = pd.DataFrame({"column": self.columns, "dtype": [str(dtype) for dtype in self.dtypes],
+                                 "count": self.count, "minimum": self.minimum, "maximum": self.maximum,
+                                 "total": self.total, "m2": self.m2})
+        for q, values in zip(QUANTILES, self.quantiles):
+            state_df[f"q{q}"] = values
+        return state_df
+
+    @classmethod
+    def from_state(cls, state_df):
+        """Restores a summary from the dataframe returned by to_frame
+
+        Args:
+            state_df ([dataframe]): State of the summary
+
+        Returns:
+            summary ([Summary]): Restored summary
+        """
+        quantiles = state_df[[f"q{q}" for q in QUANTILES]].to_numpy(np.float64).T
+        return cls(state_df.column.tolist(), state_df["count"].to_numpy(), state_df.minimum.to_numpy(),
+                   state_df.maximum.to_numpy(), state_df.total.to_numpy(), state_df.m2.to_numpy(),
+                   quantiles, [np.dtype(dtype) for dtype in state_df.dtype])
+
+    def _value(self, values, col):
+        """Returns a value of a column as a Python number, rounded to the precision of the column dtype"""
+        i = self.index[col]
+        value = values[i]
+        if np.issubdtype(self.dtypes[i], np.integer) and not np.isnan(value):
+            return int(value)
+        # The shortest representation of a float32 value, 16.769 instead of 16.768999099731445
+        return float(str(self.dtypes[i].type(value)))
+
+    def min(self, col):
+        """Returns the minimal value of a column"""
+        return self._value(self.minimum, col)
+
+    def max(self, col):
+        """Returns the maximal value of a column"""
+        return self._value(self.maximum, col)
+
+    def sum(self, col):
+        """Returns the sum of a column, which is kept in float64 for the float columns"""
+        i = self.index[col]
+        if np.issubdtype(self.dtypes[i], np.integer) and not np.isnan(self.total[i]):
+            return int(self.total[i])
+        return float(self.total[i])
+
+    def mean(self, col):
+        """Returns the mean value of a column"""
+        i = self.index[col]
+        return float(self.total[i] / self.count[i]) if self.count[i] else float("nan")
+
+    def std(self, col):
+        """Returns the sample standard deviation of a column"""
+        i = self.index[col]
+        return float(np.sqrt(self.m2[i] / (self.count[i] - 1))) if self.count[i] > 1 else float("nan")
+
+    def rtt(self):
+        """Returns the minimum, maximum and average Round Trip Time(RTT)
+
+        Returns:
+            min_rtt ([float]): Minimum Round Trip Time in ms
+            max_rtt ([float]): Maximum Round Trip Time in ms
+            avg_rtt ([float]): Average Round Trip Time in ms
+        """
+        return (round(float(self.min("msRTT")), 3), round(float(self.max("msRTT")), 3),
+                round(float(self.mean("msRTT")), 3))
+
+    def describe(self):
+        """Returns the summary in the same layout as the transposed output of the describe method
+
+        Returns:
+            stats_df ([dataframe]): Stats with a row per metric column
+        """
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            mean = self.total / self.count
+            std = np.sqrt(self.m2 / (self.count - 1))
+        stats = {"count": self.count, "mean": mean, "std": std, "min": self.minimum}
+        for q, values in zip(QUANTILES, self.quantiles):
+            stats[f"{q:.0%}"] = values
+        stats["max"] = self.maximum
+        stats["sum"] = self.total
+        return pd.DataFrame(stats, index = self.columns)
+
+
+@memoized
+@profiled("summary")
+def summarize(dataframe):
+    """Computes the summary of all numeric columns of a dataframe
+
+    Args:
+        dataframe ([dataframe]): Input Dataframe
+
+    Returns:
+        summary ([Summary]): Summary of the dataframe
+    """
+    return Summary.from_frame(dataframe)
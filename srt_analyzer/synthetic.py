@@ -0,0 +1,196 @@
+"""Generator of synthetic SRT CSV log files, used by the benchmarks.
+
+The logs have the 30 columns written by srt-live-transmit and look like a constant bitrate stream
+over a lossy link: a baseline of random loss, short loss bursts with retransmissions and drops, and
+longer congestion episodes in which the RTT grows, the bandwidth estimate falls and pktFlightSize
+exceeds the windows. The rows are generated and written in chunks, so logs of tens of millions of
+rows are generated in bounded memory.
+
+Usage:
+    python -m srt_analyzer.synthetic sender.csv --rows 1000000 --role sender
+"""
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from srt_analyzer.schema import SRT_COLUMNS
+
+# Size of the SRT payload in bytes
+PAYLOAD_BYTES = 1316
+
+# Number of rows generated and written at once
+GENERATOR_CHUNKSIZE = 500000
+
+
+def _episode_mask(starts, length, carry):
+    """Marks the rows covered by episodes of a fixed length, which start at the given rows
+
+    Args:
+        starts ([array]): Boolean array, True where an episode starts
+        length ([integer]): Number of rows of an episode
+        carry ([array]): Starts of the last length - 1 rows of the previous chunk
+
+    Returns:
+        mask ([array]): Boolean array, True for the rows inside of an episode
+        carry ([array]): Starts of the last length - 1 rows, passed to the next chunk
+    """
+    padded = np.concatenate((carry, starts)).astype(np.int64)
+    counts = np.concatenate(([0], np.cumsum(padded)))
+    # An episode covers a row if it started less than length rows before it
+    ends = np.arange(len(carry) + 1, len(padded) + 1)
+    covered = counts[ends] - counts[np.maximum(ends - length, 0)] > 0
+    return covered, padded[len(padded) - min(length - 1, len(padded)):]
+
+
+class LogGenerator:
+    """Generates the rows of a synthetic log file chunk by chunk.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        seed ([integer]): Seed of the random generator, the same seed gives the same log file
+        period_ms ([integer]): Interval between two rows in milliseconds
+        bitrate_mbps ([float]): Bitrate of the stream
+        rtt_ms ([float]): Baseline RTT of the link
+        latency_ms ([integer]): RCVLATENCYms of the connection
+        loss_rate ([float]): Fraction of the packets lost outside of the loss bursts
+        bursts_per_million ([float]): Average number of loss bursts per million rows
+        burst_rows ([integer]): Number of rows of a loss burst
+        episodes_per_million ([float]): Average number of congestion episodes per million rows
+        episode_rows ([integer]): Number of rows of a congestion episode
+    """
+
+    def __init__(self, sender, seed = 0, period_ms = 1000, bitrate_mbps = 8.0, rtt_ms = 30.0, latency_ms = 400,
+                 loss_rate = 0.0002, bursts_per_million = 500, burst_rows = 5, episodes_per_million = 50,
+                 episode_rows = 60):
+        self.sender = sender
+        # The link conditions are drawn from their own generator, so a sender and a receiver log
+        # generated with the same seed describe both ends of the same link
+        self.rng = np.random.default_rng(seed)
+        self.role_rng = np.random.default_rng([seed, 1])
+        self.offset_ms = int(self.rng.integers(10, 20))
+        self.period_ms = period_ms
+        self.bitrate_mbps = bitrate_mbps
+        self.rtt_ms = rtt_ms
+        self.latency_ms = latency_ms
+        self.loss_rate = loss_rate
+        self.burst_probability = bursts_per_million / 1e6
+        self.burst_rows = burst_rows
+        self.episode_probability = episodes_per_million / 1e6
+        self.episode_rows = episode_rows
+        self.rows = 0
+        self.burst_carry = np.zeros(0, dtype = np.int64)
+        self.episode_carry = np.zeros(0, dtype = np.int64)
+
+    def chunk(self, num_rows):
+        """Generates the next rows of the log file
+
+        Args:
+            num_rows ([integer]): Number of rows
+
+        Returns:
+            chunk ([dataframe]): Rows with the 30 columns of the SRT log file
+        """
+        rng = self.rng
+        bursts, self.burst_carry = _episode_mask(rng.random(num_rows) < self.burst_probability,
+                                                 self.burst_rows, self.burst_carry)
+        congested, self.episode_carry = _episode_mask(rng.random(num_rows) < self.episode_probability,
+                                                      self.episode_rows, self.episode_carry)
+        columns = {col: np.zeros(num_rows, dtype = np.int64) for col in SRT_COLUMNS}
+        columns["Time"] = (self.rows + np.arange(num_rows)) * self.period_ms + self.offset_ms
+        columns["SocketID"][:] = 612345678
+
+        # Constant bitrate stream with the packets counted per reporting period
+        packet_rate = self.bitrate_mbps * 1e6 / 8 / PAYLOAD_BYTES * self.period_ms / 1000
+        packets = rng.poisson(packet_rate, num_rows)
+        loss_probability = np.where(bursts, 0.05, self.loss_rate) * np.where(congested, 5, 1)
+        lost = rng.binomial(packets, np.minimum(loss_probability, 1))
+        retransmitted = lost + rng.poisson(0.1 * lost)
+        # Packets are dropped only when the loss is too heavy to be recovered within the latency
+        dropped = np.where(bursts & congested, rng.binomial(lost, 0.5), 0)
+
+        rtt = rng.normal(self.rtt_ms, self.rtt_ms / 10, num_rows) * np.where(congested, 4, 1)
+        bandwidth = rng.normal(900, 50, num_rows) * np.where(congested, 0.05, 1)
+        flight = (packet_rate * rtt / self.period_ms).astype(np.int64) + rng.integers(0, 10, num_rows)
+        window = np.where(congested, np.maximum(flight // 2, 16), 8192)
+        columns["pktFlowWindow"] = np.full(num_rows, 8192)
+        columns["pktCongestionWindow"] = window
+        columns["pktFlightSize"] = np.where(congested & (rng.random(num_rows) < 0.3), window + flight, flight)
+        columns["msRTT"] = np.round(np.abs(rtt), 3)
+        columns["mbpsBandwidth"] = np.round(np.abs(bandwidth), 3)
+        columns["RCVLATENCYms"][:] = self.latency_ms
+        rate = np.round(packets * PAYLOAD_BYTES * 8 / self.period_ms / 1000, 3)
+        if self.sender:
+            columns["pktSent"] = packets + retransmitted
+            columns["pktSndLoss"] = lost
+            columns["pktSndDrop"] = dropped
+            columns["pktRetrans"] = retransmitted
+            columns["byteSent"] = columns["pktSent"] * PAYLOAD_BYTES
+            columns["byteSndDrop"] = dropped * PAYLOAD_BYTES
+            columns["mbpsSendRate"] = rate
+            columns["usPktSndPeriod"] = np.round(self.period_ms * 1000 / np.maximum(packets, 1), 3)
+        else:
+            lost_retrans = self.role_rng.binomial(retransmitted, np.minimum(loss_probability, 1))
+            received_retrans = retransmitted - lost_retrans
+            columns["pktRecv"] = packets - lost + received_retrans
+            columns["pktRcvLoss"] = lost
+            columns["pktRcvDrop"] = dropped
+            columns["pktRcvRetrans"] = received_retrans
+            columns["pktRcvBelated"] = self.role_rng.poisson(0.01, num_rows)
+            columns["byteRecv"] = columns["pktRecv"] * PAYLOAD_BYTES
+            columns["byteRcvLoss"] = lost * PAYLOAD_BYTES
+            columns["byteRcvDrop"] = dropped * PAYLOAD_BYTES
+            columns["mbpsRecvRate"] = rate
+        self.rows += num_rows
+        return pd.DataFrame(columns)[SRT_COLUMNS]
+
+
+def write_log(path, rows, sender, chunksize = GENERATOR_CHUNKSIZE, **options):
+    """Writes a synthetic log file chunk by chunk
+
+    Args:
+        path ([str]): Path of the CSV file
+        rows ([integer]): Number of rows
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        chunksize ([integer]): Number of rows generated at once
+        options ([dict]): Options of the LogGenerator, like the seed or the loss rate
+    """
+    generator = LogGenerator(sender, **options)
+    with open(path, "w", newline = "") as log_file:
+        for start in range(0, rows, chunksize):
+            chunk = generator.chunk(min(chunksize, rows - start))
+            chunk.to_csv(log_file, index = False, header = start == 0)
+
+
+def parse_args(argv = None):
+    """Parses the command-line arguments"""
+    parser = argparse.ArgumentParser(prog = "srt_analyzer.synthetic",
+                                     description = "Generate a synthetic SRT CSV log file")
+    parser.add_argument("output", help = "path of the generated CSV file")
+    parser.add_argument("--rows", type = int, default = 100000, help = "number of rows (default: 100000)")
+    parser.add_argument("--role", choices = ("sender", "receiver"), default = "sender")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--loss-rate", type = float, default = 0.0002,
+                        help = "fraction of the packets lost outside of the loss bursts")
+    parser.add_argument("--bursts", type = float, default = 500, help = "loss bursts per million rows")
+    parser.add_argument("--congestion", type = float, default = 50,
+                        help = "congestion episodes per million rows")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    """Entry point of the generator
+
+    Args:
+        argv ([list]): Command-line arguments, sys.argv by default
+
+    Returns:
+        exit_code ([integer]): Always 0
+    """
+    args = parse_args(argv)
+    write_log(args.output, args.rows, args.role == "sender", seed = args.seed, loss_rate = args.loss_rate,
+              bursts_per_million = args.bursts, episodes_per_million = args.congestion)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
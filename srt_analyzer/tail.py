@@ -0,0 +1,125 @@
+"""Live tail mode for growing SRT CSV log files.
+
+srt-live-transmit keeps appending rows to the log file while the stream is running. The tail parses
+only the bytes appended since the last offset and updates the running aggregates, the Top-K index and
+the pktFlightSize checks incrementally, so the cost of an update is proportional to the new rows.
+The log file is watched with watchdog, so an update is done as soon as new rows are written.
+"""
+import io
+import os
+import threading
+import pandas as pd
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from srt_analyzer.ingest import StreamStats, format_chunk, sender_of
+from srt_analyzer.schema import apply_schema, layout_errors, read_options
+
+# Interval in seconds at which the dashboard is refreshed
+DEFAULT_REFRESH = 1.0
+
+# Maximal number of bytes parsed in a single poll, which bounds the memory when a large file is followed
+MAX_POLL_BYTES = 64 * 1024 ** 2
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Sets an event when the watched log file is modified"""
+
+    def __init__(self, path, changed):
+        super().__init__()
+        self.path = path
+        self.changed = changed
+
+    def on_any_event(self, event):
+        if os.path.abspath(event.src_path) == self.path:
+            self.changed.set()
+
+
+class LogTail:
+    """Follows a growing log file and keeps its aggregated stats up to date.
+
+    Args:
+        path ([str]): Path to the local log file
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.changed = threading.Event()
+        self.observer = None
+        self._reset()
+
+    def _reset(self):
+        """Forgets everything parsed so far, used when the log file is truncated or replaced"""
+        self.offset = 0
+        self.header = None
+        self.typed = True
+        self.stats = None
+
+    def start(self):
+        """Starts watching the log file for modifications"""
+        if self.observer is None:
+            self.observer = Observer()
+            self.observer.schedule(_ChangeHandler(self.path, self.changed), os.path.dirname(self.path))
+            self.observer.daemon = True
+            self.observer.start()
+
+    def stop(self):
+        """Stops watching the log file"""
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def wait(self, timeout = DEFAULT_REFRESH):
+        """Waits until the log file is modified or the timeout expires
+
+        Args:
+            timeout ([float]): Maximal waiting time in seconds
+
+        Returns:
+            changed ([bool]): True if the log file was modified
+        """
+        changed = self.changed.wait(timeout)
+        self.changed.clear()
+        return changed
+
+    def poll(self):
+        """Parses the complete rows appended since the last poll and updates the stats. At most
+        MAX_POLL_BYTES are parsed at once, the rest is parsed on the following polls.
+
+        Returns:
+            num_rows ([integer]): Number of the newly parsed rows
+        """
+        if not os.path.exists(self.path):
+            return 0
+        if os.path.getsize(self.path) < self.offset:
+            self._reset()
+        with open(self.path, "rb") as log_file:
+            log_file.seek(self.offset)
+            data = log_file.read(MAX_POLL_BYTES)
+        # Only the complete lines are parsed, the last line may still be written
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return 0
+        data = data[:end]
+
+        if self.header is None:
+            header_end = data.find(b"\n") + 1
+            self.header = data[:header_end]
+            self.typed = not layout_errors(self.header.decode().strip().split(","))
+            self.offset += header_end
+            data = data[header_end:]
+        if not data:
+            return 0
+
+        if self.stats is None:
+            # The sender or receiver is recognized from the first row
+            first_row = pd.read_csv(io.BytesIO(self.header + data[:data.find(b"\n") + 1]))
+            self.stats = StreamStats(sender_of(first_row))
+        chunk = pd.read_csv(io.BytesIO(self.header + data), **read_options(self.stats.sender, self.typed))
+        if self.typed:
+            chunk = apply_schema(chunk)
+        # Numbering the rows continuously across the polls, the same way as the chunks of a whole file
+        chunk.index = pd.RangeIndex(self.stats.num_rows, self.stats.num_rows + len(chunk))
+        self.stats.update(format_chunk(chunk))
+        self.offset += len(data)
+        return len(chunk)
@@ -0,0 +1,140 @@
+"""Top-K index of the worst intervals of the line.
+
+For every impairment metric the index keeps the K rows with the lowest mbpsBandwidth and the highest
+number of Lost, Dropped and Retransmitted Data Packets. It is built once while the log file is read,
+chunk by chunk, so changing the number of shown rows is only a lookup and the index works in streaming
+mode, where the whole dataframe is never in memory. Indexes of different chunks or log files can be
+merged.
+"""
+import numpy as np
+import pandas as pd
+from srt_analyzer.memo import memoized
+from srt_analyzer.profiling import profiled
+from srt_analyzer.schema import RECEIVER_IMPAIRMENTS, SENDER_IMPAIRMENTS
+
+# Maximal number of rows, the same as the maximum of the slider in the Line Bandwidth Stats
+MAX_K = 100
+
+# Columns shown in the Line Bandwidth Stats tables
+SENDER_TABLE_COLUMNS = ["Time", "msRTT", "mbpsBandwidth", "pktSndDrop", "pktSndLoss", "pktRetrans",
+                        "mbpsSendRate"]
+RECEIVER_TABLE_COLUMNS = ["Time", "msRTT", "mbpsBandwidth", "pktRcvDrop", "pktRcvLoss", "pktRcvRetrans",
+                          "mbpsRecvRate"]
+
+
+def _select(values, k, smallest):
+    """Selects the positions of the K smallest or largest values in linear time. Ties are resolved in
+    favour of the earlier positions, the same way as the nsmallest and nlargest methods do.
+
+    Args:
+        values ([array]): Values of the metric
+        k ([integer]): Number of positions to select
+        smallest ([bool]): True to select the smallest values and False for the largest ones
+
+    Returns:
+        positions ([array]): Unordered positions of the selected values
+    """
+    valid = np.flatnonzero(~np.isnan(values)) if values.dtype.kind == "f" else np.arange(len(values))
+    if len(valid) <= k:
+        return valid
+    keys = values[valid] if smallest else -values[valid].astype(np.float64)
+    threshold = np.partition(keys, k - 1)[k - 1]
+    better = valid[keys < threshold]
+    ties = valid[keys == threshold][:k - len(better)]
+    return np.concatenate([better, ties])
+
+
+class TopK:
+    """Index of the K worst rows of the line for the bandwidth and every impairment metric.
+
+    Args:
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+        k ([integer]): Number of rows kept per metric
+    """
+
+    def __init__(self, sender, k = MAX_K):
+        self.sender = sender
+        self.k = k
+        self.columns = SENDER_TABLE_COLUMNS if sender else RECEIVER_TABLE_COLUMNS
+        impairment_cols = SENDER_IMPAIRMENTS if sender else RECEIVER_IMPAIRMENTS
+        # The lowest bandwidth and the highest number of impaired data packets are the worst
+        self.smallest = {"mbpsBandwidth": True}
+        self.smallest.update(dict.fromkeys(impairment_cols, False))
+        self.tables = dict.fromkeys(self.smallest)
+
+    @property
+    def nbytes(self):
+        """Memory size of the kept rows in bytes"""
+        return int(sum(table.memory_usage(index = True).sum() for table in self.tables.values()
+                       if table is not None))
+
+    def _combine(self, metric, candidates):
+        """Combines the kept rows of a metric with new candidate rows
+
+        Args:
+            metric ([str]): Metric column
+            candidates ([dataframe]): Candidate rows
+        """
+        current = self.tables[metric]
+        combined = candidates if current is None else pd.concat([current, candidates])
+        # Stable sorting keeps the earlier rows first among rows with equal values
+        combined = combined.sort_index(kind = "mergesort")
+        combined = combined.sort_values(metric, ascending = self.smallest[metric], kind = "mergesort")
+        self.tables[metric] = combined.head(self.k)
+
+    def update(self, chunk):
+        """Updates the index with a new chunk of the log file
+
+        Args:
+            chunk ([dataframe]): Formatted chunk of the log file
+        """
+        if chunk.empty:
+            return
+        for metric, smallest in self.smallest.items():
+            positions = _select(chunk[metric].to_numpy(), self.k, smallest)
+            self._combine(metric, chunk.iloc[np.sort(positions)][self.columns])
+
+    def merge(self, other):
+        """Merges the index of another chunk or log file into this index
+
+        Args:
+            other ([TopK]): Index of the same type of log file
+        """
+        if other.sender != self.sender:
+            raise ValueError("Only indexes of the same type of log files can be merged")
+        for metric, table in other.tables.items():
+            if table is not None:
+                self._combine(metric, table)
+        return self
+
+    def top(self, metric, num_rows):
+        """Returns the worst rows of a metric
+
+        Args:
+            metric ([str]): Metric column
+            num_rows ([integer]): Number of rows, up to K
+
+        Returns:
+            table ([dataframe]): The worst rows, ordered from the worst one
+        """
+        table = self.tables[metric]
+        if table is None:
+            return pd.DataFrame(columns = self.columns)
+        return table.head(num_rows)
+
+
+@memoized
+@profiled("top_n")
+def topk_index(dataframe, sender):
+    """Builds the Top-K index of a whole dataframe
+
+    Args:
+        dataframe ([dataframe]): Formatted dataframe
+        sender ([bool]): True for SRT Sender and False for SRT Receiver
+
+    Returns:
+        index ([TopK]): Top-K index of the dataframe
+    """
+    index = TopK(sender)
+    index.update(dataframe)
+    return index